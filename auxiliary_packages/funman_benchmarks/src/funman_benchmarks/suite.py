@@ -0,0 +1,465 @@
+"""
+Performance suite for the box search over the AMR models in resources/amr.
+Each case runs in its own process, which records the wall, solver, and
+encoding time of the search, the boxes that it labels per second, its peak
+resident set size, and the fraction of the search space that it labels over
+time.  The compare command reports the metrics that changed with respect to
+a stored baseline.
+
+    python -m funman_benchmarks.suite run --solver z3 dreal --out current.json
+    python -m funman_benchmarks.suite compare baseline.json current.json
+"""
+
+import argparse
+import datetime
+import fnmatch
+import json
+import logging
+import multiprocessing as mp
+import os
+import resource
+import sys
+import traceback
+from contextlib import contextmanager
+from functools import wraps
+from queue import Empty
+from timeit import default_timer
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+import funman
+
+l = logging.getLogger(__name__)
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../../../resources"
+)
+AMR_DIR = os.path.join(RESOURCES, "amr")
+
+# Metrics compared by the compare command, and whether larger is better
+METRICS = {
+    "wall_time": False,
+    "solver_time": False,
+    "encoding_time": False,
+    "boxes_per_second": True,
+    "peak_rss_mb": False,
+    "coverage": True,
+}
+
+
+class BenchmarkCase(BaseModel):
+    """
+    A model and request (paths relative to resources/amr), with the config
+    options that override those of the request.
+    """
+
+    name: str
+    model: str
+    request: str
+    config: Dict[str, Any] = {}
+
+
+class BenchmarkResult(BaseModel):
+    """
+    Measurements of a case.  The times are in seconds and the coverage is the
+    fraction of the search space volume that is labeled.
+    """
+
+    case: str
+    solver: str
+    wall_time: Optional[float] = None
+    solver_time: float = 0.0
+    encoding_time: float = 0.0
+    boxes_labeled: int = 0
+    boxes_per_second: float = 0.0
+    peak_rss_mb: float = 0.0
+    coverage: float = 0.0
+    # (time, coverage) after each change of the coverage
+    coverage_curve: List[Tuple[float, float]] = []
+    timed_out: bool = False
+    error: Optional[str] = None
+
+    def key(self) -> Tuple[str, str]:
+        return (self.case, self.solver)
+
+
+class BenchmarkReport(BaseModel):
+    funman_version: str = funman.__version__
+    created: str = ""
+    results: List[BenchmarkResult] = []
+
+
+CASES = (
+    [
+        BenchmarkCase(
+            name="sir",
+            model="petrinet/amr-examples/sir.json",
+            request="petrinet/amr-examples/sir_request1.json",
+        ),
+        BenchmarkCase(
+            name="sir_param_synth",
+            model="petrinet/evaluation/sir.json",
+            request="petrinet/evaluation/sir_request_param_synth.json",
+        ),
+        BenchmarkCase(
+            name="sidarthe_param_synth",
+            model="petrinet/evaluation/sidarthe.json",
+            request="petrinet/evaluation/sidarthe_request_param_synth.json",
+        ),
+        BenchmarkCase(
+            name="stratified",
+            model="petrinet/stratified/model_amr.json",
+            request="petrinet/stratified/model_amr_request.json",
+        ),
+        BenchmarkCase(
+            name="stratified_seird",
+            model="petrinet/terrarium-tests/stratified_seird_model.json",
+            request="petrinet/terrarium-tests/stratified_seird_request.json",
+        ),
+        BenchmarkCase(
+            name="halfar",
+            model="halfar/halfar.json",
+            request="halfar/halfar_request.json",
+        ),
+    ]
+    + [
+        BenchmarkCase(
+            name=f"advection_1d_{scheme}",
+            model=f"advection_1d/advection_1d_{scheme}.json",
+            request="advection_1d/advection_1d_request.json",
+        )
+        for scheme in ["backward", "centered", "forward"]
+    ]
+    + [
+        BenchmarkCase(
+            name=f"eval_scenario{i}_base",
+            model=f"petrinet/mira/models/eval_scenario{i}_base.json",
+            request=f"petrinet/mira/requests/eval_scenario{i}_base.json",
+        )
+        for i in [1, 2, 3]
+    ]
+)
+
+
+class _PhaseTimer:
+    """
+    Accumulate the time spent in the solver and in encoding the model by
+    wrapping the methods of the search that perform them.  Nested calls of a
+    phase are counted once.
+    """
+
+    def __init__(self):
+        self.times = {"solver": 0.0, "encoding": 0.0}
+        self._depth = {"solver": 0, "encoding": 0}
+
+    def _wrap(self, phase, fn):
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            self._depth[phase] += 1
+            start = default_timer()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._depth[phase] -= 1
+                if self._depth[phase] == 0:
+                    self.times[phase] += default_timer() - start
+
+        return timed
+
+    @contextmanager
+    def instrument(self):
+        from funman.scenario.scenario import AnalysisScenario
+        from funman.search.box_search import BoxSearch
+        from funman.search.search import Search
+
+        methods = [
+            (Search, "_internal_invoke_solver", "solver"),
+            (AnalysisScenario, "_initialize_encodings", "encoding"),
+            (BoxSearch, "_initialize_model_for_box", "encoding"),
+        ]
+        originals = [getattr(cls, name) for cls, name, _ in methods]
+        for (cls, name, phase), fn in zip(methods, originals):
+            setattr(cls, name, self._wrap(phase, fn))
+        try:
+            yield self
+        finally:
+            for (cls, name, _), fn in zip(methods, originals):
+                setattr(cls, name, fn)
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1.0 / 1024 if sys.platform != "darwin" else 1.0 / 1024**2
+    return scale * max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+
+
+def _run_case(case: BenchmarkCase, solver: str, queue: mp.Queue):
+    """
+    Run the case in the current process and put the coverage updates and
+    the result on the queue.
+    """
+    from funman import Funman
+    from funman.api.run import Runner
+    from funman.server.query import (
+        FunmanResults,
+        FunmanWorkRequest,
+        FunmanWorkUnit,
+    )
+
+    result = BenchmarkResult(case=case.name, solver=solver)
+    try:
+        model, _ = Runner().get_model(os.path.join(AMR_DIR, case.model))
+        with open(os.path.join(AMR_DIR, case.request), "r") as f:
+            request = json.load(f)
+        request["config"] = {
+            **request.get("config", {}),
+            **case.config,
+            "solver": solver,
+        }
+        request = FunmanWorkRequest.model_validate(request)
+        work = FunmanWorkUnit(id=case.name, model=model, request=request)
+        results = FunmanResults(id=case.name, model=model, request=request)
+
+        timer = _PhaseTimer()
+        start = default_timer()
+
+        def update(scenario, ps):
+            progress = results.update_parameter_space(scenario, ps)
+            result.boxes_labeled = len(ps.true_boxes) + len(ps.false_boxes)
+            if progress.coverage_of_search_space != result.coverage:
+                result.coverage = progress.coverage_of_search_space
+                result.solver_time = timer.times["solver"]
+                result.encoding_time = timer.times["encoding"]
+                result.peak_rss_mb = _peak_rss_mb()
+                # The measurements so far, in case the search times out
+                queue.put(
+                    (
+                        "coverage",
+                        (default_timer() - start, result.model_dump()),
+                    )
+                )
+            return progress
+
+        with timer.instrument():
+            scenario = work.to_scenario()
+            solution = Funman().solve(
+                scenario,
+                config=request.config,
+                resultsCallback=lambda ps: update(scenario, ps),
+            )
+            result.wall_time = default_timer() - start
+        if solution.parameter_space is not None:
+            update(scenario, solution.parameter_space)
+        result.solver_time = timer.times["solver"]
+        result.encoding_time = timer.times["encoding"]
+    except Exception:
+        result.error = traceback.format_exc()
+    result.peak_rss_mb = _peak_rss_mb()
+    queue.put(("result", result.model_dump()))
+
+
+def run_case(
+    case: BenchmarkCase, solver: str, timeout: float
+) -> BenchmarkResult:
+    """
+    Run the case in a new process, which is terminated after timeout
+    seconds.
+    """
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_case, args=(case, solver, queue))
+    process.start()
+
+    result = None
+    curve = []
+    partial_result = BenchmarkResult(case=case.name, solver=solver)
+    timed_out = False
+    # The process imports funman before it starts the clock
+    deadline = default_timer() + timeout + 60
+    while result is None:
+        try:
+            kind, data = queue.get(
+                timeout=max(0.0, deadline - default_timer())
+            )
+        except Empty:
+            timed_out = process.is_alive()
+            process.terminate()
+            break
+        if kind == "coverage":
+            t, data = data
+            partial_result = BenchmarkResult.model_validate(data)
+            curve.append((t, partial_result.coverage))
+            if t > timeout:
+                timed_out = True
+                process.terminate()
+                break
+        else:
+            result = BenchmarkResult.model_validate(data)
+    process.join()
+
+    if result is None:
+        # Report the progress of the search up to the timeout
+        result = partial_result
+        result.timed_out = timed_out
+        if not result.timed_out:
+            result.error = (
+                f"Benchmark process exited with code {process.exitcode}"
+            )
+    result.coverage_curve = curve
+    elapsed = result.wall_time if result.wall_time else timeout
+    result.boxes_per_second = result.boxes_labeled / elapsed
+    return result
+
+
+def run(
+    cases: List[BenchmarkCase],
+    solvers: List[str],
+    timeout: float,
+    out_file: Optional[str] = None,
+) -> BenchmarkReport:
+    report = BenchmarkReport(created=str(datetime.datetime.now()))
+    for case in cases:
+        for solver in solvers:
+            l.info(f"Running case {case.name} with {solver}")
+            result = run_case(case, solver, timeout)
+            if result.error is not None:
+                l.error(
+                    f"Case {case.name} with {solver} failed:\n{result.error}"
+                )
+            report.results.append(result)
+            if out_file is not None:
+                # Keep the finished cases if the suite is interrupted
+                with open(out_file, "w") as f:
+                    f.write(report.model_dump_json(indent=4))
+    return report
+
+
+def compare(
+    baseline: BenchmarkReport, current: BenchmarkReport, threshold: float
+) -> Tuple[List[str], List[str]]:
+    """
+    Compare the metrics of the cases that ran in both reports.
+
+    Returns
+    -------
+    Tuple[List[str], List[str]]
+        the lines of a report of each case, and the regressions (changes for
+        the worse larger than the threshold, relative to the baseline)
+    """
+    base = {r.key(): r for r in baseline.results}
+    lines = []
+    regressions = []
+    for r in current.results:
+        b = base.get(r.key())
+        name = f"{r.case} ({r.solver})"
+        if b is None:
+            lines.append(f"{name}: not in baseline")
+            continue
+        if r.error is not None or b.error is not None:
+            lines.append(
+                f"{name}: failed in {'current' if r.error else 'baseline'}"
+            )
+            continue
+        if r.timed_out != b.timed_out:
+            message = f"{name}: timed out in {'current' if r.timed_out else 'baseline'}"
+            lines.append(message)
+            if r.timed_out:
+                regressions.append(message)
+            continue
+        for metric, larger_is_better in METRICS.items():
+            old, new = getattr(b, metric), getattr(r, metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old != 0 else 0.0
+            line = f"{name} {metric}: {old:.4g} -> {new:.4g} ({change:+.1%})"
+            lines.append(line)
+            worse = -change if larger_is_better else change
+            if worse > threshold:
+                regressions.append(line)
+    return lines, regressions
+
+
+def _load_report(path: str) -> BenchmarkReport:
+    with open(path, "r") as f:
+        return BenchmarkReport.model_validate(json.load(f))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="funman_benchmarks.suite",
+        description="Box search performance suite",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmark cases")
+    run_parser.add_argument(
+        "--case",
+        nargs="*",
+        default=["*"],
+        help="names (or glob patterns) of the cases to run",
+    )
+    run_parser.add_argument(
+        "--solver", nargs="*", default=["z3", "dreal"], help="solvers to use"
+    )
+    run_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=600.0,
+        help="time limit of each case, in seconds",
+    )
+    run_parser.add_argument(
+        "--out", default="benchmark.json", help="results file"
+    )
+    run_parser.add_argument(
+        "--baseline", default=None, help="baseline results to compare with"
+    )
+    run_parser.add_argument("--threshold", type=float, default=0.1)
+    run_parser.add_argument("--list", action="store_true")
+
+    compare_parser = commands.add_parser(
+        "compare", help="compare results with a baseline"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative change of a metric that counts as a regression",
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "run":
+        cases = [
+            c
+            for c in CASES
+            if any(fnmatch.fnmatch(c.name, p) for p in args.case)
+        ]
+        if args.list:
+            for c in cases:
+                print(f"{c.name}: {c.model} {c.request}")
+            return 0
+        current = run(cases, args.solver, args.timeout, out_file=args.out)
+        if args.baseline is None:
+            return 0
+        baseline = _load_report(args.baseline)
+    else:
+        baseline = _load_report(args.baseline)
+        current = _load_report(args.current)
+
+    lines, regressions = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regressions:")
+        print("\n".join(regressions))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
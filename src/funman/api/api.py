@@ -7,6 +7,7 @@ HTTPException
     HTTPException description
 """
 
+import asyncio
 import logging
 import traceback
 import uuid
@@ -20,14 +21,16 @@ from fastapi import (
     APIRouter,
     Depends,
     FastAPI,
+    Header,
     HTTPException,
     Request,
     Security,
     status,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.security import APIKeyHeader
 from typing_extensions import Annotated
 
@@ -41,7 +44,11 @@ from funman.model.petrinet import PetrinetModel
 from funman.model.regnet import RegnetModel
 from funman.server.exception import NotFoundFunmanException
 from funman.server.query import (
+    FunmanMetrics,
+    FunmanQueueStatus,
     FunmanResults,
+    FunmanResultsDelta,
+    FunmanResultsSummary,
     FunmanWorkRequest,
     FunmanWorkUnit,
 )
@@ -50,7 +57,11 @@ from funman.server.worker import FunmanWorker
 
 settings = Settings()
 _storage = Storage()
-_worker = FunmanWorker(_storage)
+_worker = FunmanWorker(
+    _storage,
+    max_concurrent=settings.funman_max_concurrent_queries,
+    encoding_cache=settings.funman_encoding_cache,
+)
 
 
 # Rig some services to run while the API is online
@@ -191,6 +202,122 @@ async def get_current(worker: Annotated[FunmanWorker, Depends(get_worker)]):
         return worker.get_current()
 
 
+@admin_router.get(
+    "/metrics",
+    response_model=FunmanMetrics,
+)
+async def get_metrics(worker: Annotated[FunmanWorker, Depends(get_worker)]):
+    with internal_error_handler():
+        return worker.get_metrics()
+
+
+@api_router.get(
+    "/queries/{query_id}/queue",
+    response_model=FunmanQueueStatus,
+    response_model_exclude_none=True,
+)
+async def get_queue_status(
+    query_id: str, worker: Annotated[FunmanWorker, Depends(get_worker)]
+):
+    with internal_error_handler():
+        try:
+            return worker.get_queue_status(query_id)
+        except NotFoundFunmanException as e:
+            raise HTTPException(404, detail=str(e))
+
+
+@api_router.get(
+    "/queries/{query_id}/summary",
+    response_model=FunmanResultsSummary,
+)
+async def get_queries_summary(
+    query_id: str, worker: Annotated[FunmanWorker, Depends(get_worker)]
+):
+    with internal_error_handler():
+        try:
+            return worker.get_results_summary(query_id)
+        except NotFoundFunmanException as e:
+            raise HTTPException(404, detail=str(e))
+
+
+@api_router.get(
+    "/queries/{query_id}/delta",
+    response_model=FunmanResultsDelta,
+    response_model_exclude_defaults=True,
+)
+async def get_queries_delta(
+    query_id: str,
+    worker: Annotated[FunmanWorker, Depends(get_worker)],
+    since: int = 0,
+    epoch: Optional[str] = None,
+):
+    with internal_error_handler():
+        try:
+            return worker.get_results_delta(query_id, since=since, epoch=epoch)
+        except NotFoundFunmanException as e:
+            raise HTTPException(404, detail=str(e))
+
+
+@api_router.get("/queries/{query_id}/stream")
+async def stream_queries(
+    query_id: str,
+    worker: Annotated[FunmanWorker, Depends(get_worker)],
+    since: int = 0,
+    epoch: Optional[str] = None,
+    interval: float = 1.0,
+    last_event_id: Annotated[Optional[str], Header()] = None,
+):
+    """
+    Stream the results deltas as Server-Sent Events, where the id of each
+    event is "<epoch>:<cursor>", until the query is done.  The worker
+    calls block, so they run in the thread pool rather than in the event
+    loop.
+    """
+    with internal_error_handler():
+        try:
+            await run_in_threadpool(worker.get_results_summary, query_id)
+        except NotFoundFunmanException as e:
+            raise HTTPException(404, detail=str(e))
+    if last_event_id is not None:
+        # Resume a stream after a reconnect
+        event_epoch, _, event_cursor = last_event_id.rpartition(":")
+        if event_cursor.isdigit():
+            epoch, since = event_epoch or None, int(event_cursor)
+
+    async def events():
+        cursor = since
+        cursor_epoch = epoch
+        progress = None
+        while True:
+            delta = await run_in_threadpool(
+                worker.get_results_delta,
+                query_id,
+                since=cursor,
+                epoch=cursor_epoch,
+            )
+            if (
+                delta.cursor != cursor
+                or delta.reset
+                or delta.done
+                or delta.progress.progress != progress
+            ):
+                data = delta.model_dump_json(
+                    by_alias=True, exclude_defaults=True
+                )
+                yield (
+                    f"id: {delta.epoch}:{delta.cursor}\n"
+                    f"event: delta\ndata: {data}\n\n"
+                )
+                cursor = delta.cursor
+                cursor_epoch = delta.epoch
+                progress = delta.progress.progress
+            if delta.done:
+                return
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @api_router.get(
     "/queries/{query_id}",
     response_model=FunmanResults,
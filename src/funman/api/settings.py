@@ -8,3 +8,8 @@ class Settings(BaseSettings):
     funman_admin_token: Optional[str] = None
     funman_api_token: Optional[str] = None
     funman_base_url: Optional[str] = None
+    # Number of queries that the worker runs at once
+    funman_max_concurrent_queries: int = 1
+    # Reuse the model encodings of the queries from a cache in the data path,
+    # which grows with every model that the server encodes
+    funman_encoding_cache: bool = False
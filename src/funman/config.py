@@ -126,12 +126,33 @@ class FUNMANConfig(BaseModel):
     uniform_box_splits: bool = False
     """ Uniformly split boxes in box search, instead of separating points in boxes """
 
+    reuse_lemmas: bool = True
+    """ Label a box without checking a query if a box that contains it has no true (or false) points at the same step """
+
+    interval_enclosure: bool = False
+    """ Label a box without checking a query if an interval enclosure of the states of its points satisfies (or violates) the constraints (unused with a series_approximation_threshold) """
+
+    monotonicity_analysis: bool = False
+    """ Label a box that the interval enclosure cannot label from the states at its corners, if the analysis of the sensitivity of the states to the parameters shows that they are monotone over the box (requires interval_enclosure) """
+
+    contract_boxes: bool = False
+    """ Narrow each box by constraint propagation over the model encoding before checking its queries, and label the parts of the box that it cuts away false """
+
+    schedule_refinement_levels: int = 0
+    """ Number of coarser schedules (with 2, 4, ..., 2 ** levels times fewer steps) that BoxSearch searches before each schedule, to label the boxes whose labels hold under the step error of a coarser schedule without checking their queries with the schedule (no refinement if 0) """
+
+    step_error_bound: Optional[float] = None
+    """ Bound on the difference between the states of a schedule and a coarser schedule for schedule refinement (required if schedule_refinement_levels > 0) """
+
     dreal_prefer_parameters: List[str] = []
     """ Prefer to split the listed parameters in dreal """
 
     point_based_evaluation: bool = False
     """ Evaluate parameters using point-based simulation over interval-based SMT encoding """
 
+    simulation_samples: int = 0
+    """ Number of points of each box (in addition to its corners) that BoxSearch simulates to find true and false points before calling the SMT solver (no simulation if 0, unless point_based_evaluation) """
+
     prioritize_box_entropy: bool = True
     """ When comparing boxes, prefer those with low entropy """
 
@@ -141,6 +162,12 @@ class FUNMANConfig(BaseModel):
     random_seed: int = 0
     """ Random seed """
 
+    encoding_cache: Optional[str] = None
+    """ Directory of a persistent cache for the translated model encoding (no cache if None) """
+
+    encoding_processes: int = 1
+    """ Number of processes that encode the transitions of the model before the search (encode each transition when it is first needed if 1) """
+
     @field_validator("solver")
     @classmethod
     def import_dreal(cls, v: str) -> str:
@@ -167,4 +194,9 @@ class FUNMANConfig(BaseModel):
                 os.path.dirname(self.save_smtlib)
             ), "save_smtlib option must be an existing path"
 
+        if self.schedule_refinement_levels > 0:
+            assert (
+                self.step_error_bound is not None
+            ), "Need to set step_error_bound in configuration to refine schedules.  The coarser schedules only label boxes for the schedule if the step error bound holds."
+
         return self
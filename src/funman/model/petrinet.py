@@ -1,9 +1,10 @@
 from difflib import SequenceMatcher
 from functools import reduce
-from typing import Callable, Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import graphviz
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import sympy
 from pydantic import BaseModel, ConfigDict
@@ -39,6 +40,10 @@ from .model import FunmanModel
 
 class AbstractPetriNetModel(FunmanModel):
     _is_differentiable: bool = True
+    _compiled_gradient: Optional[Tuple[Callable, Callable]] = None
+    _rates_functions: Optional[
+        Tuple[np.ndarray, Callable, Callable, bool]
+    ] = None
 
     def _num_flow_from_state_to_transition(
         self, state_id: Union[str, int], transition_id: Union[str, int]
@@ -255,43 +260,148 @@ class AbstractPetriNetModel(FunmanModel):
 
     def gradient(self, t, y, *p):
         # FIXME support time varying paramters by treating parameters as a function
-        var_to_value = {
-            var: y[i] for i, var in enumerate(self._state_var_names())
-        }
-        # print(f"y: {y}; t: {t}")
-        param_to_value = {
-            replace_reserved(param): p[i](t)[()]
-            for i, param in enumerate(self._parameter_names())
-        }
-        param_to_value["timer_t"] = t
-        # values = [
-        #     y[i] for i, _ in enumerate(self._symbols())
-        # ]
-        unreserved_symols = [replace_reserved(s) for s in self._symbols()]
-        params = [
-            param_to_value[str(p)]
-            for p in unreserved_symols
-            if str(p) in param_to_value
-        ]
+        gradient, _ = self.compiled_gradient()
+        params = [p[i](t)[()] for i, _ in enumerate(self._parameter_names())]
+        return gradient(t, y, *params).tolist()
 
-        grad = [
-            self.derivative(
-                var,
-                t,
-                y,
-                params,
-                var_to_value,
-                param_to_value,
-                get_lambda=True,
-            )  # var_to_value, param_to_value)
-            for var in self._state_var_names()
+    def _unreserved_symbols(self) -> List[str]:
+        return [replace_reserved(s) for s in self._symbols()]
+
+    def _stoichiometry(self) -> np.ndarray:
+        """
+        Net number of tokens that each transition moves into each state
+        variable, as a (state variables x transitions) matrix.
+        """
+        state_index = {var: i for i, var in enumerate(self._state_var_names())}
+        transitions = list(self._transitions())
+        stoichiometry = np.zeros((len(state_index), len(transitions)))
+        for j, trans in enumerate(transitions):
+            for var in trans.output:
+                stoichiometry[state_index[var], j] += 1
+            for var in trans.input:
+                stoichiometry[state_index[var], j] -= 1
+        return stoichiometry
+
+    def _rate_expressions(self) -> List[sympy.Expr]:
+        """
+        Rate of each transition, as a sympy expression over
+        self._unreserved_symbols().
+        """
+        # FIXME assumes each transition has only one rate
+        return [
+            (
+                self._transition_rate(trans)[0]
+                if len(self._transition_rate(trans)) > 0
+                else sympy.Integer(0)
+            )
+            for trans in self._transitions()
         ]
-        # print(f"vars: {self._state_var_names()}")
-        # print(f"gradient: {grad}")
-        assert not any(
-            [not isinstance(v, float) for v in grad]
-        ), f"Gradient has a non-float element: {grad}"
-        return grad
+
+    def _compiled_rates(self) -> Tuple[np.ndarray, Callable, Callable, bool]:
+        """
+        Compile the Petri net once into a stoichiometry matrix and NumPy
+        functions for the transition rates and their Jacobian with respect to
+        the state variables.
+
+        Returns
+        -------
+        Tuple[np.ndarray, Callable, Callable, bool]
+            stoichiometry matrix, rates(*y, *p[, t]), rates Jacobian(*y,
+            *p[, t]), and whether the rates take the time argument t.
+        """
+        if self._rates_functions is None:
+            stoichiometry = self._stoichiometry()
+            rates = self._rate_expressions()
+            unreserved_symbols = self._unreserved_symbols()
+            state_symbols = [
+                sympy.Symbol(replace_reserved(s))
+                for s in self._state_var_names()
+            ]
+            rates_jacobian = sympy.Matrix(rates).jacobian(state_symbols)
+            rates_fn = sympy.lambdify(unreserved_symbols, rates, cse=True)
+            rates_jacobian_fn = sympy.lambdify(
+                unreserved_symbols, rates_jacobian, cse=True
+            )
+            # Only models with a time variable have a rate argument for t
+            timed = len(unreserved_symbols) > len(
+                self._state_var_names()
+            ) + len(self._parameter_names())
+            self._rates_functions = (
+                stoichiometry,
+                rates_fn,
+                rates_jacobian_fn,
+                timed,
+            )
+        return self._rates_functions
+
+    def compiled_gradient(self) -> Tuple[Callable, Callable]:
+        """
+        Compile the right hand side of the model ODE (and its Jacobian) into
+        NumPy functions.  The Petri net is compiled once into a stoichiometry
+        matrix S and a vector of transition rates r(y, p, t), so that the
+        gradient is S @ r(y, p, t) and the Jacobian is S @ dr/dy.
+
+        Returns
+        -------
+        Tuple[Callable, Callable]
+            gradient(t, y, *p) and jacobian(t, y, *p), where y are the values
+            of self._state_var_names() and p are the values of
+            self._parameter_names().
+        """
+        if self._compiled_gradient is None:
+            (
+                stoichiometry,
+                rates_fn,
+                rates_jacobian_fn,
+                timed,
+            ) = self._compiled_rates()
+
+            def gradient(t, y, *p):
+                args = (*y, *p, t) if timed else (*y, *p)
+                return stoichiometry @ np.array(rates_fn(*args), dtype=float)
+
+            def jacobian(t, y, *p):
+                args = (*y, *p, t) if timed else (*y, *p)
+                return stoichiometry @ np.array(
+                    rates_jacobian_fn(*args), dtype=float
+                )
+
+            self._compiled_gradient = (gradient, jacobian)
+        return self._compiled_gradient
+
+    def batch_gradient(self, parameters: np.ndarray) -> Callable:
+        """
+        Build the right hand side of the ODE for a batch of N parameter
+        points, integrated together as one system with N x S state variables.
+
+        Parameters
+        ----------
+        parameters : np.ndarray
+            (N x P) array with one row of self._parameter_names() values per
+            point.
+
+        Returns
+        -------
+        Callable
+            gradient(t, y) where y is the flattened (N x S) array of state
+            variable values (row-major, one row per point).
+        """
+        stoichiometry, rates_fn, _, timed = self._compiled_rates()
+        num_points = parameters.shape[0]
+        num_vars = stoichiometry.shape[0]
+        columns = tuple(parameters.T)
+
+        def gradient(t, y):
+            states = tuple(np.reshape(y, (num_points, num_vars)).T)
+            args = (*states, *columns, t) if timed else (*states, *columns)
+            # Constant rates are scalars, so broadcast each rate to N values
+            rates = np.array(
+                [np.broadcast_to(r, (num_points,)) for r in rates_fn(*args)],
+                dtype=float,
+            ).reshape(stoichiometry.shape[1], num_points)
+            return (stoichiometry @ rates).T.ravel()
+
+        return gradient
 
 
 class GeneratedPetriNetModel(AbstractPetriNetModel):
@@ -364,6 +474,13 @@ class GeneratedPetriNetModel(AbstractPetriNetModel):
             symbols += [f"timer_{self._time_var().id}"]
         return symbols
 
+    def _unreserved_symbols(self) -> List[str]:
+        unreserved_symbols = [replace_reserved(s) for s in self._symbols()]
+        # convert "t" to "timer_t"
+        if unreserved_symbols[-1] == "t":
+            unreserved_symbols[-1] = self._time_var_id(self._time_var())
+        return unreserved_symbols
+
     def _get_init_value(
         self, var: str, scenario: "AnalysisScenario", config: "FUNMANConfig"
     ):
@@ -472,12 +589,7 @@ class GeneratedPetriNetModel(AbstractPetriNetModel):
                         )
                         for t in t_rates
                     ]
-                unreserved_symbols = [
-                    replace_reserved(s) for s in self._symbols()
-                ]
-                # convert "t" to "timer_t"
-                if unreserved_symbols[-1] == "t":
-                    unreserved_symbols[-1] = self._time_var_id(self._time_var())
+                unreserved_symbols = self._unreserved_symbols()
                 t_rates_lambda = [
                     sympy.lambdify(unreserved_symbols, t, cse=True)
                     for t in t_rates
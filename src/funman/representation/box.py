@@ -1,12 +1,11 @@
-import copy
 import logging
 from decimal import ROUND_CEILING, Decimal
 from functools import reduce
-from math import log2
+from math import log2, prod
 from pickle import FALSE
-from statistics import mean as average
-from typing import Dict, List, Literal, Optional, Union
+from typing import Dict, List, Literal, Optional, Set, Tuple, Union
 
+import numpy as np
 from numpy import nextafter
 from pydantic import BaseModel, Field
 
@@ -37,6 +36,8 @@ class Box(BaseModel):
     points: List[Point] = []
     _points_at_step: Dict[Timestep, List[Point]] = {}
     _prioritize_entropy: bool = False
+    # Steps at which the points of the box were sampled by simulation
+    _simulated_steps: Set[Timestep] = set()
 
     @staticmethod
     def from_point(
@@ -103,12 +104,49 @@ class Box(BaseModel):
     def __hash__(self):
         return int(sum([i.__hash__() for _, i in self.bounds.items()]))
 
+    def _copy(self) -> "Box":
+        """
+        Copy the box without deep copying its points, which the search treats
+        as immutable.  This is much cheaper than model_copy(deep=True) for
+        boxes with many points.
+        """
+        box = self.model_copy()
+        box.bounds = {p: i.model_copy() for p, i in self.bounds.items()}
+        box.points = list(self.points)
+        box.corner_points = list(self.corner_points)
+        box._points_at_step = {
+            step: list(pts) for step, pts in self._points_at_step.items()
+        }
+        box._simulated_steps = set()
+        return box
+
+    def restrict(self, parameter: str, interval: Interval) -> "Box":
+        """
+        Copy the box with interval as the bounds of parameter, and with the
+        points of the box that the copy contains.
+        """
+        box = self._copy()
+        box.bounds[parameter] = interval
+        interval.original_width = self.bounds[parameter].original_width
+        box.points = [
+            pt
+            for pt, contained in zip(
+                box.points, box._contains_points(box.points)
+            )
+            if contained
+        ]
+        box._points_at_step = {
+            step: [p for p in pts if p in box.points]
+            for step, pts in box._points_at_step.items()
+        }
+        return box
+
     def advance(self):
         # Advancing a box means that we move the time step forward until it exhausts the possible number of steps
         if self.timestep().lb == self.timestep().ub:
             return None
         else:
-            box: Box = self.model_copy(deep=True)
+            box: Box = self._copy()
             box.timestep().lb += 1
             # Remove points because they correspond to prior timesteps
             box.points = [
@@ -152,7 +190,7 @@ class Box(BaseModel):
 
     def current_step(self) -> "Box":
         # Restrict bounds on num_steps to the lower bound (i.e., the current step)
-        curr = self.model_copy(deep=True)
+        curr = self._copy()
         timestep = curr.timestep()
         timestep.closed_upper_bound = True
         timestep.ub = timestep.lb
@@ -174,7 +212,7 @@ class Box(BaseModel):
             projected box
 
         """
-        bp = copy.deepcopy(self)
+        bp = self._copy()
         if len(vars) > 0:
             if isinstance(vars[0], str):
                 bp.bounds = {k: v for k, v in bp.bounds.items() if k in vars}
@@ -304,61 +342,61 @@ class Box(BaseModel):
             H = -(p * log2(p)) - ((1.0 - p) * log2(1.0 - p))
         return H
 
-    def _lt_base_(self, other):
-        # print("b")
-        s_t = len(self.true_points())
-        o_t = len(other.true_points())
-
-        s_ts = self.timestep().lb
-        o_ts = other.timestep().lb
+    def _priority_key(self, entropy: bool) -> Tuple[float, float, float]:
+        """
+        Key for ordering boxes in the search queue, where boxes with a larger
+        key are expanded first.  The key is computed with floats, rather than
+        the Decimal widths of normalized_volume(), because the queue compares
+        boxes on every put and get.
 
-        s_nv = self.normalized_volume()
-        o_nv = other.normalized_volume()
+        Parameters
+        ----------
+        entropy : bool
+            order by the point entropy (weighted by the number of true
+            points) instead of the number of true points
 
-        if s_t == o_t:
-            if s_ts == o_ts:
-                return s_nv > o_nv
+        Returns
+        -------
+        Tuple[float, float, float]
+            (true points or entropy, timestep, normalized volume)
+        """
+        num_true = 0
+        num_false = 0
+        for pt in self.points:
+            if pt.label == LABEL_TRUE:
+                num_true += 1
+            elif pt.label == LABEL_FALSE:
+                num_false += 1
+
+        if entropy:
+            p = (
+                num_true / (num_true + num_false)
+                if (num_true + num_false) > 0
+                else 0.5
+            )
+            if p == 0.0 or p == 1.0:
+                H = 0.0
             else:
-                return s_ts > o_ts
+                H = -(p * log2(p)) - ((1.0 - p) * log2(1.0 - p))
+            first = (1.0 - H) * (num_true + 1)
         else:
-            return s_t > o_t
-
-    def _lt_entropy_(self, other):
-        # print("e")
-
-        s_t = len(self.true_points())
-        o_t = len(other.true_points())
+            first = num_true
 
-        s_et = (1.0 - self.point_entropy()) * (s_t + 1)
-        o_et = (1.0 - other.point_entropy()) * (o_t + 1)
+        norm_volume = prod(
+            (
+                (float(i.ub) - float(i.lb)) / float(i.original_width)
+                if i.original_width > 0.0
+                else 0.0
+            )
+            for i in self.bounds.values()
+        )
+        return (first, self.timestep().lb, norm_volume)
 
-        s_nv = self.normalized_volume()
-        o_nv = other.normalized_volume()
+    def _lt_base_(self, other):
+        return self._priority_key(False) > other._priority_key(False)
 
-        s_ts = self.timestep().lb
-        o_ts = other.timestep().lb
-        # return s_t < o_t
-        # if self.timestep().lb == other.timestep().lb:
-        #     if s_t == o_t:
-        if s_et == o_et:
-            if s_ts == o_ts:
-                return s_nv > o_nv
-            else:
-                return s_ts > o_ts
-        else:
-            return s_et > o_et
-
-        # if s_t == o_t:
-        #     if s_nv == o_nv:
-        #         return s_ts > o_ts
-        #     else:
-        #         return s_nv > o_nv
-        # else:
-        #     return s_t > o_t
-        #     else:
-        #         return s_t > o_t
-        # else:
-        #     return self.timestep().lb > other.timestep().lb
+    def _lt_entropy_(self, other):
+        return self._priority_key(True) > other._priority_key(True)
 
     def __lt__(self, other):
         if isinstance(other, Box):
@@ -455,6 +493,40 @@ class Box(BaseModel):
             ]
         )
 
+    def _contains_points(self, points: List[Point]) -> List[bool]:
+        """
+        Check contains_point() for many points at once, comparing the point
+        values to the bounds as arrays.
+
+        Parameters
+        ----------
+        points : List[Point]
+            points
+
+        Returns
+        -------
+        List[bool]
+            whether the box contains each point
+        """
+        if len(points) == 0:
+            return []
+        intervals = list(self.bounds.values())
+        try:
+            lb = np.array([i.lb for i in intervals], dtype=float)
+            ub = np.array([i.ub for i in intervals], dtype=float)
+            values = np.array(
+                [[pt.values[p] for p in self.bounds] for pt in points],
+                dtype=float,
+            )
+        except (TypeError, ValueError):
+            # Symbolic bounds or values
+            return [self.contains_point(pt) for pt in points]
+        closed = np.array([i.closed_upper_bound for i in intervals])
+        contained = (values >= lb) & np.where(
+            closed, values <= ub, values < ub
+        )
+        return contained.all(axis=1).tolist()
+
     def equal(
         self, b2: "Box", param_list: List[str] = None
     ) -> bool:  ## added 11/27/22 DMI
@@ -566,51 +638,30 @@ class Box(BaseModel):
             parameter (dimension of box) where points are most distant from the center of the box.
         """
         parameter_names = [p.name for p in parameters if p.is_synthesized()]
-        group_centers = {
-            p: [
-                average([pt.values[p] for pt in grp])
-                for grp in points
-                if len(grp) > 0
-            ]
-            for p in self.bounds
-            if p in parameter_names
-        }
-        centers = {
-            p: average(grp) for p, grp in group_centers.items() if len(grp) > 0
-        }
-        # print(points)
-        # print(centers)
-        point_distances = [
-            {
-                p: Decimal(abs(pt.values[p] - centers[p]))
-                for p in pt.values
-                if p in centers
-            }
+        dimensions = [p for p in self.bounds if p in parameter_names]
+        groups = [
+            np.array(
+                [[pt.values[p] for p in dimensions] for pt in grp],
+                dtype=float,
+            )
             for grp in points
-            for pt in grp
             if len(grp) > 0
         ]
+        if len(dimensions) == 0 or len(groups) == 0:
+            return None
+
+        # Mean distance of the points from the center of the group centers
+        centers = np.mean([grp.mean(axis=0) for grp in groups], axis=0)
+        distances = np.abs(np.concatenate(groups) - centers).mean(axis=0)
 
-        parameter_widths = {
-            p: average([pt[p] for pt in point_distances])
-            for p in self.bounds
-            if p in parameter_names
-        }
         parameter_widths = {
             p: (
-                v / self.bounds[p].original_width
+                float(d) / float(self.bounds[p].original_width)
                 if self.bounds[p].original_width > 0.0
                 else 0.0
             )
-            for p, v in parameter_widths.items()
+            for p, d in zip(dimensions, distances)
         }
-
-        # normalized_parameter_widths = {
-        #     p: average([pt[p] for pt in point_distances])
-        #     / (self.bounds[p].width())
-        #     for p in self.bounds
-        #     if self.bounds[p].width() > 0
-        # }
         max_width_parameter = max(
             parameter_widths, key=lambda k: parameter_widths[k]
         )
@@ -821,7 +872,9 @@ class Box(BaseModel):
                 )
                 if mid == self.bounds[p].lb or mid == self.bounds[p].ub:
                     # Fall back to box midpoint if point-based mid is degenerate
-                    p = self._get_max_width_Parameter(parameter=parameters)
+                    p = self._get_max_width_Parameter(
+                        normalize=normalize, parameters=parameters
+                    )
                     mid = self.bounds[p].midpoint()
 
         if p is None:
@@ -830,35 +883,21 @@ class Box(BaseModel):
             )
             mid = self.bounds[p].midpoint()
 
-        b1 = self.model_copy(deep=True)
-        b2 = self.model_copy(deep=True)
-
         # b1 is lower half
-        assert math_utils.lte(b1.bounds[p].lb, mid)
-        b1.bounds[p] = Interval(lb=b1.bounds[p].lb, ub=mid)
-        b1.bounds[p].original_width = self.bounds[p].original_width
-        b1.points = [pt for pt in b1.points if b1.contains_point(pt)]
-        b1._points_at_step = {
-            step: [p for p in pts if p in b1.points]
-            for step, pts in b1._points_at_step.items()
-        }
+        assert math_utils.lte(self.bounds[p].lb, mid)
+        b1 = self.restrict(p, Interval(lb=self.bounds[p].lb, ub=mid))
 
         # b2 is upper half
-        assert math_utils.lte(mid, b2.bounds[p].ub)
-        b2.bounds[p] = Interval(lb=mid, ub=b2.bounds[p].ub)
-        b2.bounds[p].original_width = self.bounds[p].original_width
-        b2.points = [pt for pt in b2.points if b2.contains_point(pt)]
-        b2._points_at_step = {
-            step: [p for p in pts if p in b2.points]
-            for step, pts in b2._points_at_step.items()
-        }
+        assert math_utils.lte(mid, self.bounds[p].ub)
+        b2 = self.restrict(p, Interval(lb=mid, ub=self.bounds[p].ub))
 
-        l.debug(
-            f"Split[{self.timestep()}]({p}[{self.bounds[p].lb, mid}][{mid, self.bounds[p].ub}])"
-        )
-        l.debug(
-            f"widths: {self.width(parameters=parameters):.5f} -> {b1.width(parameters=parameters):.5f} {b2.width():.5f} (raw), {self.normalized_width(parameters=parameters):.5f} -> {b1.normalized_width(parameters=parameters):.5f} {b2.normalized_width(parameters=parameters):.5f} (norm)"
-        )
+        if l.isEnabledFor(logging.DEBUG):
+            l.debug(
+                f"Split[{self.timestep()}]({p}[{self.bounds[p].lb, mid}][{mid, self.bounds[p].ub}])"
+            )
+            l.debug(
+                f"widths: {self.width(parameters=parameters):.5f} -> {b1.width(parameters=parameters):.5f} {b2.width():.5f} (raw), {self.normalized_width(parameters=parameters):.5f} -> {b1.normalized_width(parameters=parameters):.5f} {b2.normalized_width(parameters=parameters):.5f} (norm)"
+            )
         return [b2, b1]
 
     def symm_diff(b1: "Box", b2: "Box"):
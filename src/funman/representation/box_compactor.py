@@ -0,0 +1,176 @@
+"""
+This module defines the BoxCompactor class, which merges adjacent boxes as
+they are added.
+"""
+
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from .box import Box
+from .interval import Interval
+
+FaceKey = Tuple[Hashable, ...]
+
+
+class BoxCompactor(object):
+    """
+    The BoxCompactor maintains a set of boxes where no two boxes can be
+    merged.  Two boxes can be merged if they have the same schedule, are
+    equal in all dimensions but one, and meet in the remaining dimension
+    (i.e., one box has an upper bound equal to the lower bound of the other).
+    The merge joins the intervals of the meeting dimension.
+
+    Each box is hashed by its lower and upper face in every dimension, where
+    the key of a face is the dimension, the position of the face, and the
+    bounds of the box in the other dimensions.  The boxes that can merge with
+    a box along a dimension are the boxes whose opposite face has the same
+    key, so adding a box takes a constant number of lookups per dimension
+    (and per merge that it causes), rather than a scan of the other boxes.
+    """
+
+    def __init__(self):
+        self._boxes: Dict[int, Box] = {}
+        # ids of the boxes created by merges
+        self._merged: Set[int] = set()
+        # face key -> {id(box): box}
+        self._lower_faces: Dict[FaceKey, Dict[int, Box]] = {}
+        self._upper_faces: Dict[FaceKey, Dict[int, Box]] = {}
+
+    def __reduce__(self):
+        # Boxes are tracked by id(), so copies and pickles rebuild the faces
+        return (BoxCompactor._from_boxes, (self.boxes(),))
+
+    @staticmethod
+    def _from_boxes(boxes: List[Box]) -> "BoxCompactor":
+        compactor = BoxCompactor()
+        for box in boxes:
+            compactor.add(box)
+        return compactor
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def boxes(self) -> List[Box]:
+        """
+        Get the compacted boxes.  Later merges do not modify the boxes that
+        are returned.
+        """
+        self._merged.clear()
+        return list(self._boxes.values())
+
+    def add(self, box: Box) -> Box:
+        """
+        Add a box, merging it with any box that it can be merged with, and
+        then merging the result, until no merge is possible.  The boxes that
+        are added are not modified.  Merges create new boxes, or update the
+        boxes created by earlier merges (including the box returned by an
+        earlier call).
+
+        Parameters
+        ----------
+        box : Box
+            box to add
+
+        Returns
+        -------
+        Box
+            the box that contains box after the merges
+        """
+        while True:
+            merge = self._find_merge(box)
+            if merge is None:
+                break
+            other, p = merge
+            self._remove(other)
+            box = self._merge(box, other, p)
+        self._insert(box)
+        return box
+
+    @staticmethod
+    def _schedule_key(box: Box) -> Optional[Tuple]:
+        return tuple(box.schedule.timepoints) if box.schedule else None
+
+    def _faces(self, box: Box) -> List[Tuple[str, FaceKey, FaceKey]]:
+        """
+        Get the (dimension, lower face key, upper face key) for each
+        dimension of box.
+        """
+        schedule = self._schedule_key(box)
+        bounds = sorted(
+            (p, interval.lb, interval.ub) for p, interval in box.bounds.items()
+        )
+        faces = []
+        for i, (p, lb, ub) in enumerate(bounds):
+            others = tuple(bounds[:i] + bounds[i + 1 :])
+            faces.append(
+                (
+                    p,
+                    (schedule, p, lb, others),
+                    (schedule, p, ub, others),
+                )
+            )
+        return faces
+
+    def _find_merge(self, box: Box) -> Optional[Tuple[Box, str]]:
+        for p, lower, upper in self._faces(box):
+            interval = box.bounds[p]
+            if interval.lb == interval.ub:
+                # Equal point intervals are not adjacent
+                continue
+            # A box whose lower face is on the upper face of box, or
+            # vice versa
+            for faces, key in [
+                (self._lower_faces, upper),
+                (self._upper_faces, lower),
+            ]:
+                candidates = faces.get(key)
+                if candidates:
+                    return next(iter(candidates.values())), p
+        return None
+
+    def _merge(self, box: Box, other: Box, p: str) -> Box:
+        lower, upper = (
+            (box, other)
+            if box.bounds[p].ub == other.bounds[p].lb
+            else (other, box)
+        )
+        interval = Interval(
+            lb=lower.bounds[p].lb,
+            ub=upper.bounds[p].ub,
+            closed_upper_bound=upper.bounds[p].closed_upper_bound,
+        )
+
+        # Update a box created by an earlier merge in place, so that merging
+        # a long run of boxes does not copy the points of the run every time.
+        if id(other) in self._merged:
+            merged, source = other, box
+        elif id(box) in self._merged:
+            merged, source = box, other
+        else:
+            merged, source = box.model_copy(), other
+            merged.bounds = dict(box.bounds)
+            merged.points = list(box.points)
+            merged.corner_points = []
+            merged._points_at_step = {}
+            self._merged.add(id(merged))
+        self._merged.discard(id(source))
+        merged.bounds[p] = interval
+        merged.points.extend(source.points)
+        return merged
+
+    def _insert(self, box: Box):
+        self._boxes[id(box)] = box
+        for _, lower, upper in self._faces(box):
+            self._lower_faces.setdefault(lower, {})[id(box)] = box
+            self._upper_faces.setdefault(upper, {})[id(box)] = box
+
+    def _remove(self, box: Box):
+        del self._boxes[id(box)]
+        for _, lower, upper in self._faces(box):
+            for faces, key in [
+                (self._lower_faces, lower),
+                (self._upper_faces, upper),
+            ]:
+                bucket = faces[key]
+                del bucket[id(box)]
+                if len(bucket) == 0:
+                    del faces[key]
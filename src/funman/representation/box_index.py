@@ -0,0 +1,294 @@
+"""
+This module defines the BoxIndex class, an R-tree over the bounds of boxes.
+"""
+
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..constants import NEG_INFINITY, POS_INFINITY
+from . import Point
+from .box import Box
+
+Rectangle = Tuple[Tuple[float, ...], Tuple[float, ...]]
+
+# Bound on the extent of a dimension when comparing the size of rectangles,
+# so that unbounded intervals do not overflow the sums.
+_MAX_EXTENT = 1e150
+
+
+class _Entry(object):
+    __slots__ = ("lb", "ub", "box")
+
+    def __init__(self, lb, ub, box):
+        self.lb = lb
+        self.ub = ub
+        self.box = box
+
+
+class _Node(object):
+    __slots__ = ("leaf", "parent", "children", "lb", "ub")
+
+    def __init__(self, leaf: bool, parent: Optional["_Node"] = None):
+        self.leaf = leaf
+        self.parent = parent
+        self.children = []
+        self.lb = None
+        self.ub = None
+
+    def update_bounds(self):
+        if len(self.children) == 0:
+            self.lb = self.ub = None
+        else:
+            self.lb = tuple(map(min, zip(*(c.lb for c in self.children))))
+            self.ub = tuple(map(max, zip(*(c.ub for c in self.children))))
+
+
+def _overlaps(lb1, ub1, lb2, ub2) -> bool:
+    return all(
+        l1 <= u2 and l2 <= u1 for l1, u1, l2, u2 in zip(lb1, ub1, lb2, ub2)
+    )
+
+
+def _margin(lb, ub) -> float:
+    return sum(
+        min(u, _MAX_EXTENT) - max(l, -_MAX_EXTENT) for l, u in zip(lb, ub)
+    )
+
+
+def _enlargement(node, entry) -> float:
+    lb = tuple(map(min, node.lb, entry.lb))
+    ub = tuple(map(max, node.ub, entry.ub))
+    return _margin(lb, ub) - _margin(node.lb, node.ub)
+
+
+class BoxIndex(object):
+    """
+    The BoxIndex is an R-tree over the bounds of a set of boxes that finds
+    the boxes whose bounds overlap a point or another box in logarithmic time
+    (for disjoint boxes).  The index treats every interval as closed, so the
+    queries return a superset of the boxes that contain the point or
+    intersect the box, and the callers check the candidates with the Box
+    methods.
+
+    Parameters
+    ----------
+    dimensions : List[str]
+        names of the dimensions (box bounds) that are indexed
+    denormalize_bounds : bool, optional
+        index the unnormalized bounds of the boxes, if they have them, by
+        default False
+    max_entries : int, optional
+        maximum number of children of a node, by default 16
+    """
+
+    def __init__(
+        self,
+        dimensions: List[str],
+        denormalize_bounds: bool = False,
+        max_entries: int = 16,
+    ):
+        self.dimensions = list(dimensions)
+        self.denormalize_bounds = denormalize_bounds
+        self.max_entries = max_entries
+        self.min_entries = max(2, max_entries // 4)
+        self._root = _Node(leaf=True)
+        self._leaves: Dict[int, _Node] = {}
+
+    def __reduce__(self):
+        # Boxes are tracked by id(), so copies and pickles rebuild the tree
+        return (
+            BoxIndex._from_boxes,
+            (
+                self.dimensions,
+                self.denormalize_bounds,
+                self.max_entries,
+                self.boxes(),
+            ),
+        )
+
+    @staticmethod
+    def _from_boxes(
+        dimensions: List[str],
+        denormalize_bounds: bool,
+        max_entries: int,
+        boxes: List[Box],
+    ) -> "BoxIndex":
+        index = BoxIndex(
+            dimensions,
+            denormalize_bounds=denormalize_bounds,
+            max_entries=max_entries,
+        )
+        for box in boxes:
+            index.insert(box)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._leaves)
+
+    def __contains__(self, box: Box) -> bool:
+        return id(box) in self._leaves
+
+    def _box_rectangle(self, box: Box) -> Rectangle:
+        lb = []
+        ub = []
+        for p in self.dimensions:
+            interval = box.bounds.get(p)
+            if interval is None:
+                lb.append(NEG_INFINITY)
+                ub.append(POS_INFINITY)
+                continue
+            i_lb, i_ub = interval.lb, interval.ub
+            if self.denormalize_bounds:
+                # Same fallback as Interval.contains_value()
+                i_lb = interval.unnormalized_lb or i_lb
+                i_ub = interval.unnormalized_ub or i_ub
+            lb.append(min(i_lb, i_ub))
+            ub.append(max(i_lb, i_ub))
+        return tuple(lb), tuple(ub)
+
+    def _point_rectangle(self, point: Point) -> Rectangle:
+        values = [point.values.get(p) for p in self.dimensions]
+        lb = tuple(NEG_INFINITY if v is None else v for v in values)
+        ub = tuple(POS_INFINITY if v is None else v for v in values)
+        return lb, ub
+
+    def insert(self, box: Box):
+        """
+        Add a box to the index.  The box bounds must not change while the
+        box is in the index.
+        """
+        lb, ub = self._box_rectangle(box)
+        self._insert_entry(_Entry(lb, ub, box))
+
+    def _insert_entry(self, entry: _Entry):
+        node = self._root
+        while not node.leaf:
+            node = min(
+                node.children,
+                key=lambda c: (_enlargement(c, entry), _margin(c.lb, c.ub)),
+            )
+        node.children.append(entry)
+        self._leaves[id(entry.box)] = node
+        self._adjust(node)
+
+    def _adjust(self, node: _Node):
+        while node is not None:
+            if len(node.children) > self.max_entries:
+                sibling = self._split(node)
+                if node.parent is None:
+                    root = _Node(leaf=False)
+                    root.children = [node, sibling]
+                    node.parent = sibling.parent = root
+                    self._root = root
+                else:
+                    node.parent.children.append(sibling)
+                    sibling.parent = node.parent
+                sibling.update_bounds()
+            node.update_bounds()
+            node = node.parent
+
+    def _split(self, node: _Node) -> _Node:
+        """
+        Move half of the children of node to a new sibling node, splitting
+        along the dimension where the centers of the children are most
+        spread out.
+        """
+
+        def center(c, i):
+            return (
+                max(c.lb[i], -_MAX_EXTENT) + min(c.ub[i], _MAX_EXTENT)
+            ) / 2.0
+
+        spread = [
+            max(center(c, i) for c in node.children)
+            - min(center(c, i) for c in node.children)
+            for i in range(len(self.dimensions))
+        ]
+        if len(spread) > 0:
+            dim = max(range(len(spread)), key=lambda i: spread[i])
+            children = sorted(node.children, key=lambda c: center(c, dim))
+        else:
+            children = node.children
+        half = len(children) // 2
+        sibling = _Node(leaf=node.leaf, parent=node.parent)
+        node.children = children[:half]
+        sibling.children = children[half:]
+        for c in sibling.children:
+            if node.leaf:
+                self._leaves[id(c.box)] = sibling
+            else:
+                c.parent = sibling
+        return sibling
+
+    def remove(self, box: Box) -> bool:
+        """
+        Remove a box from the index.
+
+        Returns
+        -------
+        bool
+            whether the box was in the index
+        """
+        leaf = self._leaves.pop(id(box), None)
+        if leaf is None:
+            return False
+        leaf.children = [e for e in leaf.children if e.box is not box]
+
+        # Remove underfull nodes and reinsert their entries
+        orphans = []
+        node = leaf
+        while node.parent is not None:
+            parent = node.parent
+            if len(node.children) < self.min_entries:
+                parent.children.remove(node)
+                orphans += self._entries(node)
+            else:
+                node.update_bounds()
+            node = parent
+        node.update_bounds()
+        while not self._root.leaf and len(self._root.children) == 1:
+            self._root = self._root.children[0]
+            self._root.parent = None
+        if not self._root.leaf and len(self._root.children) == 0:
+            self._root = _Node(leaf=True)
+
+        for entry in orphans:
+            del self._leaves[id(entry.box)]
+        for entry in orphans:
+            self._insert_entry(entry)
+        return True
+
+    def _entries(self, node: _Node) -> List[_Entry]:
+        if node.leaf:
+            return list(node.children)
+        return [e for c in node.children for e in self._entries(c)]
+
+    def _search(
+        self, lb: Sequence[float], ub: Sequence[float]
+    ) -> Iterator[Box]:
+        if self._root.lb is None:
+            return
+        stack = [self._root]
+        while len(stack) > 0:
+            node = stack.pop()
+            for c in node.children:
+                if _overlaps(c.lb, c.ub, lb, ub):
+                    if node.leaf:
+                        yield c.box
+                    else:
+                        stack.append(c)
+
+    def boxes(self) -> List[Box]:
+        return [e.box for e in self._entries(self._root)]
+
+    def overlapping(self, box: Box) -> List[Box]:
+        """
+        Boxes whose (closed) bounds overlap the (closed) bounds of box.  These
+        include the boxes that intersect box and the boxes that meet box.
+        """
+        return list(self._search(*self._box_rectangle(box)))
+
+    def containing(self, point: Point) -> List[Box]:
+        """
+        Boxes whose (closed) bounds contain the point.
+        """
+        return list(self._search(*self._point_rectangle(point)))
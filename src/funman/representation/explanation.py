@@ -91,6 +91,69 @@ class BoxExplanation(Explanation):
         return self.explain()
 
 
+class SimulationExplanation(BoxExplanation):
+    """
+    The box is labeled by the simulation of its sampled points, which all
+    have the same label.
+    """
+
+    num_points: int = 0
+
+    def explain(self) -> Dict[str, Any]:
+        return {
+            "description": f"The {self.num_points} simulated points of the box have the same label",
+        }
+
+
+class EnclosureExplanation(BoxExplanation):
+    """
+    The box is labeled by an interval enclosure of the trajectories of its
+    points, which shows that the points all have the same label.
+    """
+
+    def explain(self) -> Dict[str, Any]:
+        return {
+            "description": "The interval enclosure of the trajectories of the box points shows that they have the same label",
+        }
+
+
+class MonotonicityExplanation(BoxExplanation):
+    """
+    The box is labeled by the states at its corners, which bound the states
+    of its points because the states are monotone in the parameters over the
+    box.
+    """
+
+    def explain(self) -> Dict[str, Any]:
+        return {
+            "description": "The states of the box points are monotone in the parameters, and the states at the corners of the box show that the points have the same label",
+        }
+
+
+class PropagationExplanation(BoxExplanation):
+    """
+    The box is labeled false by constraint propagation over the model
+    encoding, which shows that the box has no true points.
+    """
+
+    def explain(self) -> Dict[str, Any]:
+        return {
+            "description": "Propagating the box bounds through the model encoding shows that the box has no true points",
+        }
+
+
+class CoarseScheduleExplanation(BoxExplanation):
+    """
+    The box is labeled by the search of a coarser schedule, with the
+    constraints shifted by the step error of the coarser schedule.
+    """
+
+    def explain(self) -> Dict[str, Any]:
+        return {
+            "description": "The search of a coarser schedule, with constraints tightened (or loosened) by its step error, shows that the box points have the same label",
+        }
+
+
 class ParameterSpaceExplanation(Explanation):
     true_explanations: List[BoxExplanation] = []
     false_explanations: List[BoxExplanation] = []
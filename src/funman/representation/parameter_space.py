@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 from matplotlib import pyplot as plt
 from matplotlib.lines import Line2D
@@ -15,6 +15,8 @@ from ..constants import (
 )
 from . import Interval, Point
 from .box import Box
+from .box_compactor import BoxCompactor
+from .box_index import BoxIndex
 from .interval import Interval
 
 l = logging.getLogger(__name__)
@@ -26,6 +28,12 @@ class ParameterSpace(BaseModel):
     returned by the parameter synthesis feature of FUNMAN. These parameter spaces
     are represented as a collection of boxes that are either known to be true or
     known to be false.
+
+    The true and false boxes are indexed by a BoxIndex (per label) for the
+    point and box queries.  The indices are updated lazily with the boxes
+    appended to true_boxes and false_boxes, and rebuilt if the lists are
+    replaced or shrink.  A BoxCompactor (per label) is maintained the same way
+    for compacting the boxes.
     """
 
     num_dimensions: int = None
@@ -33,6 +41,11 @@ class ParameterSpace(BaseModel):
     false_boxes: List[Box] = []
     unknown_points: List[Point] = []
 
+    # (label, denormalize_bounds) -> (indexed list, indexed length, index)
+    _box_indices: Dict[Tuple[str, bool], Tuple[List[Box], int, BoxIndex]] = {}
+    # label -> (compacted list, compacted length, compactor)
+    _box_compactors: Dict[str, Tuple[List[Box], int, BoxCompactor]] = {}
+
     def __str__(self, dropped_boxes=[]) -> str:
         box_labels = {
             LABEL_TRUE: "+",
@@ -286,6 +299,161 @@ class ParameterSpace(BaseModel):
         else:
             l.error(f"Skipping invalid object type: {type(inst)}")
 
+    def _box_index(
+        self, label: str, denormalize_bounds: bool = False
+    ) -> BoxIndex:
+        """
+        Get the index of the boxes with label, after adding any boxes that
+        were appended since the last query.
+        """
+        boxes = self.true_boxes if label == LABEL_TRUE else self.false_boxes
+        key = (label, denormalize_bounds)
+        indexed = self._box_indices.get(key)
+        if (
+            indexed is None
+            or indexed[0] is not boxes
+            or indexed[1] > len(boxes)
+            or indexed[1] == 0
+        ):
+            dimensions = list(boxes[0].bounds.keys()) if len(boxes) > 0 else []
+            index = BoxIndex(dimensions, denormalize_bounds=denormalize_bounds)
+            start = 0
+        else:
+            _, start, index = indexed
+        for box in boxes[start:]:
+            index.insert(box)
+        self._box_indices[key] = (boxes, len(boxes), index)
+        return index
+
+    def _box_compactor(self, label: str) -> BoxCompactor:
+        """
+        Get the compactor of the boxes with label, after adding any boxes that
+        were appended since the last compaction.
+        """
+        boxes = self.true_boxes if label == LABEL_TRUE else self.false_boxes
+        compacted = self._box_compactors.get(label)
+        if (
+            compacted is None
+            or compacted[0] is not boxes
+            or compacted[1] > len(boxes)
+        ):
+            compactor = BoxCompactor()
+            start = 0
+        else:
+            _, start, compactor = compacted
+        for box in boxes[start:]:
+            compactor.add(box)
+        self._box_compactors[label] = (boxes, len(boxes), compactor)
+        return compactor
+
+    def _compacted_boxes(self, label: str) -> List[Box]:
+        """
+        Compact the boxes with label, and keep the compactor for the boxes
+        appended to the compacted list.
+        """
+        compactor = self._box_compactor(label)
+        boxes = compactor.boxes()
+        self._box_compactors[label] = (boxes, len(boxes), compactor)
+        return boxes
+
+    def _reset_box_caches(self):
+        """
+        Drop the box indices and compactors, e.g., after the box bounds or
+        points change.
+        """
+        self._box_indices = {}
+        self._box_compactors = {}
+
+    def boxes_containing(
+        self,
+        point: Point,
+        label: Optional[str] = None,
+        denormalize_bounds: bool = False,
+    ) -> List[Box]:
+        """
+        Get the boxes that contain a point.
+
+        Parameters
+        ----------
+        point : Point
+            a point
+        label : Optional[str], optional
+            only consider boxes with the label (LABEL_TRUE or LABEL_FALSE), by
+            default both
+        denormalize_bounds : bool, optional
+            use the unnormalized box bounds (see Box.contains_point()), by
+            default False
+
+        Returns
+        -------
+        List[Box]
+            boxes that contain the point
+        """
+        labels = [LABEL_TRUE, LABEL_FALSE] if label is None else [label]
+        return [
+            box
+            for lab in labels
+            for box in self._box_index(
+                lab, denormalize_bounds=denormalize_bounds
+            ).containing(point)
+            if box.contains_point(point, denormalize_bounds=denormalize_bounds)
+        ]
+
+    def intersecting_boxes(
+        self, box: Box, label: Optional[str] = None
+    ) -> List[Box]:
+        """
+        Get the boxes that intersect box (see Box.intersects()).
+
+        Parameters
+        ----------
+        box : Box
+            a box
+        label : Optional[str], optional
+            only consider boxes with the label (LABEL_TRUE or LABEL_FALSE), by
+            default both
+
+        Returns
+        -------
+        List[Box]
+            boxes that intersect box
+        """
+        labels = [LABEL_TRUE, LABEL_FALSE] if label is None else [label]
+        return [
+            b
+            for lab in labels
+            for b in self._box_index(lab).overlapping(box)
+            if b.intersects(box)
+        ]
+
+    def adjacent_boxes(
+        self, box: Box, label: Optional[str] = None
+    ) -> List[Box]:
+        """
+        Get the boxes that touch box without intersecting it, i.e., that share
+        (part of) a face, an edge or a corner with box.
+
+        Parameters
+        ----------
+        box : Box
+            a box
+        label : Optional[str], optional
+            only consider boxes with the label (LABEL_TRUE or LABEL_FALSE), by
+            default both
+
+        Returns
+        -------
+        List[Box]
+            boxes adjacent to box
+        """
+        labels = [LABEL_TRUE, LABEL_FALSE] if label is None else [label]
+        return [
+            b
+            for lab in labels
+            for b in self._box_index(lab).overlapping(box)
+            if b is not box and not (b.intersects(box) or box.intersects(b))
+        ]
+
     def consistent(self) -> bool:
         """
         Check that the parameter space is consistent:
@@ -297,16 +465,19 @@ class ParameterSpace(BaseModel):
         * No point is both true and false
         """
         boxes = self.true_boxes + self.false_boxes
+        positions = {id(b): i for i, b in enumerate(boxes)}
         for i1, b1 in enumerate(boxes):
-            for i2, b2 in enumerate(boxes[i1 + 1 :]):
-                if b1.intersects(b2):
+            for b2 in self._box_index(LABEL_TRUE).overlapping(
+                b1
+            ) + self._box_index(LABEL_FALSE).overlapping(b1):
+                if positions[id(b2)] > i1 and b1.intersects(b2):
                     l.error(f"Parameter Space Boxes intersect: {b1} {b2}")
                     return False
         for tp in self.true_points():
-            if not any([b.contains_point(tp) for b in self.true_boxes]):
+            if len(self.boxes_containing(tp, label=LABEL_TRUE)) == 0:
                 return False
         for fp in self.false_points():
-            if not any([b.contains_point(fp) for b in self.false_boxes]):
+            if len(self.boxes_containing(fp, label=LABEL_FALSE)) == 0:
                 return False
 
         if (
@@ -321,24 +492,28 @@ class ParameterSpace(BaseModel):
         Intersect two parameter spaces.
         """
         result = ParameterSpace(num_dimensions=self.num_dimensions)
-        true_result = []
-        false_result = []
-        ps1_boxes = self.true_boxes
-        ps2_boxes = ps2.true_boxes
-        for i1, b1 in enumerate(ps1_boxes):
-            for i2, b2 in enumerate(ps2_boxes):
-                if b1.intersects(b2):
-                    true_result.append(b1.intersection(b2))
-        result.true_boxes = true_result
-        ps1_boxes = self.false_boxes
-        ps2_boxes = ps2.false_boxes
-        for i1, b1 in enumerate(ps1_boxes):
-            for i2, b2 in enumerate(ps2_boxes):
-                if b1.intersects(b2):
-                    false_result.append(b1.intersection(b2))
-        result.false_boxes = false_result
+        result.true_boxes = self._intersect_box_lists(
+            self.true_boxes, ps2.true_boxes, ps2._box_index(LABEL_TRUE)
+        )
+        result.false_boxes = self._intersect_box_lists(
+            self.false_boxes, ps2.false_boxes, ps2._box_index(LABEL_FALSE)
+        )
         return result
 
+    @staticmethod
+    def _intersect_box_lists(
+        ps1_boxes: List[Box], ps2_boxes: List[Box], ps2_index: BoxIndex
+    ) -> List[Box]:
+        positions = {id(b): i for i, b in enumerate(ps2_boxes)}
+        return [
+            b1.intersection(b2)
+            for b1 in ps1_boxes
+            for b2 in sorted(
+                ps2_index.overlapping(b1), key=lambda b: positions[id(b)]
+            )
+            if b1.intersects(b2)
+        ]
+
     def _reassign_point_labels(self) -> None:
         """
         For every point, update the label based on the box that contains it.
@@ -347,32 +522,35 @@ class ParameterSpace(BaseModel):
             set(self.true_points() + self.false_points())
         )
         boxes: List[Box] = self.true_boxes + self.false_boxes
-        assigned_points = set([])
+        positions = {id(b): i for i, b in enumerate(boxes)}
         for box in boxes:
             box.points = []
-            for point in iter(
-                pt for pt in points if pt not in assigned_points
-            ):
-                if box.contains_point(point, denormalize_bounds=True):
-                    point.label = box.label
-                    box.points.append(point)
-                    assigned_points.add(point)
 
-        self.unknown_points = [
-            pt for pt in points if pt not in assigned_points
-        ]
+        # Assign each point to the first box that contains it
+        unknown_points = []
+        for point in points:
+            containing = self.boxes_containing(point, denormalize_bounds=True)
+            if len(containing) > 0:
+                box = min(containing, key=lambda b: positions[id(b)])
+                point.label = box.label
+                box.points.append(point)
+            else:
+                unknown_points.append(point)
+        self.unknown_points = unknown_points
+        self._box_compactors = {}
 
     def _denormalize(self):
         boxes: List[Box] = self.true_boxes + self.false_boxes
         for box in boxes:
             box._denormalize()
+        self._reset_box_caches()
 
     def _compact(self):
         """
         Compact the boxes by joining boxes that can create a box
         """
-        self.true_boxes = self._box_list_compact(self.true_boxes)
-        self.false_boxes = self._box_list_compact(self.false_boxes)
+        self.true_boxes = self._compacted_boxes(LABEL_TRUE)
+        self.false_boxes = self._compacted_boxes(LABEL_FALSE)
 
     def labeled_volume(self, scenario: "AnalysisScenario" = None):
         # self._compact()
@@ -401,7 +579,7 @@ class ParameterSpace(BaseModel):
         return labeled_vol
 
     def max_true_volume(self):
-        self.true_boxes = self._box_list_compact(self.true_boxes)
+        self.true_boxes = self._compacted_boxes(LABEL_TRUE)
         max_vol = 0
         max_box = (self.true_boxes)[0]
         for box in self.true_boxes:
@@ -411,42 +589,3 @@ class ParameterSpace(BaseModel):
                 max_box = box
 
         return max_vol, max_box
-
-    def _box_list_compact(self, group: List[Box]) -> List[Box]:
-        """
-        Attempt to union adjacent boxes and remove duplicate points.
-        """
-        # Boxes of dimension N can be merged if they are equal in N-1 dimensions and meet in one dimension.
-        # Sort the boxes in each dimension by upper bound.
-        # Interate through boxes in order wrt. one of the dimensions. For each box, scan the dimensions, counting the number of dimensions that each box meeting in at least one dimension, meets.
-        # Merging a dimension where lb(I) = ub(I'), results in an interval I'' = [lb(I), lb(I')].
-
-        if len(group) <= 0:
-            return []
-
-        dimensions = group[0].bounds.keys()
-        # keep a sorted list of boxes by dimension based upon the upper bound in the dimension
-        sorted_dimensions = {p: [b for b in group] for p in dimensions}
-        for p, boxes in sorted_dimensions.items():
-            boxes.sort(key=lambda x: x.bounds[p].ub)
-        dim = next(iter(sorted_dimensions.keys()))
-        merged = True
-        while merged:
-            merged = False
-            for b in sorted_dimensions[dim]:
-                # candidates for merge are all boxes that meet or are equal in a dimension
-                candidates = b._get_merge_candidates(sorted_dimensions)
-                # pick first candidate
-                if len(candidates) > 0:
-                    c = next(iter(candidates))
-                    m = b._merge(c)
-                    sorted_dimensions = {
-                        p: [
-                            box if box != b else m for box in boxes if box != c
-                        ]
-                        for p, boxes in sorted_dimensions.items()
-                    }
-                    merged = True
-                    break
-
-        return sorted_dimensions[dim]
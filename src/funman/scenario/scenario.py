@@ -47,6 +47,7 @@ from funman.representation.parameter import NumSteps, Schedules, StepSize
 from funman.search.simulate import Simulator, Timeseries
 from funman.translate.translate import EncodingOptions
 from funman.utils import math_utils
+from funman.utils.metrics import MODEL_ENCODING, PhaseMetrics
 from funman.utils.sympy_utils import replace_reserved, to_sympy
 
 from ..representation import Point
@@ -84,6 +85,8 @@ class AnalysisScenario(ABC, BaseModel):
     # Encoding for different step sizes (key)
     _encodings: Optional[Dict["Schedule", "Encoding"]] = {}
     _original_parameter_widths: Dict[str, Decimal] = {}
+    # Time spent in the phases of the analysis
+    _phase_metrics: PhaseMetrics = PhaseMetrics()
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -122,6 +125,7 @@ class AnalysisScenario(ABC, BaseModel):
 
     def initialize(self, config: "FUNMANConfig") -> "Search":
         search = self.get_search(config)
+        self._phase_metrics = PhaseMetrics()
         self._process_parameters()
 
         self.constraints += [
@@ -145,7 +149,8 @@ class AnalysisScenario(ABC, BaseModel):
                     if cc.soft:
                         self._assumptions.append(Assumption(constraint=cc))
 
-        self._initialize_encodings(config)
+        with self._phase_metrics.phase(MODEL_ENCODING):
+            self._initialize_encodings(config)
 
         self._original_parameter_widths = {
             p.name: p.interval.original_width for p in self.model_parameters()
@@ -177,6 +182,7 @@ class AnalysisScenario(ABC, BaseModel):
                 self, len(schedule.timepoints)
             )
             self._encodings[schedule] = encoding
+        self._smt_encoder.encode_transitions(self)
 
     def num_dimensions(self):
         """
@@ -11,13 +11,15 @@ import threading
 import traceback
 from datetime import datetime
 from functools import partial
-from multiprocessing import Queue, Value
-from multiprocessing.synchronize import Condition, Event, Lock
+from multiprocessing import Array, Queue, Value
+from multiprocessing.synchronize import Event
 from queue import Empty
 from queue import PriorityQueue as PQueueSP
 from queue import Queue as QueueSP
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
+import numpy as np
 from pydantic import BaseModel, ConfigDict
 from pysmt.formula import FNode
 from pysmt.logics import QF_NRA
@@ -48,20 +50,66 @@ from funman.representation.assumption import Assumption
 from funman.representation.constraint import ParameterConstraint
 from funman.representation.explanation import (
     BoxExplanation,
+    CoarseScheduleExplanation,
+    EnclosureExplanation,
     Explanation,
+    MonotonicityExplanation,
+    PropagationExplanation,
+    SimulationExplanation,
     TimeoutExplanation,
 )
+from funman.representation.interval import Interval
 from funman.search import Box, ParameterSpace, Point, Search, SearchEpisode
-from funman.search.search import SearchStaticsMP, SearchStatistics
+from funman.search.contractor import BoxContractor
+from funman.search.enclosure import IntervalEnclosure
+from funman.search.monotonicity import MonotonicityAnalysis
+from funman.search.schedule_refinement import (
+    RobustLabels,
+    ScheduleRefinement,
+)
+from funman.search.search import SearchStatistics
+from funman.search.simulation_filter import (
+    DEFAULT_SIMULATION_SAMPLES,
+    SimulationFilter,
+)
 from funman.translate.translate import EncodingOptions, EncodingSchedule
+from funman.utils.handlers import NoopResultHandler
+from funman.utils.logging import TRACE
+from funman.utils.metrics import (
+    BOX_ENCODING,
+    CHECK_ASSUMPTIONS,
+    CONTRACTION,
+    ENCLOSURE,
+    FALSE_QUERY,
+    MODEL_ENCODING,
+    MONOTONICITY,
+    PROGRESS_CALLBACK,
+    RESULT_HANDLER,
+    SCHEDULE_REFINEMENT,
+    SPLIT,
+    TRUE_QUERY,
+    PhaseMetrics,
+)
 from funman.utils.smtlib_utils import smtlibscript_from_formula_list
 
 l = logging.getLogger(__name__)
 
+# Fraction of the width of a box that the contractor must cut away from a side
+# of the box to label it false
+MIN_CONTRACTION = 0.01
+# Fraction of the magnitude of a contracted bound (or of the box width, if it
+# is greater) that the contracted box is widened by
+CONTRACTION_MARGIN = 1e-6
+# Expander processes send their phase metrics at most this often (seconds)
+METRICS_INTERVAL = 1.0
+# Maximum number of lemmas that a LemmaStore keeps for each step and label
+MAX_LEMMAS_PER_STEP = 1024
+
 
 class FormulaStackFrame(BaseModel):
     _formulas: List[FNode] = []
     _simplified_formulas: List[FNode] = []
+    _assumptions: List[FNode] = []
 
     model_config = ConfigDict(
         arbitrary_types_allowed=True,
@@ -85,6 +133,7 @@ class FormulaStack(BaseModel):
     time: int = -2
     _solver: Optional[Solver] = None
     _substitutions: Dict[FNode, FNode] = None
+    _native_assumptions: bool = True
 
     model_config = ConfigDict(
         arbitrary_types_allowed=True,
@@ -128,13 +177,30 @@ class FormulaStack(BaseModel):
         else:
             self._solver.add_assertion(formula)
 
+    def assume(self, literals: List[FNode]):
+        """
+        Assume the literals until the current frame is popped.  If the solver
+        cannot check assumptions, then the literals are asserted instead.
+        """
+        if self._native_assumptions:
+            self.formula_stack[self.time + 1]._assumptions.extend(literals)
+        else:
+            self.add_assertion(And(literals))
+
+    def assumptions(self) -> Optional[List[FNode]]:
+        assumptions = [a for sf in self.formula_stack for a in sf._assumptions]
+        return assumptions if len(assumptions) > 0 else None
+
     def to_list(self, simplified=False) -> List[FNode]:
         if simplified:
-            return [
+            formulas = [
                 f for sf in self.formula_stack for f in sf._simplified_formulas
             ]
         else:
-            return [f for sf in self.formula_stack for f in sf._formulas]
+            formulas = [f for sf in self.formula_stack for f in sf._formulas]
+        return formulas + [
+            a for sf in self.formula_stack for a in sf._assumptions
+        ]
 
     def compute_assignment(
         self, episode: SearchEpisode, _smtlib_save_fn: Callable = None
@@ -153,7 +219,7 @@ class FormulaStack(BaseModel):
         if _smtlib_save_fn:
             _smtlib_save_fn(filename=f"box_search_{episode._iteration}")
 
-        if not self._solver.solve():
+        if not self._solver.solve(self.assumptions()):
             raise Exception(
                 f"Could not compute Assignment from simplified formulas"
             )
@@ -162,6 +228,170 @@ class FormulaStack(BaseModel):
         return result
 
 
+class IncrementalStepEncoding(BaseModel):
+    """
+    The IncrementalStepEncoding tracks the layers of the model encoding (the
+    constraints at each step of the schedule) that are asserted to a solver.
+    Each layer is asserted once, at the bottom of the formula stack, as:
+
+    solve_step_t => layer_t
+
+    so that every box can reuse it.  A check selects its depth with the
+    assumptions from activation() instead of asserting or retracting layers.
+    """
+
+    depth: int = -1
+
+    def symbol(self, step: int) -> FNode:
+        return Symbol(f"solve_step_{step}", BOOL)
+
+    def extend(
+        self,
+        formula_stack: FormulaStack,
+        step: int,
+        encode_layer: Callable[[int], FNode],
+    ):
+        """
+        Assert the layers up to and including step that are not yet asserted.
+
+        Parameters
+        ----------
+        formula_stack : FormulaStack
+            formula stack without any pushed frames
+        step : int
+            deepest step to encode
+        encode_layer : Callable[[int], FNode]
+            function returning the layer at a step
+        """
+        for t in range(self.depth + 1, step + 1):
+            formula_stack.add_assertion(
+                Implies(self.symbol(t), encode_layer(t))
+            )
+            self.depth = t
+
+    def activation(self, step: int) -> List[FNode]:
+        """
+        Literals that activate the layers up to and including step and
+        deactivate the deeper asserted layers.
+        """
+        return [self.symbol(t) for t in range(step + 1)] + [
+            Not(self.symbol(t)) for t in range(step + 1, self.depth + 1)
+        ]
+
+
+class LemmaStore(BaseModel):
+    """
+    The LemmaStore keeps the unsatisfiable true and false queries of a
+    search.  Each is a lemma that a region of the parameters (a box) has no
+    true (or false) points at a step, and its explanation (the unsat core).
+    The lemma also holds for every box in the region, such as the boxes that
+    splitting the box produces, so the search reuses it instead of checking
+    the query for them.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    parameters: List[str]
+    # (label of the points, step) -> [(region, explanation)]
+    _lemmas: Dict[Tuple[str, int], List[Tuple[Box, BoxExplanation]]] = {}
+
+    def add(self, label: str, box: Box, explanation: BoxExplanation):
+        """
+        Record that box has no points with the label at box.timestep().lb.
+        """
+        region = box.project(self.parameters)
+        key = (label, int(box.timestep().lb))
+        # Drop the lemmas that the new lemma subsumes
+        lemmas = [
+            (r, e)
+            for r, e in self._lemmas.get(key, [])
+            if not region.contains(r)
+        ]
+        lemmas.append((region, explanation))
+        self._lemmas[key] = lemmas[-MAX_LEMMAS_PER_STEP:]
+
+    def explanation(self, label: str, box: Box) -> Optional[BoxExplanation]:
+        """
+        Get the explanation of a lemma that box has no points with the label
+        at box.timestep().lb, if any.
+        """
+        lemmas = self._lemmas.get((label, int(box.timestep().lb)))
+        if not lemmas:
+            return None
+        region = box.project(self.parameters)
+        for r, explanation in reversed(lemmas):
+            if r.contains(region):
+                return explanation
+        return None
+
+
+class PointStore(BaseModel):
+    """
+    The PointStore indexes the true and false points that a search finds by
+    their label and step, so that any box can reuse the points that it
+    contains at its step, including the points found for its ancestors,
+    siblings, and the boxes at other steps.  The parameter values of the
+    points with the same label and step are rows of an array, which find()
+    compares to the bounds of a box at once.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    parameters: List[str]
+    # (label, step) -> points and their parameter values (with spare rows)
+    _points: Dict[Tuple[str, int], List[Point]] = {}
+    _values: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def add(self, point: Point):
+        try:
+            row = [float(point.values[p]) for p in self.parameters]
+        except (KeyError, TypeError, ValueError):
+            # The point does not assign a value to every parameter
+            return
+        key = (point.label, point.timestep())
+        points = self._points.setdefault(key, [])
+        values = self._values.get(key)
+        if values is None:
+            values = np.empty((16, len(self.parameters)))
+        elif len(points) == len(values):
+            values = np.concatenate([values, np.empty_like(values)])
+        values[len(points)] = row
+        self._values[key] = values
+        points.append(point)
+
+    def find_all(self, label: str, box: Box) -> List[Point]:
+        """
+        Get the points with the label at box.timestep().lb that are in the
+        box.
+        """
+        key = (label, int(box.timestep().lb))
+        points = self._points.get(key)
+        if not points:
+            return []
+        intervals = [box.bounds[p] for p in self.parameters]
+        try:
+            lb = np.array([i.lb for i in intervals], dtype=float)
+            ub = np.array([i.ub for i in intervals], dtype=float)
+        except (TypeError, ValueError):
+            return []
+        closed = np.array([i.closed_upper_bound for i in intervals]) | (
+            lb == ub
+        )
+        values = self._values[key][: len(points)]
+        contained = (values >= lb) & np.where(
+            closed, values <= ub, values < ub
+        )
+        return [points[i] for i in np.flatnonzero(contained.all(axis=1))]
+
+    def find(self, label: str, box: Box) -> Optional[Point]:
+        """
+        Get the most recent point with the label at box.timestep().lb that
+        is in the box, if any.
+        """
+        points = self.find_all(label, box)
+        return points[-1] if len(points) > 0 else None
+
+
 class BoxSearchEpisode(SearchEpisode):
     """
     A BoxSearchEpisode stores the data required to organize a BoxSearch, including intermediate data and results. It takes as input:
@@ -170,8 +400,6 @@ class BoxSearchEpisode(SearchEpisode):
 
     * problem: a ParameterSynthesisScenario to solve
 
-    * manager: a SyncManager for coordinating multiple search processes that is used to declare several shared data
-
     A BoxSearchEpisode mainly tracks the true, false, and unknown boxes generated by the BoxSearch, along with statistics on the search.
     """
 
@@ -182,25 +410,81 @@ class BoxSearchEpisode(SearchEpisode):
 
     _true_boxes: List[Box] = []
     _false_boxes: List[Box] = []
-    _true_points: Set[Point] = set({})
-    _false_points: Set[Point] = set({})
+    _points: Optional[PointStore] = None
     _unknown_boxes: PQueueSP
     _iteration: int = 0
     _formula_stack: FormulaStack = FormulaStack()
+    _step_encoding: IncrementalStepEncoding = IncrementalStepEncoding()
+    _simulation_filter: Optional[SimulationFilter] = None
+    _enclosure: Optional[IntervalEnclosure] = None
+    _monotonicity: Optional[MonotonicityAnalysis] = None
+    _contractor: Optional[BoxContractor] = None
+    _metrics: PhaseMetrics = None
+    _lemmas: Optional[LemmaStore] = None
+    _robust_labels: Optional[RobustLabels] = None
     schedule: EncodingSchedule
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._unknown_boxes = PQueueSP()
         self.statistics = SearchStatistics()
+        self._metrics = self.problem._phase_metrics
+        # The points are denormalized, unlike the boxes
+        if not self.config.normalize:
+            self._points = PointStore(
+                parameters=[p.name for p in self.problem.model_parameters()]
+            )
+        if self.config.reuse_lemmas:
+            self._lemmas = LemmaStore(
+                parameters=[p.name for p in self.problem.model_parameters()]
+            )
+        # funman_dreal cannot check assumptions
+        self._formula_stack._native_assumptions = self.config.solver != "dreal"
         if self.config.substitute_subformulas and self.config.simplify_query:
             self._formula_stack._substitutions = self.problem._encodings[
                 self.schedule
             ]._encoder.substitutions(self.schedule)
+        samples = self.config.simulation_samples or (
+            DEFAULT_SIMULATION_SAMPLES
+            if self.config.point_based_evaluation
+            else 0
+        )
+        # The simulated points are not normalized
+        if samples > 0 and not self.config.normalize:
+            self._simulation_filter = SimulationFilter(
+                problem=self.problem,
+                schedule=self.schedule,
+                samples=samples,
+                seed=self.config.random_seed,
+            )
+        # The enclosure is over the denormalized parameters and the exact
+        # rates, so it is unsound if the encoding approximates the rates
+        threshold = self.config.series_approximation_threshold
+        if (
+            self.config.interval_enclosure
+            and not self.config.normalize
+            and (threshold is None or threshold <= 0)
+        ):
+            self._enclosure = IntervalEnclosure(
+                problem=self.problem, schedule=self.schedule
+            )
+            if self.config.monotonicity_analysis:
+                self._monotonicity = MonotonicityAnalysis(
+                    enclosure=self._enclosure
+                )
+        if self.config.contract_boxes and not self.config.normalize:
+            self._contractor = BoxContractor(problem=self.problem)
 
     def get_candiate_point(self, box: Box) -> Point:
         return None
 
+    def _metrics_record(self, force: bool = False) -> Optional[PhaseMetrics]:
+        """
+        Metrics to report to the main process, which already has the metrics
+        of a single process search.
+        """
+        return None
+
     def get_candidate_boxes_for_point(self, point: Point) -> List[Box]:
         return []
 
@@ -230,10 +514,7 @@ class BoxSearchEpisode(SearchEpisode):
             # l.debug(f"Initial box: {b}")
 
     def _on_start(self):
-        if self.config.number_of_processes > 1:
-            self.statistics._last_time.value = str(datetime.now())
-        else:
-            self.statistics._last_time = str(datetime.now())
+        self.statistics._last_time = str(datetime.now())
 
     # def close(self):
     #     if self.multiprocessing:
@@ -242,10 +523,7 @@ class BoxSearchEpisode(SearchEpisode):
     #         self.boxes_to_plot.close()
 
     def _on_iteration(self):
-        if self.config.number_of_processes > 1:
-            self._iteration.value = self._iteration.value + 1
-        else:
-            self._iteration = self._iteration + 1
+        self._iteration = self._iteration + 1
 
     def _add_unknown_box(self, box: Box) -> bool:
         if (
@@ -257,10 +535,7 @@ class BoxSearchEpisode(SearchEpisode):
         ):
             box.label = LABEL_UNKNOWN
             self._unknown_boxes.put(box)
-            if self.config.number_of_processes > 1:
-                self.statistics._num_unknown.value += 1
-            else:
-                self.statistics._num_unknown += 1
+            self.statistics._num_unknown += 1
             return True
         else:
             box.label = LABEL_DROPPED
@@ -287,11 +562,9 @@ class BoxSearchEpisode(SearchEpisode):
         self, box: Box, point: Point, explanation: Explanation = None
     ):
         l.trace(f"Adding false point: {point}")
-        if point in self._true_points:
-            l.trace(
-                f"Point: {point} is marked false, but already marked true."
-            )
         point.label = LABEL_FALSE
+        if self._points is not None:
+            self._points.add(point)
 
     def _add_true(self, box: Box, explanation: Explanation = None):
         box.label = LABEL_TRUE
@@ -303,28 +576,33 @@ class BoxSearchEpisode(SearchEpisode):
 
     def _add_true_point(self, box: Box, point: Point):
         l.trace(f"Adding true point: {point}")
-        if point in self._false_points:
-            l.trace(
-                f"Point: {point} is marked true, but already marked false."
-            )
         point.label = LABEL_TRUE
+        if self._points is not None:
+            self._points.add(point)
 
     def _get_unknown(self):
         box = self._unknown_boxes.get(timeout=self.config.queue_timeout)
-        if self.config.number_of_processes > 1:
-            self.statistics._num_unknown.value = (
-                self.statistics._num_unknown.value - 1
-            )
-            self.statistics._current_residual.value = box.normalized_width()
-        else:
-            self.statistics._num_unknown += 1
-            self.statistics._current_residual = box.normalized_width()
+        self.statistics._num_unknown -= 1
+        self.statistics._current_residual = box.normalized_width()
         self.statistics._residuals.put(box.normalized_width())
         this_time = datetime.now()
         # FIXME self.statistics.iteration_time.put(this_time - self.statistics.last_time.value)
         # FIXME self.statistics.last_time[:] = str(this_time)
         return box
 
+    def _complete_unknown(self):
+        """
+        Mark the box most recently returned by _get_unknown() as expanded.
+        """
+        self._unknown_boxes.task_done()
+
+    def _result_record(self, result: Union[Box, Point]):
+        """
+        Convert a box or point into the record that is put on the results
+        queue, or None if it should not be reported.
+        """
+        return result.model_dump()
+
     def _get_box_to_plot(self):
         return self.boxes_to_plot.get(timeout=self.config.queue_timeout)
 
@@ -354,19 +632,125 @@ class BoxSearchEpisode(SearchEpisode):
         return point
 
 
+class WorkStealingBoxQueue(object):
+    """
+    The WorkStealingBoxQueue is the unknown box queue of a single BoxSearch
+    expander process.  Each expander keeps its boxes in a local priority queue
+    (so that it can keep its solver warm on the boxes it produces) and shares
+    three structures with its peers:
+
+    * inboxes: one queue per expander that peers use to hand over boxes
+
+    * hungry: one flag per expander that is set while it has no boxes
+
+    * outstanding: the number of boxes that are queued, in transit, or being
+      expanded by any expander
+
+    An expander that runs out of boxes raises its hungry flag and waits on its
+    inbox.  Expanders with more than one box donate their best box to a hungry
+    peer whenever they add or claim a box.  The search is finished when no box
+    is outstanding.
+    """
+
+    def __init__(
+        self,
+        idx: int,
+        inboxes: List[Queue],
+        hungry: Array,
+        outstanding: Value,
+    ):
+        self._idx = idx
+        self._inboxes = inboxes
+        self._hungry = hungry
+        self._outstanding = outstanding
+        self._boxes = PQueueSP()
+
+    def put(self, box: Box):
+        with self._outstanding.get_lock():
+            self._outstanding.value += 1
+        self._boxes.put(box)
+        self._share()
+
+    def get(self, timeout: Optional[float] = None) -> Box:
+        self._receive()
+        if self._boxes.empty():
+            self._set_hungry(True)
+            try:
+                self._boxes.put(self._inboxes[self._idx].get(timeout=timeout))
+            finally:
+                self._set_hungry(False)
+            self._receive()
+        self._share()
+        return self._boxes.get_nowait()
+
+    def qsize(self) -> int:
+        return self._boxes.qsize()
+
+    def task_done(self):
+        with self._outstanding.get_lock():
+            self._outstanding.value -= 1
+
+    def finished(self) -> bool:
+        return self._outstanding.value <= 0
+
+    def _receive(self):
+        inbox = self._inboxes[self._idx]
+        while True:
+            try:
+                self._boxes.put(inbox.get_nowait())
+            except Empty:
+                break
+
+    def _set_hungry(self, hungry: bool):
+        with self._hungry.get_lock():
+            self._hungry[self._idx] = 1 if hungry else 0
+
+    def _share(self):
+        while self._boxes.qsize() > 1:
+            with self._hungry.get_lock():
+                peer = next(
+                    (
+                        i
+                        for i, h in enumerate(self._hungry)
+                        if h and i != self._idx
+                    ),
+                    None,
+                )
+                if peer is None:
+                    return
+                self._hungry[peer] = 0
+            self._inboxes[peer].put(self._boxes.get_nowait())
+
+
 class BoxSearchEpisodeMP(BoxSearchEpisode):
-    model_config = ConfigDict()
+    """
+    A BoxSearchEpisodeMP is the copy of a BoxSearchEpisode that is owned by a
+    single expander process.  It draws boxes from a WorkStealingBoxQueue and
+    reports labeled boxes and points as objects rather than dictionaries.
+    """
 
-    statistics: SearchStaticsMP = None
-    _unknown_boxes: Queue
-    _iteration: Value = None
+    _unknown_boxes: WorkStealingBoxQueue
+    _last_metrics_time: float = 0.0
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        manager = kwargs["manager"]
-        self._unknown_boxes = manager.Queue()
-        self._iteration = manager.Value("i", 0)
-        self.statistics = SearchStaticsMP(manager=kwargs["manager"])
+        self._unknown_boxes = kwargs["unknown_boxes"]
+        # The metrics of the expander, which it sends to the main process
+        self._metrics = PhaseMetrics()
+
+    def _result_record(self, result: Union[Box, Point]):
+        # Unknown boxes are only reported to support plotting, which is not
+        # possible while several expanders are running.
+        if result.label == LABEL_UNKNOWN:
+            return None
+        return result
+
+    def _metrics_record(self, force: bool = False) -> Optional[PhaseMetrics]:
+        now = perf_counter()
+        if not force and now - self._last_metrics_time < METRICS_INTERVAL:
+            return None
+        self._last_metrics_time = now
+        return self._metrics.drain()
 
 
 class BoxSearch(Search):
@@ -375,29 +759,33 @@ class BoxSearch(Search):
     """
 
     def _split(self, box: Box, episode: BoxSearchEpisode, points=None):
-        normalize = episode.problem._original_parameter_widths
-        split_points = (
-            points if not episode.config.uniform_box_splits else None
-        )
-        b1, b2 = box.split(
-            points=split_points,
-            normalize=normalize,
-            parameters=episode.problem.model_parameters(),
-        )
-        episode.statistics._iteration_operation.put("s")
-        bw = box.volume(
-            normalize=normalize, parameters=episode.problem.model_parameters()
-        )
-        b1w = b1.volume(
-            normalize=normalize, parameters=episode.problem.model_parameters()
-        )
-        b2w = b2.volume(
-            normalize=normalize, parameters=episode.problem.model_parameters()
-        )
-        l.trace(
-            f"Split box with volume = {bw:.5f} into boxes with volumes = [{b1w:.5f}, {b2w:.5f}]"
-        )
-        return episode._add_unknown([b1, b2])
+        with episode._metrics.phase(SPLIT):
+            normalize = episode.problem._original_parameter_widths
+            split_points = (
+                points if not episode.config.uniform_box_splits else None
+            )
+            b1, b2 = box.split(
+                points=split_points,
+                normalize=normalize,
+                parameters=episode.problem.model_parameters(),
+            )
+            episode.statistics._iteration_operation.put("s")
+            bw = box.volume(
+                normalize=normalize,
+                parameters=episode.problem.model_parameters(),
+            )
+            b1w = b1.volume(
+                normalize=normalize,
+                parameters=episode.problem.model_parameters(),
+            )
+            b2w = b2.volume(
+                normalize=normalize,
+                parameters=episode.problem.model_parameters(),
+            )
+            l.trace(
+                f"Split box with volume = {bw:.5f} into boxes with volumes = [{b1w:.5f}, {b2w:.5f}]"
+            )
+            return episode._add_unknown([b1, b2])
 
     def _logger(self, config, process_name=None):
         if config.number_of_processes > 1:
@@ -411,46 +799,23 @@ class BoxSearch(Search):
             l = logging.getLogger(process_name)
         return l
 
-    def _handle_empty_queue(
-        self, process_name, episode, more_work, idle_mutex, idle_flags
-    ):
+    def _handle_empty_queue(self, process_name, episode):
         if episode.config.number_of_processes > 1:
-            # set this processes idle flag and check all the other process idle flags
-            # doing so under the idle_mutex to ensure the flags are not under active change
-            with idle_mutex:
-                idle_flags[id].set()
-                should_exit = all(f.is_set() for f in idle_flags)
-
-            # all worker processes appear to be idle
-            if should_exit:
-                # one last check to see if there is work to be done
-                # which would be an error at this point in the code
-                if episode._unknown_boxes.qsize() != 0:
-                    l.error(
-                        f"{process_name} found more work while preparing to exit"
-                    )
-                    return False
+            # Another expander may still produce work by splitting the boxes
+            # that it holds, so only exit once no box is outstanding.
+            if episode._unknown_boxes.finished():
                 l.info(f"{process_name} is exiting")
-                # tell other worker processing to check again with the expectation
-                # that they will also resolve to exit
-                with more_work:
-                    more_work.notify()
-                # break of the while True and allow the process to exit
                 return True
-
-            # wait for notification of more work
-            l.info(f"{process_name} is awaiting work")
-            with more_work:
-                more_work.wait()
-
-            # clear the current processes idle flag under the idle_mutex
-            with idle_mutex:
-                idle_flags[id].clear()
-
+            l.trace(f"{process_name} is awaiting work")
             return False
         else:
             return True
 
+    def _put_result(self, rval, episode: BoxSearchEpisode, result):
+        record = episode._result_record(result)
+        if record is not None:
+            rval.put(record)
+
     def _simplify_formula(
         self,
         formula: FNode,
@@ -470,13 +835,15 @@ class BoxSearch(Search):
         box: Box,
     ):
         """
-        The formula encoding the model M is of the form:
+        Assert the layers of the model encoding that the box needs (up to
+        box.timestep().lb) and are not yet asserted to the solver.  Each
+        layer encodes the constraints at step t as:
 
-        AM <=> M
+        solve_step_t => layer_t
 
-        where AM is a symbol denoting whether we assume M is true.  With this formula we can push/pop AM or Not(AM) to assert M or Not(M) without popping M.  Similarly we also assert the query as:
-
-        AQ <==> Q
+        where solve_step_t is an activation literal.  The layers are asserted
+        once per solver and the checks select the steps that hold by assuming
+        the activation literals (see IncrementalStepEncoding).
 
         Parameters
         ----------
@@ -484,83 +851,215 @@ class BoxSearch(Search):
             pysmt solver object
         episode : episode
             data for the current search
+        options : EncodingOptions
+            encoding options
+        box : Box
+            box to encode the model for
         """
+        with episode._metrics.phase(MODEL_ENCODING):
+            episode._step_encoding.extend(
+                episode._formula_stack,
+                int(box.timestep().lb),
+                partial(self._encode_layer, episode, options, box),
+            )
 
-        if box is None:
-            # Signal to pop the formula stack to the start
-            time_difference = -episode._formula_stack.time
-        else:
-            time_difference = box.timestep().lb - episode._formula_stack.time
-
-        # if time_difference < 0:
-        #     # Prepare the formula stack by popping irrelevant layers
-        #     for i in range(abs(int(time_difference - 1))):
-        #         episode._formula_stack.pop()
-
-        # el
-        if time_difference > 0:
-            # Prepare the formulas for each added layer
-            layer_formulas = []
-            encoding = episode.problem._encodings[box.schedule]
-            # model_encoding = episode.problem._model_encoding[step_size]
-            # model_encoder = model_encoding._encoder
-            # query_encoding = episode.problem._query_encoding[step_size]
-            # query_encoder = query_encoding._encoder
-            # step_size_idx = model_encoder._timed_model_elements[
-            #     "step_sizes"
-            # ].index(step_size)
-
-            for t in range(
-                episode._formula_stack.time + 1, int(box.timestep().lb) + 1
+    def _encode_layer(
+        self,
+        episode: BoxSearchEpisode,
+        options: EncodingOptions,
+        box: Box,
+        t: int,
+    ) -> FNode:
+        """
+        Encode the constraints at step t of the box schedule.
+        """
+        encoding = episode.problem._encodings[box.schedule]
+        timepoint = box.schedule.time_at_step(t)
+        encoded_constraints = []
+        for constraint in episode.problem.constraints:
+            if constraint.encodable() and constraint.relevant_at_time(
+                timepoint
             ):
-                timepoint = box.schedule.time_at_step(t)
-                encoded_constraints = []
-                for constraint in episode.problem.constraints:
-                    if constraint.encodable() and constraint.relevant_at_time(
-                        timepoint
-                    ):
-                        encoded_constraints.append(
-                            encoding.construct_encoding(
-                                episode.problem,
-                                constraint,
-                                options,
-                                layers=[t],
-                                box=box,
-                                assumptions=episode.problem._assumptions,
-                            )
-                        )
-                formula_encoded_constraints = And(encoded_constraints)
-                formula = Implies(
-                    self._solve_at_step_symbol(t), formula_encoded_constraints
+                encoded_constraints.append(
+                    encoding.construct_encoding(
+                        episode.problem,
+                        constraint,
+                        options,
+                        layers=[t],
+                        box=box,
+                        assumptions=episode.problem._assumptions,
+                    )
                 )
+        return And(encoded_constraints)
 
-                # neg_formula = Implies(
-                #     Not(self._solve_at_step_symbol(t)),
-                #     And(
-                #         [
-                #             Equals(
-                #                 encoding._encoder._encode_state_var(
-                #                     s, time=timepoint
-                #                 ),
-                #                 Real(0.0),
-                #             )
-                #             for s in episode.problem.model._state_var_names()
-                #         ]  # + [Not(s) for s in symbols if s.symbol_type() == BOOL]
-                #     ),
-                # )
-
-                layer_formulas.append(
-                    # And(
-                    formula
-                    # , neg_formula)
-                )
+    def _label_robust(self, box: Box, episode: BoxSearchEpisode, rval) -> bool:
+        """
+        Label the box with the labels that the searches of the coarser
+        schedules show to hold for the episode schedule.
+
+        Returns
+        -------
+        bool
+            True if the box was labeled
+        """
+        label = episode._robust_labels.label(box)
+        if label == LABEL_TRUE:
+            curr_step_box = box.current_step()
+            episode._add_true(
+                curr_step_box, explanation=CoarseScheduleExplanation()
+            )
+            self._put_result(rval, episode, curr_step_box)
+            l.debug(f"True (coarse schedule) @ {box.timestep().lb}")
+            next_box = box.advance()
+            if next_box:
+                episode._add_unknown(next_box)
+        elif label == LABEL_FALSE:
+            episode._add_false(box, explanation=CoarseScheduleExplanation())
+            self._put_result(rval, episode, box)
+            l.debug(f"False (coarse schedule) @ {box.timestep().lb}")
+        return label is not None
+
+    def _refine_schedule(
+        self,
+        problem,
+        config: "FUNMANConfig",
+        schedule: EncodingSchedule,
+        haltEvent: Optional[threading.Event],
+    ) -> Optional[RobustLabels]:
+        """
+        Search the coarser schedules of the schedule, from the coarsest, each
+        with the constraints tightened and loosened by its step error, and
+        collect the labels of their boxes that hold for the schedule.
+
+        Returns
+        -------
+        Optional[RobustLabels]
+            labels of the schedule, or None if there are no coarser schedules
+        """
+        # The coarser schedules are searched with denormalized constraints
+        if config.schedule_refinement_levels <= 0 or config.normalize:
+            return None
+        refinement = ScheduleRefinement(
+            problem=problem,
+            schedule=schedule,
+            levels=config.schedule_refinement_levels,
+            step_error_bound=config.step_error_bound,
+        )
+        coarse_schedules = refinement.coarse_schedules()
+        if len(coarse_schedules) == 0:
+            return None
+        robust_labels = RobustLabels(
+            parameters=[p.name for p in problem.model_parameters()]
+        )
+        coarse_config = config.model_copy(
+            update={
+                "schedule_refinement_levels": 0,
+                "number_of_processes": 1,
+                "normalization_constant": problem.normalization_constant,
+            }
+        )
+        coarse_config._handler = NoopResultHandler()
+        with problem._phase_metrics.phase(SCHEDULE_REFINEMENT):
+            for coarse, steps in coarse_schedules:
+                step_errors = refinement.step_errors(steps)
+                # The tightened scenario shows true labels, and the loosened
+                # scenario false labels
+                for tighten in [True, False]:
+                    if haltEvent is not None and haltEvent.is_set():
+                        return robust_labels
+                    try:
+                        scenario = refinement.coarse_scenario(
+                            coarse, steps, step_errors, tighten
+                        )
+                    except (NotImplementedError, ValueError) as e:
+                        l.info(
+                            f"Not searching the schedule {coarse.timepoints}, because shifting the constraints failed: {e}"
+                        )
+                        continue
+                    scenario.initialize(coarse_config)
+                    parameter_space = self._search_sp(
+                        scenario,
+                        coarse_config,
+                        haltEvent,
+                        robust_labels=robust_labels.view(steps),
+                    )
+                    robust_labels.add_coarse_results(
+                        parameter_space.true_boxes if tighten else [],
+                        [] if tighten else parameter_space.false_boxes,
+                        steps,
+                    )
+                l.info(f"Searched the schedule {coarse.timepoints}")
+        return robust_labels
 
-            for layer, formula in enumerate(layer_formulas):
-                episode._formula_stack.push(1)
-                episode._formula_stack.add_assertion(formula)
+    def _contract(
+        self,
+        box: Box,
+        episode: BoxSearchEpisode,
+        options: EncodingOptions,
+        rval,
+    ) -> Optional[Box]:
+        """
+        Narrow the box with the episode contractor, and label the parts of
+        the box that it cuts away false.  A part is only cut away if it is at
+        least MIN_CONTRACTION of the box width, and each narrowed bound is
+        widened by CONTRACTION_MARGIN of its magnitude (or of the box width,
+        if it is greater) for the rounding of the encoding.
 
-    def _solve_at_step_symbol(self, t: int) -> FNode:
-        return Symbol(f"solve_step_{t}", BOOL)
+        Returns
+        -------
+        Optional[Box]
+            narrowed box, or None if the box has no true points
+        """
+        with episode._metrics.phase(CONTRACTION):
+            bounds = episode._contractor.contract(
+                box, partial(self._encode_layer, episode, options, box)
+            )
+        if bounds is None:
+            episode._add_false(box, explanation=PropagationExplanation())
+            self._put_result(rval, episode, box)
+            l.debug(f"False (propagation) @ {box.timestep().lb}")
+            return None
+
+        cut_boxes = []
+        for p, (lb, ub) in bounds.items():
+            interval = box.bounds[p]
+            width = float(interval.ub) - float(interval.lb)
+            margin = CONTRACTION_MARGIN * max(abs(lb), width)
+            if lb - margin > float(interval.lb) + MIN_CONTRACTION * width:
+                cut_boxes.append(
+                    box.restrict(p, Interval(lb=interval.lb, ub=lb - margin))
+                )
+                box = box.restrict(
+                    p,
+                    Interval(
+                        lb=lb - margin,
+                        ub=interval.ub,
+                        closed_upper_bound=interval.closed_upper_bound,
+                    ),
+                )
+            margin = CONTRACTION_MARGIN * max(abs(ub), width)
+            if ub + margin < float(interval.ub) - MIN_CONTRACTION * width:
+                cut_boxes.append(
+                    box.restrict(
+                        p,
+                        Interval(
+                            lb=ub + margin,
+                            ub=interval.ub,
+                            closed_upper_bound=interval.closed_upper_bound,
+                        ),
+                    )
+                )
+                box = box.restrict(
+                    p, Interval(lb=box.bounds[p].lb, ub=ub + margin)
+                )
+        for cut_box in cut_boxes:
+            episode._add_false(cut_box, explanation=PropagationExplanation())
+            self._put_result(rval, episode, cut_box)
+        if len(cut_boxes) > 0:
+            l.debug(
+                f"Contracted @ {box.timestep().lb} to (width: {box.width():.5f} (raw) {box.normalized_width():.5f} (norm))"
+            )
+        return box
 
     def _initialize_model_for_box(
         self,
@@ -572,17 +1071,16 @@ class BoxSearch(Search):
         # Setup the model transitions to evaluate the box
         self._initialize_model_encoding(solver, episode, options, box)
 
-        formula = self._initialize_box_encoding(box, episode, options)
-        episode._formula_stack.push(1)
-        episode._formula_stack.add_assertion(formula)
+        with episode._metrics.phase(BOX_ENCODING):
+            formula = self._initialize_box_encoding(box, episode, options)
+            episode._formula_stack.push(1)
+            episode._formula_stack.add_assertion(formula)
 
     def _initialize_box_encoding(
         self, box: Box, episode: SearchEpisode, options: EncodingOptions
     ) -> FNode:
         # Add constraints for boundaries of the box
-        projected_box = box.project(
-            episode.problem.model_parameters()
-        ).project(episode.problem.model_parameters())
+        projected_box = box.project(episode.problem.model_parameters())
 
         parameter_formulas = []
         for parameter_name, interval in projected_box.bounds.items():
@@ -670,25 +1168,19 @@ class BoxSearch(Search):
                 if not k.constraint.time_dependent()
             ]
         )
-        activate_steps = self.encoding_step_activation_formula(box)
-        formulas = And(
-            [formula, formula1, formula2, activate_steps]
-        ).simplify()
+        formulas = And([formula, formula1, formula2]).simplify()
 
         episode._formula_stack.add_assertion(formulas)
+        episode._formula_stack.assume(
+            self.encoding_step_activation(episode, box)
+        )
 
-    def encoding_step_activation_formula(self, box: Box) -> FNode:
+    def encoding_step_activation(
+        self, episode: BoxSearchEpisode, box: Box
+    ) -> List[FNode]:
         # Activate all steps up to and inclusive of box.timestep.lb
-        # Deactivate all steps from box.timestep.lb + 1 to box.timestep.ub
-        t = int(box.timestep().lb)
-        tmax = len(box.schedule.timepoints) - 1  # int(box.timestep().ub)
-        return And(
-            [self._solve_at_step_symbol(step) for step in range(t + 1)]
-            + [
-                Not(self._solve_at_step_symbol(step))
-                for step in range(t + 1, tmax + 1)
-            ]
-        )
+        # Deactivate the deeper steps that are encoded
+        return episode._step_encoding.activation(int(box.timestep().lb))
 
     def store_smtlib(self, episode, box, filename="dbg"):
         iteration_files = glob.glob(filename + "*")
@@ -773,12 +1265,12 @@ class BoxSearch(Search):
                 if k.constraint.time_dependent()
             ]
         )
-        activate_steps = self.encoding_step_activation_formula(box)
-        formulas = And(
-            [formula, formula1, formula2, activate_steps]
-        ).simplify()
+        formulas = And([formula, formula1, formula2]).simplify()
 
         episode._formula_stack.add_assertion(formulas)
+        episode._formula_stack.assume(
+            self.encoding_step_activation(episode, box)
+        )
 
     def _get_points(
         self,
@@ -792,10 +1284,55 @@ class BoxSearch(Search):
         my_solver: Callable,
         options: EncodingOptions,
         _smtlib_save_fn: Callable = None,
+        label: Optional[str] = None,
     ):
         explanation = None
+        if len(existing_points) == 0 and episode._points is not None:
+            point = episode._points.find(label, box)
+            if point is not None:
+                # A point found for another box at the same step
+                box.add_point(point)
+                existing_points = [point]
+        enclosed = None
+        monotone = False
+        if len(existing_points) == 0 and episode._enclosure is not None:
+            with episode._metrics.phase(ENCLOSURE):
+                enclosed = episode._enclosure.label(box, episode.config)
+            if enclosed is None and episode._monotonicity is not None:
+                with episode._metrics.phase(MONOTONICITY):
+                    enclosed = episode._monotonicity.label(box, episode.config)
+                monotone = enclosed is not None
+            if enclosed == label:
+                # Every point of the box has the label, including its center
+                point = episode._enclosure.witness(box, label)
+                _point_handler_fn(box, point)
+                box.add_point(point)
+                existing_points = [point]
+        lemma = (
+            episode._lemmas.explanation(label, box)
+            if len(existing_points) == 0 and episode._lemmas is not None
+            else None
+        )
 
-        if len(existing_points) == 0:
+        if len(existing_points) == 0 and enclosed is not None:
+            # Every point of the box has the other label
+            explanation = (
+                MonotonicityExplanation()
+                if monotone
+                else EnclosureExplanation()
+            )
+        elif (
+            len(existing_points) == 0
+            and episode.config.point_based_evaluation
+            and box.timestep().lb in box._simulated_steps
+        ):
+            # The simulated points of the box all have the other label
+            explanation = SimulationExplanation(num_points=len(box.points))
+        elif lemma is not None:
+            # A box that contains this box has no points with the label
+            l.trace(f"Reusing lemma for {label} points of box: {box}")
+            explanation = lemma
+        elif len(existing_points) == 0:
             # If no cached point, then attempt to generate one
             # print("Checking false query")
             _encoding_fn()
@@ -807,7 +1344,9 @@ class BoxSearch(Search):
                     )
                 )
             result = self.invoke_solver(
-                solver, timeout=episode.config.solver_timeout
+                solver,
+                timeout=episode.config.solver_timeout,
+                assumptions=episode._formula_stack.assumptions(),
             )
             if result is not None and isinstance(result, pysmtModel):
                 # If substituted formulas are on the stack, then add the original formulas to compute the values of all variables
@@ -829,33 +1368,42 @@ class BoxSearch(Search):
                     box.add_point(point)
             else:  # unsat
                 explanation = result
-                explanation.check_assumptions(episode, my_solver, options)
+                with episode._metrics.phase(CHECK_ASSUMPTIONS):
+                    explanation.check_assumptions(episode, my_solver, options)
+                if episode._lemmas is not None and isinstance(
+                    explanation, BoxExplanation
+                ):
+                    episode._lemmas.add(label, box, explanation)
             episode._formula_stack.pop()
         return existing_points, explanation
 
     def _get_false_points(
         self, solver, episode, box, rval, options, my_solver
     ) -> Optional[Union[List[Point], Explanation]]:
-        points, explanation = self._get_points(
-            solver,
-            box,
-            box.false_points(step=box.timestep().lb),
-            episode,
-            rval,
-            partial(self._setup_false_query, solver, episode, box, options),
-            episode._add_false_point,
-            my_solver,
-            options,
-            _smtlib_save_fn=(
+        with episode._metrics.phase(FALSE_QUERY):
+            points, explanation = self._get_points(
+                solver,
+                box,
+                box.false_points(step=box.timestep().lb),
+                episode,
+                rval,
                 partial(
-                    self.store_smtlib,
-                    episode,
-                    box,
-                )
-                if episode.config.save_smtlib
-                else None
-            ),
-        )
+                    self._setup_false_query, solver, episode, box, options
+                ),
+                episode._add_false_point,
+                my_solver,
+                options,
+                label=LABEL_FALSE,
+                _smtlib_save_fn=(
+                    partial(
+                        self.store_smtlib,
+                        episode,
+                        box,
+                    )
+                    if episode.config.save_smtlib
+                    else None
+                ),
+            )
 
         return box.false_points(step=box.timestep().lb), explanation
 
@@ -933,7 +1481,11 @@ class BoxSearch(Search):
         rval,
         options: EncodingOptions,
     ) -> Tuple[Point, Explanation]:
-        witnesses = [p for p in episode._true_points if box.contains_point(p)]
+        witnesses = (
+            episode._points.find_all(LABEL_TRUE, box)
+            if episode._points is not None
+            else []
+        )
         explanation = None
         if len(witnesses) == 0:
             # Generate a witness
@@ -964,7 +1516,7 @@ class BoxSearch(Search):
                         episode.problem
                     )
                     episode._add_true_point(assumption_point)
-                    rval.put(assumption_point.model_dump())
+                    self._put_result(rval, episode, assumption_point)
                     witnesses.append(assumption_point)
 
             else:  # unsat
@@ -983,22 +1535,26 @@ class BoxSearch(Search):
         explanation = None
 
         while found_point and box.timestep().lb <= box.timestep().ub:
-            points, explanation = self._get_points(
-                solver,
-                box,
-                box.true_points(step=box.timestep().lb),
-                episode,
-                rval,
-                partial(self._setup_true_query, solver, episode, box, options),
-                episode._add_true_point,
-                my_solver,
-                options,
-                _smtlib_save_fn=(
-                    partial(self.store_smtlib, episode, box)
-                    if episode.config.save_smtlib
-                    else None
-                ),
-            )
+            with episode._metrics.phase(TRUE_QUERY):
+                points, explanation = self._get_points(
+                    solver,
+                    box,
+                    box.true_points(step=box.timestep().lb),
+                    episode,
+                    rval,
+                    partial(
+                        self._setup_true_query, solver, episode, box, options
+                    ),
+                    episode._add_true_point,
+                    my_solver,
+                    options,
+                    label=LABEL_TRUE,
+                    _smtlib_save_fn=(
+                        partial(self.store_smtlib, episode, box)
+                        if episode.config.save_smtlib
+                        else None
+                    ),
+                )
             if len(box.true_points(step=box.timestep().lb)) == 0 or isinstance(
                 explanation, TimeoutExplanation
             ):
@@ -1067,13 +1623,10 @@ class BoxSearch(Search):
         episode: BoxSearchEpisode,
         options: EncodingOptions,
         idx: Optional[int] = None,
-        more_work: Optional[Condition] = None,
-        idle_mutex: Optional[Lock] = None,
-        idle_flags: Optional[List[Event]] = None,
         handler: Optional["ResultHandler"] = None,
         all_results=None,
         haltEvent: Optional[threading.Event] = None,
-    ):
+    ) -> bool:
         """
         A single search process will evaluate and expand the boxes in the
         episode.unknown_boxes queue.  The processes exit when the queue is
@@ -1096,27 +1649,19 @@ class BoxSearch(Search):
             Return value shared queue
         episode : BoxSearchEpisode
             Shared search data and statistics.
+
+        Returns
+        -------
+        bool
+            True if the expansion stopped because of an error
         """
-        process_name = f"Expander_{(idx if idx else 'S')}_p{os.getpid()}"
+        process_name = (
+            f"Expander_{(idx if idx is not None else 'S')}_p{os.getpid()}"
+        )
         # l = self._logger(episode.config, process_name=process_name)
         last_progress = -1.0
         try:
-            if episode.config.solver == "dreal":
-                opts = {
-                    "dreal_precision": episode.config.dreal_precision,
-                    "dreal_log_level": episode.config.dreal_log_level,
-                    "dreal_mcts": episode.config.dreal_mcts,
-                    "preferred": episode.config.dreal_prefer_parameters,  # [p.name for p in episode.problem.parameters] if episode.config.dreal_prefer_parameters else [],
-                    "random_seed": episode.config.random_seed,
-                }
-            else:
-                opts = {}
-            my_solver = partial(
-                Solver,
-                name=episode.config.solver,
-                logic=QF_NRA,
-                solver_options=opts,
-            )
+            my_solver = self._solver(episode.config)
 
             with my_solver() as solver:
                 episode._formula_stack._solver = solver
@@ -1129,36 +1674,69 @@ class BoxSearch(Search):
                         break
                     try:
                         box: Box = episode._get_unknown()
-                        rval.put(box.model_dump())
+                        self._put_result(rval, episode, box)
                         l.trace(f"{process_name} claimed work")
                     except Empty:
-                        exit = self._handle_empty_queue(
-                            process_name,
-                            episode,
-                            more_work,
-                            idle_mutex,
-                            idle_flags,
-                        )
+                        exit = self._handle_empty_queue(process_name, episode)
                         if exit:
                             break
                         else:
                             continue
                     else:
-                        l.debug(f"Expanding box: {box}")
-                        l.debug(
-                            f"Evaluating box: +: {len(box.true_points())}, -: {len(box.false_points())}, H: {box.point_entropy()}"
-                        )
+                        if l.isEnabledFor(logging.DEBUG):
+                            l.debug(f"Expanding box: {box}")
+                            l.debug(
+                                f"Evaluating box: +: {len(box.true_points())}, -: {len(box.false_points())}, H: {box.point_entropy()}"
+                            )
+                        # Label the box without querying the solver if the
+                        # search of a coarser schedule labeled it
+                        if episode._robust_labels is not None and (
+                            self._label_robust(box, episode, rval)
+                        ):
+                            last_progress = self._finish_box(
+                                rval,
+                                episode,
+                                handler,
+                                all_results,
+                                last_progress,
+                            )
+                            continue
+
+                        # Label the parts of the box without true points
+                        # false before querying the solver
+                        if episode._contractor is not None:
+                            box = self._contract(box, episode, options, rval)
+                            if box is None:
+                                last_progress = self._finish_box(
+                                    rval,
+                                    episode,
+                                    handler,
+                                    all_results,
+                                    last_progress,
+                                )
+                                continue
+
+                        # Label points of the box by simulation before
+                        # querying the solver for them
+                        if episode._simulation_filter is not None:
+                            episode._simulation_filter.simulate(
+                                box, episode.config
+                            )
+
                         # Setup the model constraints up to the box.timestep.lb and add box constraints
                         self._initialize_model_for_box(
                             solver, box, episode, options
                         )
 
-                        l.debug(
-                            "\n"
-                            + all_results["parameter_space"].__str__(
-                                dropped_boxes=all_results["dropped_boxes"]
+                        if all_results is not None and l.isEnabledFor(
+                            logging.DEBUG
+                        ):
+                            l.debug(
+                                "\n"
+                                + all_results["parameter_space"].__str__(
+                                    dropped_boxes=all_results["dropped_boxes"]
+                                )
                             )
-                        )
                         # (point, no_witness_explanation) = self._find_witness_points(
                         #     solver, episode, box, rval, options
                         # )
@@ -1196,18 +1774,12 @@ class BoxSearch(Search):
                                 ):
                                     l.trace(f"{process_name} produced work")
                                 else:
-                                    rval.put(box.model_dump())
-                                if episode.config.number_of_processes > 1:
-                                    # FIXME This would only be none when
-                                    # the number of processes is 1. This
-                                    # can be done more cleanly.
-                                    if more_work:
-                                        with more_work:
-                                            more_work.notify_all()
-                                l.debug(
-                                    f"Split @ {box.timestep().lb}, (width: {box.width():.5f} (raw) {box.normalized_width():.5f} (norm))"
-                                )
-                                l.trace(f"XXX Split:\n{box}")
+                                    self._put_result(rval, episode, box)
+                                if l.isEnabledFor(logging.DEBUG):
+                                    l.debug(
+                                        f"Split @ {box.timestep().lb}, (width: {box.width():.5f} (raw) {box.normalized_width():.5f} (norm))"
+                                    )
+                                    l.trace(f"XXX Split:\n{box}")
                             elif isinstance(
                                 not_false_explanation, BoxExplanation
                             ):
@@ -1217,9 +1789,10 @@ class BoxSearch(Search):
                                     curr_step_box,
                                     explanation=not_false_explanation,
                                 )
-                                rval.put(curr_step_box.model_dump())
+                                self._put_result(rval, episode, curr_step_box)
                                 l.debug(f"True @ {box.timestep().lb}")
-                                l.trace(f"+++ True:\n{box}")
+                                if l.isEnabledFor(TRACE):
+                                    l.trace(f"+++ True:\n{box}")
 
                                 if episode.config.corner_points:
                                     corner_points: List[Point] = (
@@ -1245,18 +1818,12 @@ class BoxSearch(Search):
                                 ):
                                     l.trace(f"{process_name} produced work")
                                 else:
-                                    rval.put(box.model_dump())
-                                if episode.config.number_of_processes > 1:
-                                    # FIXME This would only be none when
-                                    # the number of processes is 1. This
-                                    # can be done more cleanly.
-                                    if more_work:
-                                        with more_work:
-                                            more_work.notify_all()
-                                l.debug(
-                                    f"Split @ {box.timestep().lb}, (width: {box.width():.5f} (raw) {box.normalized_width():.5f} (norm))"
-                                )
-                                l.trace(f"XXX Split:\n{box}")
+                                    self._put_result(rval, episode, box)
+                                if l.isEnabledFor(logging.DEBUG):
+                                    l.debug(
+                                        f"Split @ {box.timestep().lb}, (width: {box.width():.5f} (raw) {box.normalized_width():.5f} (norm))"
+                                    )
+                                    l.trace(f"XXX Split:\n{box}")
                         elif isinstance(not_true_explanation, BoxExplanation):
                             if len(box.points) == 0:
                                 # If we cannot find a true point, the box is false and we may have not computed any false points, so ensure we have at least one.
@@ -1274,7 +1841,8 @@ class BoxSearch(Search):
                             )  # TODO consider merging lists of boxes
 
                             l.debug(f"False @ {box.timestep().lb}")
-                            l.trace(f"--- False:\n{box}")
+                            if l.isEnabledFor(TRACE):
+                                l.trace(f"--- False:\n{box}")
                             if episode.config.corner_points:
                                 corner_points: List[Point] = (
                                     self.get_box_corners(
@@ -1286,7 +1854,7 @@ class BoxSearch(Search):
                                         my_solver,
                                     )
                                 )
-                            rval.put(box.model_dump())
+                            self._put_result(rval, episode, box)
                         else:  # Timeout FIXME copy of split code
                             if self._split(
                                 box,
@@ -1295,101 +1863,101 @@ class BoxSearch(Search):
                             ):
                                 l.trace(f"{process_name} produced work")
                             else:
-                                rval.put(box.model_dump())
-                            if episode.config.number_of_processes > 1:
-                                # FIXME This would only be none when
-                                # the number of processes is 1. This
-                                # can be done more cleanly.
-                                if more_work:
-                                    with more_work:
-                                        more_work.notify_all()
-                            l.debug(
-                                f"Split @ {box.timestep().lb}, (width: {box.width():.5f} (raw) {box.normalized_width():.5f} (norm))"
-                            )
-                            l.trace(f"XXX Split:\n{box}")
+                                self._put_result(rval, episode, box)
+                            if l.isEnabledFor(logging.DEBUG):
+                                l.debug(
+                                    f"Split @ {box.timestep().lb}, (width: {box.width():.5f} (raw) {box.normalized_width():.5f} (norm))"
+                                )
+                                l.trace(f"XXX Split:\n{box}")
                         episode._formula_stack.pop()  # Remove box constraints from solver
-                        episode._on_iteration()
-                        if handler:
-                            handler(rval, episode.config, all_results)
-                            if (
-                                "progress" in all_results
-                                and all_results["progress"] is not None
-                                and all_results["progress"].progress
-                                > last_progress
-                            ):
-                                last_progress = all_results[
-                                    "progress"
-                                ].progress
-                                l.info(all_results["progress"])
+                        last_progress = self._finish_box(
+                            rval, episode, handler, all_results, last_progress
+                        )
                         l.trace(f"{process_name} finished work")
-                self._initialize_model_encoding(
-                    solver, episode, options, None
-                )  # Reset solver stack to empty
         except KeyboardInterrupt:
             l.info(f"{process_name} Keyboard Interrupt")
         except Exception:
             l.error(traceback.format_exc())
+            return True
+        return False
 
-    def _run_handler(self, rval, config: "FUNMANConfig"):
+    def _finish_box(
+        self,
+        rval,
+        episode: BoxSearchEpisode,
+        handler: Optional["ResultHandler"],
+        all_results,
+        last_progress: float,
+    ) -> float:
         """
-        Execute the process that does final processing of the results of expand()
+        Mark the box that _expand() claimed as expanded, and report the
+        results and progress.  Returns the last progress reported.
         """
-        l = self._logger(config, process_name=f"search_process_result_handler")
-
-        handler: ResultHandler = config._handler
-        ps = ParameterSpace()
-        dropped_boxes = []
-        break_on_interrupt = False
-        try:
-            handler.open()
-            while True:
-                try:
-                    result: dict = rval.get(timeout=config.queue_timeout)
-                except Empty:
-                    continue
-                except KeyboardInterrupt:
-                    if break_on_interrupt:
-                        break
-                    break_on_interrupt = True
-                else:
-                    if result is None:
-                        break
+        episode._complete_unknown()
+        episode._on_iteration()
+        metrics = episode._metrics_record()
+        if metrics is not None:
+            rval.put(metrics)
+        if handler:
+            handler(rval, episode.config, all_results)
+            if (
+                "progress" in all_results
+                and all_results["progress"] is not None
+                and all_results["progress"].progress > last_progress
+            ):
+                last_progress = all_results["progress"].progress
+                l.info(all_results["progress"])
+        return last_progress
 
-                    # TODO this is a bit of a mess and can likely be cleaned up
-                    inst = ParameterSpace.decode_labeled_object(result)
-                    label = inst.label
-                    if isinstance(inst, Box):
-                        if label == "true":
-                            ps.true_boxes.append(inst)
-                        elif label == "false":
-                            ps.false_boxes.append(inst)
-                        elif label == "dropped":
-                            dropped_boxes.append(inst)
-                        else:
-                            l.warning(f"Skipping Box with label: {label}")
-                    elif isinstance(inst, Point):
-                        if label == "true":
-                            ps.true_points.append(inst)
-                        elif label == "false":
-                            ps.false_points.append(inst)
-                        else:
-                            l.warning(f"Skipping Point with label: {label}")
-                    else:
-                        l.error(f"Skipping invalid object type: {type}")
+    def _handle_result(
+        self,
+        result: Union[dict, Box, Point],
+        config: "FUNMANConfig",
+        all_results: Dict[str, Any],
+    ):
+        """
+        Add one result record of expand() to all_results and pass it to the
+        result handler.  Single process searches report records as
+        dictionaries and multiprocess searches report Box and Point objects.
+        """
+        if isinstance(result, (Box, Point)):
+            inst = result
+            result = inst.model_dump()
+        else:
+            try:
+                inst = ParameterSpace.decode_labeled_object(result)
+            except:
+                l.error(f"Skipping invalid object")
+                return
 
-                    try:
-                        handler.process(result)
-                    except Exception:
-                        l.error(traceback.format_exc())
+        ps = all_results.get("parameter_space")
+        label = inst.label
+        if isinstance(inst, Box):
+            if label == "true":
+                ps.true_boxes.append(inst)
+            elif label == "false":
+                ps.false_boxes.append(inst)
+            elif label == "dropped":
+                all_results["dropped_boxes"].append(inst)
+            elif label == "unknown":
+                pass  # Allow unknown boxes for plotting
+            else:
+                l.warning(f"Skipping Box with label: {label}")
+        elif isinstance(inst, Point):
+            if label == "true":
+                ps.true_points.append(inst)
+            elif label == "false":
+                ps.false_points.append(inst)
+            else:
+                l.warning(f"Skipping Point with label: {label}")
+        else:
+            l.error(f"Skipping invalid object type: {type(inst)}")
+            return
 
-        except Exception as error:
-            l.error(error)
-        finally:
-            handler.close()
-        return {
-            "parameter_space": ps,
-            "dropped_boxes": dropped_boxes,
-        }
+        try:
+            config._handler.process(result)
+        except Exception:
+            l.error(traceback.format_exc())
 
     def _run_handler_step(
         self, rval, config: "FUNMANConfig", all_results
@@ -1397,13 +1965,8 @@ class BoxSearch(Search):
         """
         Execute one step of processing the results of expand()
         """
-        l = self._logger(config, process_name=f"search_process_result_handler")
-
-        handler: ResultHandler = config._handler
-        ps = all_results.get("parameter_space")
         break_on_interrupt = False
         try:
-            # handler.open()
             while True:
                 try:
                     result = None
@@ -1418,48 +1981,13 @@ class BoxSearch(Search):
                 else:
                     if result is None:
                         break
-
-                    # TODO this is a bit of a mess and can likely be cleaned up
-                    try:
-                        inst = ParameterSpace.decode_labeled_object(result)
-                    except:
-                        l.error(f"Skipping invalid object")
-                        continue
-
-                    label = inst.label
-                    if isinstance(inst, Box):
-                        if label == "true":
-                            ps.true_boxes.append(inst)
-                        elif label == "false":
-                            ps.false_boxes.append(inst)
-                        elif label == "dropped":
-                            all_results["dropped_boxes"].append(inst)
-                        elif label == "unknown":
-                            pass  # Allow unknown boxes for plotting
-                        else:
-                            l.warning(f"Skipping Box with label: {label}")
-                    elif isinstance(inst, Point):
-                        if label == "true":
-                            ps.true_points.append(inst)
-                        elif label == "false":
-                            ps.false_points.append(inst)
-                        else:
-                            l.warning(f"Skipping Point with label: {label}")
-                    else:
-                        l.error(f"Skipping invalid object type: {type(inst)}")
-                        continue
-
-                    try:
-                        handler.process(result)
-                    except Exception:
-                        l.error(traceback.format_exc())
+                    self._handle_result(result, config, all_results)
 
         except Exception as error:
             l.error(error)
         finally:
             if config._wait_action is not None:
                 config._wait_action.run()
-            # handler.close()
         return all_results
 
     def search(
@@ -1473,9 +2001,9 @@ class BoxSearch(Search):
         The BoxSearch.search() creates a BoxSearchEpisode object that stores the
         search progress.  This method is the entry point to the search that
         spawns several processes to parallelize the evaluation of boxes in the
-        BoxSearch.expand() method.  It treats the zeroth process as a special
-        process that is allowed to initialize the search and plot the progress
-        of the search.
+        BoxSearch.expand() method.  When config.number_of_processes > 1, the
+        calling process handles the results reported by the expander
+        processes.
 
         Parameters
         ----------
@@ -1497,6 +2025,7 @@ class BoxSearch(Search):
                 problem,
                 config,
                 haltEvent=haltEvent,
+                resultsCallback=resultsCallback,
             )
         else:
             return self._search_sp(
@@ -1506,12 +2035,27 @@ class BoxSearch(Search):
                 resultsCallback=resultsCallback,
             )
 
+    def _schedules(self, problem) -> List[EncodingSchedule]:
+        return problem._smt_encoder._timed_model_elements[
+            "schedules"
+        ].schedules
+
+    def _encoding_options(
+        self, config: "FUNMANConfig", schedule: EncodingSchedule
+    ) -> EncodingOptions:
+        return EncodingOptions(
+            schedule=schedule,
+            normalize=config.normalize,
+            normalization_constant=config.normalization_constant,
+        )
+
     def _search_sp(
         self,
         problem,
         config: "FUNMANConfig",
         haltEvent: Optional[threading.Event],
         resultsCallback: Optional[Callable[[ParameterSpace], None]] = None,
+        robust_labels: Optional[RobustLabels] = None,
     ) -> ParameterSpace:
         all_results = {
             "parameter_space": ParameterSpace(
@@ -1520,66 +2064,35 @@ class BoxSearch(Search):
             "dropped_boxes": [],
         }
         rval = QueueSP()
+        metrics = problem._phase_metrics
 
         def handler(rval, config: "FUNMANConfig", results) -> Dict[str, Any]:
-            self._run_handler_step(rval, config, results)
+            with metrics.phase(RESULT_HANDLER):
+                self._run_handler_step(rval, config, results)
             if resultsCallback is not None:
-                progress = resultsCallback(results.get("parameter_space"))
+                with metrics.phase(PROGRESS_CALLBACK):
+                    progress = resultsCallback(results.get("parameter_space"))
                 results["progress"] = progress
             return results
 
         config._handler.open()
 
-        if problem._smt_encoder._timed_model_elements:
-            schedules = problem._smt_encoder._timed_model_elements[
-                "schedules"
-            ].schedules
-
-            # initialize empty encoding
-            for schedule in schedules:
-                episode = BoxSearchEpisode(
-                    config=config, problem=problem, schedule=schedule
-                )
-                episode._initialize_boxes(config.num_initial_boxes, schedule)
-                options = EncodingOptions(
-                    schedule=schedule,
-                    normalize=config.normalize,
-                    normalization_constant=config.normalization_constant,
-                )
-                self._expand(
-                    rval,
-                    episode,
-                    options,
-                    handler=handler,
-                    all_results=all_results,
-                    haltEvent=haltEvent,
-                )
-        else:
-            problem._encode_timed(
-                1,
-                1,
-                config,
-            )
-            structural_configuration = {
-                "step_size": 1,
-                "num_steps": 1,
-            }
+        for schedule in self._schedules(problem):
             episode = BoxSearchEpisode(
-                config=config,
-                problem=problem,
-                structural_configuration=structural_configuration,
+                config=config, problem=problem, schedule=schedule
             )
-            episode._initialize_boxes(config.num_initial_boxes)
-            options = EncodingOptions(
-                num_steps=structural_configuration["num_steps"],
-                step_size=structural_configuration["step_size"],
-                normalize=config.normalize,
-                normalization_constant=config.normalization_constant,
+            episode._initialize_boxes(config.num_initial_boxes, schedule)
+            episode._robust_labels = (
+                robust_labels
+                if robust_labels is not None
+                else self._refine_schedule(
+                    problem, config, schedule, haltEvent
+                )
             )
             self._expand(
                 rval,
                 episode,
-                options,
+                self._encoding_options(config, schedule),
                 handler=handler,
                 all_results=all_results,
                 haltEvent=haltEvent,
@@ -1588,91 +2101,232 @@ class BoxSearch(Search):
         config._handler.close()
         return all_results["parameter_space"]
 
-    def _search_mp(
+    def _expand_mp(
         self,
+        rval: Queue,
+        episode: BoxSearchEpisodeMP,
+        options: EncodingOptions,
+        idx: int,
+        halt: Event,
+        group: int = 0,
+    ):
+        """
+        Entry point of an expander process.  The expander reports its group
+        (i.e., the index of its schedule) on rval when it exits.  If it fails,
+        then it halts the search, because its peers would wait forever for
+        the boxes that it holds.
+        """
+        try:
+            if self._expand(rval, episode, options, idx=idx, haltEvent=halt):
+                l.error(
+                    f"Halting the search, because Expander_{group}_{idx} failed"
+                )
+                halt.set()
+        finally:
+            rval.put(episode._metrics_record(force=True))
+            rval.put(group)
+
+    def _group_sizes(
+        self, config: "FUNMANConfig", num_schedules: int
+    ) -> List[int]:
+        """
+        Number of expander processes for each schedule.  The schedules share
+        the config.number_of_processes processes, and each has at least one.
+        """
+        size, extra = divmod(config.number_of_processes, num_schedules)
+        return [
+            max(1, size + (1 if i < extra else 0))
+            for i in range(num_schedules)
+        ]
+
+    def _start_group(
+        self,
+        ctx,
+        rval: Queue,
+        halt: Event,
         problem,
         config: "FUNMANConfig",
-        haltEvent: Optional[threading.Event],
-    ) -> ParameterSpace:
-        l = mp.get_logger()
-        l.setLevel(config.verbosity)
-        processes = config.number_of_processes
-        with mp.Manager() as manager:
-            rval = manager.Queue()
-            episode = BoxSearchEpisodeMP(
+        schedule: EncodingSchedule,
+        group: int,
+        expand_count: int,
+        robust_labels: Optional[RobustLabels] = None,
+    ) -> List[mp.Process]:
+        """
+        Start expand_count expander processes for the schedule, which share
+        its boxes with a WorkStealingBoxQueue, and the robust_labels of its
+        coarser schedules.
+        """
+        # Split the initial box so that every expander starts with work
+        episode = BoxSearchEpisode(
+            config=config, problem=problem, schedule=schedule
+        )
+        episode._initialize_boxes(
+            max(expand_count, config.num_initial_boxes), schedule
+        )
+
+        inboxes = [ctx.Queue() for _ in range(expand_count)]
+        hungry = ctx.Array("b", expand_count)
+        outstanding = ctx.Value("i", episode._unknown_boxes.qsize())
+        idx = 0
+        while not episode._unknown_boxes.empty():
+            inboxes[idx % expand_count].put(
+                episode._unknown_boxes.get_nowait()
+            )
+            idx += 1
+
+        episodes = [
+            BoxSearchEpisodeMP(
                 config=config,
                 problem=problem,
-                manager=manager,
-                structural_configuration=structural_configuration,
+                schedule=schedule,
+                unknown_boxes=WorkStealingBoxQueue(
+                    idx, inboxes, hungry, outstanding
+                ),
             )
-            options = EncodingOptions(
-                num_steps=structural_configuration["num_steps"],
-                step_size=structural_configuration["step_size"],
-                normalize=config.normalize,
-                normalization_constant=config.normalization_constant,
+            for idx in range(expand_count)
+        ]
+        for expander_episode in episodes:
+            expander_episode._robust_labels = robust_labels
+
+        options = self._encoding_options(config, schedule)
+        processes = [
+            ctx.Process(
+                target=self._expand_mp,
+                args=(
+                    rval,
+                    episodes[idx],
+                    options,
+                    idx,
+                    halt,
+                    group,
+                ),
+                name=f"Expander_{group}_{idx}",
+                daemon=False,
             )
-            expand_count = processes - 1
-            episode._initialize_boxes(expand_count)
-            idle_mutex = manager.Lock()
-            idle_flags = [manager.Event() for _ in range(expand_count)]
-
-            with mp.Pool(processes=processes) as pool:
-                more_work_condition = manager.Condition()
-
-                # start the result handler process
-                l.info("Starting result handler process")
-                rval_handler_process = pool.apply_async(
-                    self._run_handler, args=(rval, config)
-                )
-                # blocking exec of the expansion processes
-                l.info(f"Starting {expand_count} expand processes")
+            for idx in range(expand_count)
+        ]
+        l.info(
+            f"Starting {expand_count} expand processes for schedule {schedule.timepoints}"
+        )
+        for p in processes:
+            p.start()
+        return processes
 
-                starmap_result = pool.starmap_async(
-                    self._expand,
-                    [
-                        (
-                            rval,
-                            episode,
-                            options,
-                            {
-                                "idx": idx,
-                                "more_work": more_work_condition,
-                                "idle_mutex": idle_mutex,
-                                "idle_flags": idle_flags,
-                            },
-                        )
-                        for idx in range(expand_count)
-                    ],
-                )
+    def _search_mp(
+        self,
+        problem,
+        config: "FUNMANConfig",
+        haltEvent: Optional[threading.Event],
+        resultsCallback: Optional[Callable[[ParameterSpace], None]] = None,
+    ) -> ParameterSpace:
+        """
+        Run the schedules concurrently on config.number_of_processes expander
+        processes.  Each schedule is an independent search by a group of
+        expanders, which own a solver and a BoxSearchEpisodeMP with a
+        WorkStealingBoxQueue, and stream their labeled boxes and points to
+        this process, which merges them into the parameter space (and
+        reports the progress of all the schedules) as they arrive.  If there
+        are more schedules than processes, then each schedule gets one
+        expander, and the schedules that wait for a process start as the
+        earlier schedules finish.
+
+        The expanders are forked so that they inherit the encodings of the
+        problem (and the robust labels of the coarser schedules, which this
+        process searches before it starts the expanders) instead of pickling
+        them.
+        """
+        ctx = mp.get_context("fork")
+        all_results = {
+            "parameter_space": ParameterSpace(
+                num_dimensions=problem.num_dimensions()
+            ),
+            "dropped_boxes": [],
+        }
+
+        config._handler.open()
 
-                # tell the result handler process we are done with the expansion processes
+        schedules = self._schedules(problem)
+        sizes = self._group_sizes(config, len(schedules))
+        rval = ctx.Queue()
+        halt = ctx.Event()
+        # Expanders of the running schedules, and the number of them that
+        # have not exited
+        groups: Dict[int, List[mp.Process]] = {}
+        running: Dict[int, int] = {}
+        pending = list(range(len(schedules)))
+        try:
+            # Search the coarser schedules of every schedule before the
+            # expanders start, so that they do not block the results
+            robust_labels = [
+                self._refine_schedule(problem, config, schedule, haltEvent)
+                for schedule in schedules
+            ]
+            while len(pending) > 0 or len(running) > 0:
+                if haltEvent is not None and haltEvent.is_set():
+                    halt.set()
+                while (
+                    len(pending) > 0
+                    and not halt.is_set()
+                    and sum(running.values()) + sizes[pending[0]]
+                    <= config.number_of_processes
+                ):
+                    group = pending.pop(0)
+                    groups[group] = self._start_group(
+                        ctx,
+                        rval,
+                        halt,
+                        problem,
+                        config,
+                        schedules[group],
+                        group,
+                        sizes[group],
+                        robust_labels=robust_labels[group],
+                    )
+                    running[group] = sizes[group]
+                if len(running) == 0:
+                    # Halted before starting the pending schedules
+                    break
                 try:
+                    result = rval.get(timeout=config.queue_timeout)
+                except Empty:
                     if config._wait_action is not None:
-                        while not starmap_result.ready():
-                            config._wait_action.run()
-                    if haltEvent is None:
-                        starmap_result.wait()
-                    else:
-                        while not starmap_result.wait(0.5):
-                            if haltEvent.is_set():
-                                break
+                        config._wait_action.run()
+                    if not any(
+                        p.is_alive() for g in running for p in groups[g]
+                    ):
+                        l.error("Expander processes exited unexpectedly")
+                        break
+                    continue
+                if isinstance(result, int):
+                    # An expander of the schedule exited
+                    running[result] -= 1
+                    if running[result] == 0:
+                        del running[result]
+                        self._join_group(groups.pop(result), config)
+                    continue
+                if isinstance(result, PhaseMetrics):
+                    problem._phase_metrics.merge(result.phases)
+                    continue
+                with problem._phase_metrics.phase(RESULT_HANDLER):
+                    self._handle_result(result, config, all_results)
+                if resultsCallback is not None:
+                    with problem._phase_metrics.phase(PROGRESS_CALLBACK):
+                        all_results["progress"] = resultsCallback(
+                            all_results["parameter_space"]
+                        )
+        except KeyboardInterrupt:
+            l.warning("--- Received Keyboard Interrupt ---")
+            halt.set()
 
-                except KeyboardInterrupt:
-                    l.warning("--- Received Keyboard Interrupt ---")
-
-                rval.put(None)
-                l.info("Waiting for result handler process")
-                # wait for the result handler to finish
-                rval_handler_process.wait(timeout=config.wait_timeout)
-
-                if not rval_handler_process.successful():
-                    l.error("Result handler failed to exit")
-                all_results = rval_handler_process.get()
-
-                parameter_space = ParameterSpace(
-                    true_boxes=all_results.get("true_boxes"),
-                    false_boxes=all_results.get("false_boxes"),
-                    true_points=all_results.get("true_points"),
-                    false_points=all_results.get("false_points"),
-                )
-                return parameter_space
+        for processes in groups.values():
+            self._join_group(processes, config)
+
+        config._handler.close()
+        return all_results["parameter_space"]
+
+    def _join_group(self, processes: List[mp.Process], config: "FUNMANConfig"):
+        for p in processes:
+            p.join(timeout=config.wait_timeout)
+            if p.is_alive():
+                l.error(f"{p.name} failed to exit")
+                p.terminate()
@@ -0,0 +1,384 @@
+"""
+This module defines the BoxContractor class, which shrinks the boxes of a
+BoxSearch by HC4 constraint propagation over the layers of the model encoding,
+so that the solver checks the queries of smaller boxes and the search labels
+the rest of each box false without the solver.
+"""
+
+import logging
+import math
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, ConfigDict
+from pysmt.fnode import FNode
+from pysmt.operators import (
+    DIV,
+    EQUALS,
+    LE,
+    LT,
+    MINUS,
+    PLUS,
+    POW,
+    SYMBOL,
+    TIMES,
+    TOREAL,
+)
+
+from ..representation.box import Box
+from ..scenario.scenario import AnalysisScenario
+
+l = logging.getLogger(__name__)
+
+# Maximum number of propagation sweeps over the constraints of a box
+MAX_SWEEPS = 8
+# Propagation stops after a sweep that shrinks every parameter by less than
+# this fraction of its width
+MIN_PROGRESS = 0.01
+
+# Closed interval [lo, hi] of the values of a variable or term
+Bounds = Tuple[float, float]
+
+UNBOUNDED: Bounds = (-math.inf, math.inf)
+
+
+class Infeasible(Exception):
+    """
+    Propagation emptied the domain of a variable.
+    """
+
+    pass
+
+
+class BoxContractor(BaseModel):
+    """
+    The BoxContractor narrows the parameter bounds of a box to the region
+    that can have true points at box.timestep().lb.  It collects the
+    arithmetic constraints (atoms) that the model encoding layers up to the
+    step assert when every assumption of the scenario holds (i.e., the
+    constraints of a true point), and revises the domains of their variables
+    with the HC4 algorithm: each revision evaluates the intervals of the
+    subterms of an atom from the domains (forward), and then projects the
+    relation onto the subterms and variables (backward).
+
+    The propagation ignores the constraints that it cannot revise (e.g.,
+    disjunctions), so the narrowed box contains every true point of the box,
+    and the rest of the box has none.  The interval arithmetic rounds to
+    nearest, which the search accounts for with a margin.
+
+    Parameters
+    ----------
+    problem : AnalysisScenario
+        scenario of the search
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    problem: AnalysisScenario
+    # Atoms (relation, lhs, rhs) of the layer at each step
+    _atoms: Dict[int, List[Tuple[int, FNode, FNode]]] = {}
+
+    def contract(
+        self, box: Box, encode_layer: Callable[[int], FNode]
+    ) -> Optional[Dict[str, Tuple[float, float]]]:
+        """
+        Narrow the parameter bounds of the box.
+
+        Parameters
+        ----------
+        box : Box
+            box to narrow
+        encode_layer : Callable[[int], FNode]
+            function returning the model encoding layer at a step
+
+        Returns
+        -------
+        Optional[Dict[str, Tuple[float, float]]]
+            narrowed (closed) bounds of each model parameter, or None if the
+            box has no true points
+        """
+        atoms = [
+            atom
+            for step in range(int(box.timestep().lb) + 1)
+            for atom in self._layer_atoms(step, encode_layer)
+        ]
+        parameters = [p.name for p in self.problem.model_parameters()]
+        domains = {
+            p: (float(box.bounds[p].lb), float(box.bounds[p].ub))
+            for p in parameters
+        }
+        try:
+            for _ in range(MAX_SWEEPS):
+                widths = {p: domains[p][1] - domains[p][0] for p in parameters}
+                for atom in atoms + atoms[::-1]:
+                    self._revise(atom, domains)
+                if all(
+                    widths[p] - (domains[p][1] - domains[p][0])
+                    <= MIN_PROGRESS * widths[p]
+                    for p in parameters
+                ):
+                    break
+        except Infeasible:
+            return None
+        return {p: domains[p] for p in parameters}
+
+    def _layer_atoms(
+        self, step: int, encode_layer: Callable[[int], FNode]
+    ) -> List[Tuple[int, FNode, FNode]]:
+        if step not in self._atoms:
+            self._atoms[step] = self._collect_atoms(
+                encode_layer(step), {str(a) for a in self.problem._assumptions}
+            )
+        return self._atoms[step]
+
+    def _collect_atoms(
+        self, formula: FNode, true_symbols: Set[str]
+    ) -> List[Tuple[int, FNode, FNode]]:
+        """
+        Get the atoms of the conjuncts of formula that hold if the symbols in
+        true_symbols hold.  An implication (or equivalence) with a true
+        symbol on the left holds its right side.
+        """
+        atoms = []
+        pending = [formula]
+        guarded = []
+        while pending or guarded:
+            if not pending:
+                # Guards that no conjunct made true
+                remaining = [
+                    (guard, f)
+                    for guard, f in guarded
+                    if guard.symbol_name() not in true_symbols
+                ]
+                if len(remaining) == len(guarded):
+                    break
+                pending = [
+                    f
+                    for guard, f in guarded
+                    if guard.symbol_name() in true_symbols
+                ]
+                guarded = remaining
+                continue
+            f = pending.pop()
+            if f.is_and():
+                pending += f.args()
+            elif f.is_symbol() and f.symbol_type().is_bool_type():
+                true_symbols.add(f.symbol_name())
+            elif (f.is_implies() or f.is_iff()) and f.arg(0).is_symbol():
+                guarded.append((f.arg(0), f.arg(1)))
+            elif f.node_type() in [EQUALS, LE, LT] and (
+                f.arg(0).get_type().is_real_type()
+            ):
+                atoms.append((f.node_type(), f.arg(0), f.arg(1)))
+        return atoms
+
+    def _revise(
+        self,
+        atom: Tuple[int, FNode, FNode],
+        domains: Dict[str, Bounds],
+    ):
+        relation, lhs, rhs = atom
+        values: Dict[FNode, Bounds] = {}
+        lhs_value = self._forward(lhs, domains, values)
+        rhs_value = self._forward(rhs, domains, values)
+        if relation == EQUALS:
+            self._backward(lhs, rhs_value, domains, values)
+            self._backward(rhs, lhs_value, domains, values)
+        else:
+            # lhs <= rhs (the closure of lhs < rhs)
+            self._backward(lhs, (-math.inf, rhs_value[1]), domains, values)
+            self._backward(rhs, (lhs_value[0], math.inf), domains, values)
+
+    def _forward(
+        self,
+        node: FNode,
+        domains: Dict[str, Bounds],
+        values: Dict[FNode, Bounds],
+    ) -> Bounds:
+        if node in values:
+            return values[node]
+        node_type = node.node_type()
+        args = node.args()
+        if node_type == SYMBOL:
+            value = domains.get(node.symbol_name(), UNBOUNDED)
+        elif node.is_constant():
+            value = (float(node.constant_value()),) * 2
+        elif node_type == PLUS:
+            value = (0.0, 0.0)
+            for arg in args:
+                value = _add(value, self._forward(arg, domains, values))
+        elif node_type == MINUS:
+            value = _sub(
+                self._forward(args[0], domains, values),
+                self._forward(args[1], domains, values),
+            )
+        elif node_type == TIMES:
+            value = (1.0, 1.0)
+            for arg in args:
+                value = _mul(value, self._forward(arg, domains, values))
+        elif node_type == DIV:
+            value = _div(
+                self._forward(args[0], domains, values),
+                self._forward(args[1], domains, values),
+            )
+        elif node_type == POW and args[1].is_constant():
+            value = _pow(
+                self._forward(args[0], domains, values),
+                float(args[1].constant_value()),
+            )
+        elif node_type == TOREAL:
+            value = self._forward(args[0], domains, values)
+        else:
+            value = UNBOUNDED
+        values[node] = value
+        return value
+
+    def _backward(
+        self,
+        node: FNode,
+        target: Bounds,
+        domains: Dict[str, Bounds],
+        values: Dict[FNode, Bounds],
+    ):
+        """
+        Narrow the domains of the variables of node to the values for which
+        node can be in target.
+        """
+        value = _intersect(values[node], target)
+        node_type = node.node_type()
+        args = node.args()
+        if node_type == SYMBOL:
+            domains[node.symbol_name()] = value
+        elif node_type == PLUS:
+            for i, arg in enumerate(args):
+                others = (0.0, 0.0)
+                for j, other in enumerate(args):
+                    if j != i:
+                        others = _add(others, values[other])
+                self._backward(arg, _sub(value, others), domains, values)
+        elif node_type == MINUS:
+            self._backward(
+                args[0], _add(value, values[args[1]]), domains, values
+            )
+            self._backward(
+                args[1], _sub(values[args[0]], value), domains, values
+            )
+        elif node_type == TIMES:
+            for i, arg in enumerate(args):
+                others = (1.0, 1.0)
+                for j, other in enumerate(args):
+                    if j != i:
+                        others = _mul(others, values[other])
+                if not _contains_zero(others):
+                    self._backward(arg, _div(value, others), domains, values)
+        elif node_type == DIV:
+            self._backward(
+                args[0], _mul(value, values[args[1]]), domains, values
+            )
+            if not _contains_zero(value):
+                self._backward(
+                    args[1], _div(values[args[0]], value), domains, values
+                )
+        elif node_type == POW and args[1].is_constant():
+            root = _root(
+                value, values[args[0]], float(args[1].constant_value())
+            )
+            if root is not None:
+                self._backward(args[0], root, domains, values)
+        elif node_type == TOREAL:
+            self._backward(args[0], value, domains, values)
+
+
+def _bounds(lo: float, hi: float) -> Bounds:
+    # An undefined bound (e.g., inf - inf) is unbounded, and the others are
+    # rounded outward, so that they contain the exact result
+    return (
+        -math.inf if lo != lo else math.nextafter(lo, -math.inf),
+        math.inf if hi != hi else math.nextafter(hi, math.inf),
+    )
+
+
+def _add(a: Bounds, b: Bounds) -> Bounds:
+    return _bounds(a[0] + b[0], a[1] + b[1])
+
+
+def _sub(a: Bounds, b: Bounds) -> Bounds:
+    return _bounds(a[0] - b[1], a[1] - b[0])
+
+
+def _times(x: float, y: float) -> float:
+    # 0 * inf is 0 for the product of extended intervals
+    return 0.0 if x == 0 or y == 0 else x * y
+
+
+def _mul(a: Bounds, b: Bounds) -> Bounds:
+    products = [_times(x, y) for x in a for y in b]
+    return _bounds(min(products), max(products))
+
+
+def _div(a: Bounds, b: Bounds) -> Bounds:
+    if _contains_zero(b):
+        return UNBOUNDED
+    return _mul(a, _bounds(1.0 / b[1], 1.0 / b[0]))
+
+
+def _pow(a: Bounds, exponent: float) -> Bounds:
+    if exponent == 0:
+        return (1.0, 1.0)
+    elif exponent < 0:
+        return _div((1.0, 1.0), _pow(a, -exponent))
+    elif not exponent.is_integer():
+        # Fractional powers are undefined for negative values
+        return (
+            _bounds(a[0] ** exponent, a[1] ** exponent)
+            if a[0] >= 0
+            else UNBOUNDED
+        )
+    try:
+        lo, hi = a[0] ** exponent, a[1] ** exponent
+    except OverflowError:
+        return UNBOUNDED
+    if exponent % 2 == 1:
+        return _bounds(lo, hi)
+    elif a[0] > 0:
+        return _bounds(lo, hi)
+    elif a[1] < 0:
+        return _bounds(hi, lo)
+    return (0.0, math.nextafter(max(lo, hi), math.inf))
+
+
+def _intersect(a: Bounds, b: Bounds) -> Bounds:
+    lo, hi = max(a[0], b[0]), min(a[1], b[1])
+    if lo > hi:
+        raise Infeasible()
+    return (lo, hi)
+
+
+def _contains_zero(a: Bounds) -> bool:
+    return not (a[0] > 0 or a[1] < 0)
+
+
+def _root(value: Bounds, base: Bounds, exponent: float) -> Optional[Bounds]:
+    """
+    Bounds of the values x in base such that x ** exponent is in value, or
+    None if they are not narrower than base.
+    """
+    if exponent <= 0 or not exponent.is_integer():
+        return None
+    if exponent % 2 == 1:
+        return _bounds(
+            _odd_root(value[0], exponent), _odd_root(value[1], exponent)
+        )
+    if value[1] < 0:
+        raise Infeasible()
+    lo, hi = _bounds(
+        max(value[0], 0.0) ** (1.0 / exponent), value[1] ** (1.0 / exponent)
+    )
+    if base[0] >= 0:
+        return (lo, hi)
+    elif base[1] <= 0:
+        return (-hi, -lo)
+    return (-hi, hi)
+
+
+def _odd_root(x: float, exponent: float) -> float:
+    return math.copysign(abs(x) ** (1.0 / exponent), x)
@@ -0,0 +1,564 @@
+"""
+This module defines the IntervalEnclosure class, which labels the boxes of a
+BoxSearch by propagating interval enclosures of the model state through the
+forward Euler steps of the encoding, so that the search only calls the SMT
+solver for the boxes that the enclosure cannot decide.
+"""
+
+import logging
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import sympy
+from pydantic import BaseModel, ConfigDict
+
+from funman.constants import LABEL_FALSE, LABEL_TRUE
+from funman.utils.sympy_utils import to_sympy
+
+from ..model.query import QueryAnd, QueryGE, QueryLE, QueryTrue
+from ..representation import Point
+from ..representation.box import Box
+from ..representation.constraint import (
+    FunmanConstraint,
+    LinearConstraint,
+    ModelConstraint,
+    ParameterConstraint,
+    QueryConstraint,
+    StateVariableConstraint,
+)
+from ..representation.encoding_schedule import EncodingSchedule
+from ..representation.interval import Interval
+from ..scenario.scenario import AnalysisScenario
+
+l = logging.getLogger(__name__)
+
+
+class IntervalArray:
+    """
+    Array of intervals [lo, hi] with the arithmetic of the transition rates,
+    so that sympy.lambdify() compiles a rate into a function over intervals.
+    Each operation returns intervals that contain the result for any values
+    in the intervals of its operands, and rounds the bounds of an inexact
+    result outward, so that they also contain the exact result of the
+    operation.  An unbounded result has infinite bounds, and an undefined
+    result (e.g., inf - inf) has nan bounds.
+    """
+
+    __slots__ = ("lo", "hi")
+    # Let numpy scalars defer to the reflected operators
+    __array_ufunc__ = None
+
+    def __init__(self, lo, hi):
+        self.lo = np.asarray(lo, dtype=float)
+        self.hi = np.asarray(hi, dtype=float)
+
+    def __add__(self, other):
+        other = _interval(other)
+        lo, hi = self.lo + other.lo, self.hi + other.hi
+        # A sum is exact if an operand or the sum is 0
+        return IntervalArray(
+            _down(lo, (self.lo == 0) | (other.lo == 0) | (lo == 0)),
+            _up(hi, (self.hi == 0) | (other.hi == 0) | (hi == 0)),
+        )
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return IntervalArray(-self.hi, -self.lo)
+
+    def __sub__(self, other):
+        return self + (-_interval(other))
+
+    def __rsub__(self, other):
+        return _interval(other) + (-self)
+
+    def __mul__(self, other):
+        other = _interval(other)
+        operands = [
+            (self.lo, other.lo),
+            (self.lo, other.hi),
+            (self.hi, other.lo),
+            (self.hi, other.hi),
+        ]
+        products = np.stack([_mul(a, b) for a, b in operands])
+        # A product is exact if an operand is 0 or +/-1
+        exact = np.stack(
+            [
+                (np.abs(a) == 1) | (np.abs(b) == 1) | (_mul(a, b) == 0)
+                for a, b in operands
+            ]
+        )
+        return IntervalArray(
+            _down(products, exact).min(axis=0),
+            _up(products, exact).max(axis=0),
+        )
+
+    __rmul__ = __mul__
+
+    def reciprocal(self) -> "IntervalArray":
+        with np.errstate(divide="ignore"):
+            # 1/x is unbounded on intervals that contain 0
+            spans_zero = (self.lo <= 0) & (self.hi >= 0)
+            return IntervalArray(
+                np.where(spans_zero, -np.inf, _down(1.0 / self.hi)),
+                np.where(spans_zero, np.inf, _up(1.0 / self.lo)),
+            )
+
+    def __truediv__(self, other):
+        return self * _interval(other).reciprocal()
+
+    def __rtruediv__(self, other):
+        return _interval(other) * self.reciprocal()
+
+    def __pow__(self, exponent):
+        if isinstance(exponent, IntervalArray):
+            raise NotImplementedError(
+                "Cannot enclose powers with a variable exponent"
+            )
+        exponent = float(exponent)
+        if exponent == 0:
+            return IntervalArray(np.ones_like(self.lo), np.ones_like(self.hi))
+        if exponent < 0:
+            return (self ** (-exponent)).reciprocal()
+        with np.errstate(over="ignore", invalid="ignore"):
+            lo, hi = self.lo**exponent, self.hi**exponent
+        # The powers of 0 are exact
+        lo_down, lo_up = _down(lo, self.lo == 0), _up(lo, self.lo == 0)
+        hi_down, hi_up = _down(hi, self.hi == 0), _up(hi, self.hi == 0)
+        if not exponent.is_integer():
+            # Fractional powers are undefined for negative values
+            negative = self.lo < 0
+            return IntervalArray(
+                np.where(negative, -np.inf, lo_down),
+                np.where(negative, np.inf, hi_up),
+            )
+        if exponent % 2 == 1:
+            return IntervalArray(lo_down, hi_up)
+        return IntervalArray(
+            np.where(
+                self.lo > 0, lo_down, np.where(self.hi < 0, hi_down, 0.0)
+            ),
+            np.maximum(lo_up, hi_up),
+        )
+
+    def __repr__(self) -> str:
+        return f"IntervalArray({self.lo}, {self.hi})"
+
+
+def _interval(value) -> IntervalArray:
+    if isinstance(value, IntervalArray):
+        return value
+    return IntervalArray(value, value)
+
+
+def _down(x: np.ndarray, exact=False) -> np.ndarray:
+    """
+    Round the lower bounds x of inexact results down to the next float.
+    """
+    return np.where(exact, x, np.nextafter(x, -np.inf))
+
+
+def _up(x: np.ndarray, exact=False) -> np.ndarray:
+    """
+    Round the upper bounds x of inexact results up to the next float.
+    """
+    return np.where(exact, x, np.nextafter(x, np.inf))
+
+
+def _mul(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # 0 * inf is 0 for the product of extended intervals
+    with np.errstate(invalid="ignore", over="ignore"):
+        return np.where((a == 0) | (b == 0), 0.0, a * b)
+
+
+def _exp(x: IntervalArray) -> IntervalArray:
+    with np.errstate(over="ignore"):
+        return IntervalArray(_down(np.exp(x.lo)), _up(np.exp(x.hi)))
+
+
+def _log(x: IntervalArray) -> IntervalArray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return IntervalArray(
+            np.where(x.lo > 0, _down(np.log(np.maximum(x.lo, 0))), -np.inf),
+            np.where(x.hi > 0, _up(np.log(np.maximum(x.hi, 0))), np.nan),
+        )
+
+
+def _sqrt(x: IntervalArray) -> IntervalArray:
+    return x**0.5
+
+
+# Functions of the rate expressions that lambdify() maps to intervals
+INTERVAL_FUNCTIONS = {"exp": _exp, "log": _log, "sqrt": _sqrt}
+
+
+class IntervalEnclosure(BaseModel):
+    """
+    The IntervalEnclosure encloses the states that the points of a box reach
+    at each step of the schedule.  It evaluates the transition rates of a
+    Petri net model over the intervals of the parameters and states, and
+    takes the same forward Euler steps as the SMT encoding, so that the
+    enclosure at each step contains the state of every point of the box.
+
+    If the enclosure satisfies the constraints at every step up to the
+    timestep of a box, then every point of the box is true, and if it
+    violates a constraint at any of these steps, then every point is false.
+    Otherwise, the enclosure is too wide to label the box, which is common
+    for wide boxes and late steps, and the search calls the solver.
+
+    The enclosure is exact for the rates, so the search only uses it if the
+    SMT encoding does not approximate them with a series
+    (config.series_approximation_threshold).
+
+    Parameters
+    ----------
+    problem : AnalysisScenario
+        scenario of the search
+    schedule : EncodingSchedule
+        schedule of the search episode
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    problem: AnalysisScenario
+    schedule: EncodingSchedule
+    _enabled: bool = True
+    _constraints: List[FunmanConstraint] = []
+    _stoichiometry: np.ndarray = None
+    _rates: Callable = None
+    _timed: bool = False
+    _init: List[Callable] = []
+    # Parameter bounds and state enclosure of the last box, which the
+    # queries at each step of the box share
+    _last: Tuple = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        model = self.problem.model
+        if not hasattr(model, "_rate_expressions") or not getattr(
+            model, "_is_differentiable", False
+        ):
+            l.info(
+                f"Not enclosing boxes, because the rates of {type(model).__name__} models cannot be enclosed"
+            )
+            self._enabled = False
+            return
+        self._constraints = [
+            c
+            for c in self.problem.constraints
+            if not isinstance(c, ModelConstraint)
+        ]
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def _compile(self, config: "FUNMANConfig"):
+        model = self.problem.model
+        states = model._state_var_names()
+        symbols = [sympy.Symbol(s) for s in model._unreserved_symbols()]
+        self._stoichiometry = model._stoichiometry()
+        self._rates = sympy.lambdify(
+            symbols,
+            model._rate_expressions(),
+            modules=[INTERVAL_FUNCTIONS, "math"],
+        )
+        # Only models with a time variable have a rate argument for t
+        self._timed = len(symbols) > len(states) + len(
+            model._parameter_names()
+        )
+        parameter_symbols = [sympy.Symbol(p) for p in model._parameter_names()]
+        self._init = [
+            sympy.lambdify(
+                parameter_symbols, init, modules=[INTERVAL_FUNCTIONS, "math"]
+            )
+            for init in self._init_expressions(config)
+        ]
+
+    def _init_expressions(self, config: "FUNMANConfig") -> List[sympy.Expr]:
+        """
+        Initial value of each state variable, as a sympy expression over the
+        model parameters.
+        """
+        model = self.problem.model
+        return [
+            sympy.sympify(
+                str(
+                    to_sympy(
+                        model._get_init_value(var, self.problem, config),
+                        model._symbols(),
+                    )
+                )
+            )
+            for var in model._state_var_names()
+        ]
+
+    def enclose(
+        self, lb: np.ndarray, ub: np.ndarray, steps: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Enclose the states of the points between lb and ub.
+
+        Parameters
+        ----------
+        lb : np.ndarray
+            (N x P) array with one row of self.problem.model._parameter_names()
+            lower bounds per box
+        ub : np.ndarray
+            (N x P) array of the upper bounds
+        steps : int
+            number of steps of the schedule to enclose
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            (N x steps + 1 x S) arrays of the lower and upper bounds of the
+            state variables (ordered as model._state_var_names()) at each
+            time in the schedule
+        """
+        num_boxes = lb.shape[0]
+        parameters = [
+            IntervalArray(lb[:, i], ub[:, i]) for i in range(lb.shape[1])
+        ]
+        init = [_interval(f(*parameters)) for f in self._init]
+        num_vars = len(init)
+        lo = np.empty((num_boxes, steps + 1, num_vars))
+        hi = np.empty((num_boxes, steps + 1, num_vars))
+        lo[:, 0, :] = np.array(
+            [np.broadcast_to(x.lo, num_boxes) for x in init]
+        ).T
+        hi[:, 0, :] = np.array(
+            [np.broadcast_to(x.hi, num_boxes) for x in init]
+        ).T
+
+        timepoints = self.schedule.timepoints
+        for i in range(1, steps + 1):
+            t = timepoints[i - 1]
+            states = [
+                IntervalArray(lo[:, i - 1, j], hi[:, i - 1, j])
+                for j in range(num_vars)
+            ]
+            args = (
+                (*states, *parameters, t)
+                if self._timed
+                else (*states, *parameters)
+            )
+            rates = [_interval(r) for r in self._rates(*args)]
+            step_size = timepoints[i] - t
+            with np.errstate(invalid="ignore", over="ignore"):
+                for j, state in enumerate(states):
+                    # The rates of a transition change each state by its
+                    # (positive or negative) stoichiometry
+                    change = sum(
+                        (
+                            float(n) * rate
+                            for n, rate in zip(self._stoichiometry[j], rates)
+                            if n != 0
+                        ),
+                        _interval(0.0),
+                    )
+                    state = state + step_size * change
+                    lo[:, i, j] = np.broadcast_to(state.lo, num_boxes)
+                    hi[:, i, j] = np.broadcast_to(state.hi, num_boxes)
+        return lo, hi
+
+    def _parameter_bounds(self, box: Box) -> Tuple[np.ndarray, np.ndarray]:
+        names = self.problem.model._parameter_names()
+        lb = np.array([[float(box.bounds[p].lb) for p in names]])
+        ub = np.array([[float(box.bounds[p].ub) for p in names]])
+        return lb, ub
+
+    def _box_enclosure(self, box: Box):
+        lb, ub = self._parameter_bounds(box)
+        steps = min(int(box.timestep().ub), len(self.schedule.timepoints) - 1)
+        if (
+            self._last is None
+            or self._last[2] < steps
+            or not np.array_equal(self._last[0], lb)
+            or not np.array_equal(self._last[1], ub)
+        ):
+            self._last = (lb, ub, steps, *self.enclose(lb, ub, steps))
+        return self._last
+
+    def label(self, box: Box, config: "FUNMANConfig") -> Optional[str]:
+        """
+        Label the points of the box at box.timestep().lb.
+
+        Returns
+        -------
+        Optional[str]
+            LABEL_TRUE if every point of the box is true, LABEL_FALSE if every
+            point is false, and None if the enclosure cannot tell
+        """
+        if not self._enabled:
+            return None
+        try:
+            if self._rates is None:
+                self._compile(config)
+            holds, fails = self._check_parameters(box)
+            if fails:
+                return LABEL_FALSE
+            _, _, _, lo, hi = self._box_enclosure(box)
+            step = int(box.timestep().lb)
+            states_hold, states_fail = self._check(
+                lo[:, : step + 1, :], hi[:, : step + 1, :]
+            )
+        except (
+            NotImplementedError,
+            AttributeError,
+            KeyError,
+            ValueError,
+            TypeError,
+        ) as e:
+            l.info(f"Not enclosing boxes, because the enclosure failed: {e}")
+            self._enabled = False
+            return None
+        if states_fail[0]:
+            return LABEL_FALSE
+        elif holds and states_hold[0]:
+            return LABEL_TRUE
+        return None
+
+    def _check_parameters(self, box: Box) -> Tuple[bool, bool]:
+        """
+        Check the parameter constraints on the box.
+
+        Returns
+        -------
+        Tuple[bool, bool]
+            whether the points of the box all satisfy every parameter
+            constraint, and whether they all violate one of them
+        """
+        holds, fails = True, False
+        for constraint in self._constraints:
+            if isinstance(constraint, ParameterConstraint):
+                interval = constraint.parameter.interval
+                bounds = box.bounds[constraint.parameter.name]
+                holds &= interval.contains(bounds)
+                fails |= not interval.intersects(bounds)
+        return holds, fails
+
+    def witness(self, box: Box, label: str) -> Point:
+        """
+        Get the center of a box that label() labeled, with its trajectory.
+        """
+        lb, ub = self._parameter_bounds(box)
+        center = (lb + ub) / 2.0
+        step = int(box.timestep().lb)
+        trajectory, _ = self.enclose(center, center, step)
+        model = self.problem.model
+        values = {
+            f"{var}_{t}": float(trajectory[0, i, j])
+            for i, t in enumerate(self.schedule.timepoints[: step + 1])
+            for j, var in enumerate(model._state_var_names())
+        }
+        values.update(
+            {p: float(v) for p, v in zip(model._parameter_names(), center[0])}
+        )
+        values["timestep"] = step
+        return Point(values=values, label=label, schedule=self.schedule)
+
+    def _check(
+        self, lo: np.ndarray, hi: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Check the constraints on the states, other than the parameter
+        constraints, on the enclosures of the boxes.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            (N) arrays of bool that are True for each box whose points all
+            satisfy every constraint, and for each box whose points all
+            violate a constraint
+        """
+        holds = np.ones(lo.shape[0], dtype=bool)
+        fails = np.zeros(lo.shape[0], dtype=bool)
+        timepoints = self.schedule.timepoints[: lo.shape[1]]
+        for constraint in self._constraints:
+            if isinstance(constraint, ParameterConstraint):
+                continue
+            in_time = np.array(
+                [constraint.relevant_at_time(t) for t in timepoints],
+                dtype=bool,
+            )
+            if isinstance(constraint, StateVariableConstraint):
+                values_lo, values_hi = self._state_values(
+                    lo, hi, constraint.variable
+                )
+                c_holds = _within(values_lo, values_hi, constraint.interval)
+                c_fails = _outside(values_lo, values_hi, constraint.interval)
+            elif isinstance(constraint, LinearConstraint):
+                if constraint.derivative:
+                    raise NotImplementedError(
+                        "Cannot enclose derivative constraints"
+                    )
+                values = sum(
+                    w * IntervalArray(*self._state_values(lo, hi, v))
+                    for w, v in zip(constraint.weights, constraint.variables)
+                )
+                c_holds = _within(
+                    values.lo, values.hi, constraint.additive_bounds
+                )
+                c_fails = _outside(
+                    values.lo, values.hi, constraint.additive_bounds
+                )
+            elif isinstance(constraint, QueryConstraint):
+                c_holds, c_fails = self._query(constraint.query, lo, hi)
+            else:
+                raise NotImplementedError(
+                    f"Cannot enclose {type(constraint).__name__}"
+                )
+            holds &= np.all(c_holds | ~in_time, axis=1)
+            fails |= np.any(c_fails & in_time, axis=1)
+        return holds, fails
+
+    def _state_values(
+        self, lo: np.ndarray, hi: np.ndarray, var: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        state_vars = self.problem.model._state_var_names()
+        if var not in state_vars:
+            raise NotImplementedError(
+                f"Cannot enclose {var}, only the state variables {state_vars} are enclosed"
+            )
+        i = state_vars.index(var)
+        return lo[:, :, i], hi[:, :, i]
+
+    def _query(
+        self, query, lo: np.ndarray, hi: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        holds = np.ones(lo.shape[:2], dtype=bool)
+        fails = np.zeros(lo.shape[:2], dtype=bool)
+        if isinstance(query, QueryAnd):
+            for q in query.queries:
+                q_holds, q_fails = self._query(q, lo, hi)
+                holds &= q_holds
+                fails |= q_fails
+            return holds, fails
+        elif isinstance(query, QueryTrue):
+            return holds, fails
+        elif isinstance(query, (QueryLE, QueryGE)):
+            values_lo, values_hi = self._state_values(
+                lo, hi, str(query.variable)
+            )
+            # The encoding asserts the query at every step, even if it is
+            # at_end, so the enclosure checks it at every step
+            if isinstance(query, QueryLE):
+                return values_hi <= query.ub, values_lo > query.ub
+            else:
+                return values_lo >= query.lb, values_hi < query.lb
+        raise NotImplementedError(f"Cannot enclose {type(query).__name__}")
+
+
+def _within(lo: np.ndarray, hi: np.ndarray, interval: Interval) -> np.ndarray:
+    below_ub = (
+        hi <= interval.ub if interval.closed_upper_bound else hi < interval.ub
+    )
+    return (lo >= interval.lb) & below_ub
+
+
+def _outside(lo: np.ndarray, hi: np.ndarray, interval: Interval) -> np.ndarray:
+    above_ub = (
+        lo > interval.ub if interval.closed_upper_bound else lo >= interval.ub
+    )
+    return (hi < interval.lb) | above_ub
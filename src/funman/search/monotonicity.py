@@ -0,0 +1,298 @@
+"""
+This module defines the MonotonicityAnalysis class, which labels the boxes of
+a BoxSearch from the states at their corners, when the states are monotone in
+the parameters over the box, so that the search does not split a box that
+the interval enclosure of its states is too wide to label.
+"""
+
+import logging
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import sympy
+from pydantic import BaseModel, ConfigDict
+
+from funman.constants import LABEL_FALSE, LABEL_TRUE
+
+from ..representation.box import Box
+from .enclosure import (
+    INTERVAL_FUNCTIONS,
+    IntervalArray,
+    IntervalEnclosure,
+    _interval,
+)
+
+l = logging.getLogger(__name__)
+
+
+class MonotonicityAnalysis(BaseModel):
+    """
+    The MonotonicityAnalysis differentiates the transition rates of a Petri
+    net model (and the initial states) with respect to the states and
+    parameters, and propagates an interval enclosure of the sensitivity of
+    each state to each parameter through the forward Euler steps of the
+    encoding, over the state enclosure of a box, with the outward rounded
+    arithmetic of the enclosure.  If the sensitivity of a state at a step to
+    a parameter does not change sign over the box, then the state is
+    monotone in the parameter, and takes its least (greatest) value over the
+    box on the face of the box where the parameter is at the bound that the
+    sign picks.
+
+    For each state and step, the analysis encloses the state over the faces
+    that the monotone parameters pick, which are the two corners of the box
+    if the state is monotone in every parameter, and labels the box if these
+    (much narrower) bounds satisfy or violate the constraints.  Contact and
+    recovery rates, for instance, are monotone over most of the ranges of
+    interest, whereas the enclosure of a box widens with its width and the
+    number of steps.
+
+    Parameters
+    ----------
+    enclosure : IntervalEnclosure
+        enclosure of the states of the boxes, which the analysis narrows
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    enclosure: IntervalEnclosure
+    # Jacobians of the rates, with respect to the states and parameters, and
+    # of the initial states, with respect to the parameters
+    _rates_jacobian: Callable = None
+    _init_jacobian: Callable = None
+    _enabled: bool = True
+    # State enclosure of the last box and its narrowed bounds
+    _last: Tuple = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and self.enclosure.enabled
+
+    def _compile(self, config: "FUNMANConfig"):
+        model = self.enclosure.problem.model
+        num_vars = len(model._state_var_names())
+        num_parameters = len(model._parameter_names())
+        symbols = [sympy.Symbol(s) for s in model._unreserved_symbols()]
+        rates_jacobian = sympy.Matrix(model._rate_expressions()).jacobian(
+            symbols[: num_vars + num_parameters]
+        )
+        self._rates_jacobian = sympy.lambdify(
+            symbols,
+            list(rates_jacobian),
+            modules=[INTERVAL_FUNCTIONS, "math"],
+        )
+        parameter_symbols = [sympy.Symbol(p) for p in model._parameter_names()]
+        init_jacobian = sympy.Matrix(
+            self.enclosure._init_expressions(config)
+        ).jacobian(parameter_symbols)
+        self._init_jacobian = sympy.lambdify(
+            parameter_symbols,
+            list(init_jacobian),
+            modules=[INTERVAL_FUNCTIONS, "math"],
+        )
+
+    def sensitivity(
+        self, lb: np.ndarray, ub: np.ndarray, lo: np.ndarray, hi: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Enclose the sensitivity of the states to the parameters for the
+        points between lb and ub.
+
+        Parameters
+        ----------
+        lb : np.ndarray
+            (N x P) array of the parameter lower bounds of each box
+        ub : np.ndarray
+            (N x P) array of the parameter upper bounds
+        lo : np.ndarray
+            (N x T x S) array of the lower bounds of the states at each step,
+            as IntervalEnclosure.enclose() returns them
+        hi : np.ndarray
+            (N x T x S) array of the upper bounds of the states
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            (N x T x S x P) arrays of the lower and upper bounds of the
+            derivative of each state at each step with respect to each
+            parameter, which are nan where the enclosure is undefined
+        """
+        num_boxes, steps, num_vars = lo.shape
+        num_parameters = lb.shape[1]
+        parameters = [
+            IntervalArray(lb[:, i], ub[:, i]) for i in range(num_parameters)
+        ]
+        d_lo = np.empty((num_boxes, steps, num_vars, num_parameters))
+        d_hi = np.empty((num_boxes, steps, num_vars, num_parameters))
+        d_lo[:, 0], d_hi[:, 0] = _bounds(
+            self._init_jacobian(*parameters),
+            (num_boxes, num_vars, num_parameters),
+        )
+
+        stoichiometry = _interval(
+            self.enclosure._stoichiometry[None].astype(float)
+        )
+        timepoints = self.enclosure.schedule.timepoints
+        for i in range(1, steps):
+            t = timepoints[i - 1]
+            states = [
+                IntervalArray(lo[:, i - 1, j], hi[:, i - 1, j])
+                for j in range(num_vars)
+            ]
+            args = (
+                (*states, *parameters, t)
+                if self.enclosure._timed
+                else (*states, *parameters)
+            )
+            j_lo, j_hi = _bounds(
+                self._rates_jacobian(*args),
+                (num_boxes, -1, num_vars + num_parameters),
+            )
+            states_jacobian = IntervalArray(
+                j_lo[:, :, :num_vars], j_hi[:, :, :num_vars]
+            )
+            partials = IntervalArray(
+                j_lo[:, :, num_vars:], j_hi[:, :, num_vars:]
+            )
+            d = IntervalArray(d_lo[:, i - 1], d_hi[:, i - 1])
+            with np.errstate(invalid="ignore", over="ignore"):
+                # d rates / d parameters = d rates / d states * d states / d
+                # parameters + the partial derivatives of the rates
+                rates = _matmul(states_jacobian, d) + partials
+                change = _matmul(stoichiometry, rates)
+                d = d + (timepoints[i] - t) * change
+            d_lo[:, i], d_hi[:, i] = d.lo, d.hi
+        return d_lo, d_hi
+
+    def narrow(
+        self, lb: np.ndarray, ub: np.ndarray, lo: np.ndarray, hi: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Narrow the state enclosure (lo, hi) of the points between lb and ub
+        to the enclosure over the faces that the monotone parameters of each
+        state pick.  The arguments are as for sensitivity().
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            (N x T x S) arrays of the narrowed lower and upper bounds
+        """
+        d_lo, d_hi = self.sensitivity(lb, ub, lo, hi)
+        # The states do not depend on the parameters fixed by the box (and
+        # nan sensitivities are neither increasing nor decreasing)
+        fixed = (ub == lb)[:, None, None, :]
+        with np.errstate(invalid="ignore"):
+            increasing = (d_lo >= 0) | fixed
+            decreasing = (d_hi <= 0) & ~increasing
+        monotone = np.any((increasing | decreasing) & ~fixed, axis=3)
+        if not np.any(monotone):
+            return lo, hi
+
+        # Faces of the least and greatest values of each state and step
+        box_lb = np.broadcast_to(lb[:, None, None, :], d_lo.shape)
+        box_ub = np.broadcast_to(ub[:, None, None, :], d_lo.shape)
+        least = (
+            np.where(decreasing, box_ub, box_lb),
+            np.where(increasing, box_lb, box_ub),
+        )
+        greatest = (
+            np.where(increasing, box_ub, box_lb),
+            np.where(decreasing, box_lb, box_ub),
+        )
+        faces = np.concatenate(
+            [
+                np.concatenate(least, axis=3)[monotone],
+                np.concatenate(greatest, axis=3)[monotone],
+            ]
+        )
+        # The states at a step often pick the same faces
+        faces, index = np.unique(faces, axis=0, return_inverse=True)
+        index = index.reshape(2, -1)
+        num_parameters = lb.shape[1]
+        faces_lo, faces_hi = self.enclosure.enclose(
+            faces[:, :num_parameters],
+            faces[:, num_parameters:],
+            lo.shape[1] - 1,
+        )
+
+        boxes, steps, states = np.nonzero(monotone)
+        lo, hi = lo.copy(), hi.copy()
+        lo[monotone] = np.fmax(lo[monotone], faces_lo[index[0], steps, states])
+        hi[monotone] = np.fmin(hi[monotone], faces_hi[index[1], steps, states])
+        return lo, hi
+
+    def _box_enclosure(self, box: Box) -> Tuple[np.ndarray, np.ndarray]:
+        bounds = self.enclosure._box_enclosure(box)
+        if self._last is None or self._last[0] is not bounds:
+            lb, ub, _, lo, hi = bounds
+            self._last = (bounds, *self.narrow(lb, ub, lo, hi))
+        return self._last[1:]
+
+    def label(self, box: Box, config: "FUNMANConfig") -> Optional[str]:
+        """
+        Label the points of the box at box.timestep().lb.
+
+        Returns
+        -------
+        Optional[str]
+            LABEL_TRUE if every point of the box is true, LABEL_FALSE if every
+            point is false, and None if the analysis cannot tell
+        """
+        if not self.enabled:
+            return None
+        try:
+            if self.enclosure._rates is None:
+                self.enclosure._compile(config)
+            if self._rates_jacobian is None:
+                self._compile(config)
+            holds, fails = self.enclosure._check_parameters(box)
+            if fails:
+                return LABEL_FALSE
+            lo, hi = self._box_enclosure(box)
+            step = int(box.timestep().lb)
+            states_hold, states_fail = self.enclosure._check(
+                lo[:, : step + 1, :], hi[:, : step + 1, :]
+            )
+        except (
+            NotImplementedError,
+            AttributeError,
+            KeyError,
+            ValueError,
+            TypeError,
+        ) as e:
+            l.info(
+                f"Not analyzing the monotonicity of boxes, because the analysis failed: {e}"
+            )
+            self._enabled = False
+            return None
+        if states_fail[0]:
+            return LABEL_FALSE
+        elif holds and states_hold[0]:
+            return LABEL_TRUE
+        return None
+
+
+def _bounds(values: List, shape: Tuple) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the arrays of the lower and upper bounds of the (flattened) interval
+    matrices in values, with the shape (N x ...) of the matrices.
+    """
+    values = [_interval(v) for v in values]
+    lo = np.array([np.broadcast_to(v.lo, shape[0]) for v in values]).T
+    hi = np.array([np.broadcast_to(v.hi, shape[0]) for v in values]).T
+    return lo.reshape(shape), hi.reshape(shape)
+
+
+def _matmul(a: IntervalArray, b: IntervalArray) -> IntervalArray:
+    """
+    Product of the (N x R x S) and (N x S x P) interval matrices a and b,
+    where N may be 1 for either of them, rounded outward.
+    """
+    products = IntervalArray(a.lo[:, :, :, None], a.hi[:, :, :, None]) * (
+        IntervalArray(b.lo[:, None, :, :], b.hi[:, None, :, :])
+    )
+    product = IntervalArray(products.lo[:, :, 0], products.hi[:, :, 0])
+    for k in range(1, products.lo.shape[2]):
+        product = product + IntervalArray(
+            products.lo[:, :, k], products.hi[:, :, k]
+        )
+    return product
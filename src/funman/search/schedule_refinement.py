@@ -0,0 +1,395 @@
+"""
+This module defines the ScheduleRefinement class, which derives coarser
+schedules from the schedule of a BoxSearch, and the RobustLabels class, which
+keeps the labels that the searches of the coarser schedules show to hold for
+the schedule, so that the search of the schedule only checks the (deep)
+queries of the boxes that the coarser schedules leave undecided.
+"""
+
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from funman.constants import (
+    LABEL_FALSE,
+    LABEL_TRUE,
+    NEG_INFINITY,
+    POS_INFINITY,
+)
+from funman.model.query import Query, QueryAnd, QueryGE, QueryLE, QueryTrue
+
+from ..representation.box import Box
+from ..representation.constraint import (
+    LinearConstraint,
+    ModelConstraint,
+    ParameterConstraint,
+    QueryConstraint,
+    StateVariableConstraint,
+)
+from ..representation.encoding_schedule import EncodingSchedule
+from ..representation.interval import Interval
+from ..representation.parameter import Schedules
+from ..scenario.scenario import AnalysisScenario
+
+l = logging.getLogger(__name__)
+
+
+class RobustLabels(BaseModel):
+    """
+    The RobustLabels keep the regions of the parameters that the search of a
+    coarser schedule shows to have no true (or false) points over a range of
+    the steps of the schedule.  Every box in a region has the other label at
+    the steps of its range, so the search of the schedule labels the box
+    without checking its queries.  The searches of the coarser schedules
+    share the labels through a view that maps their steps to the steps of the
+    schedule.
+
+    Parameters
+    ----------
+    parameters : List[str]
+        names of the model parameters
+    steps : Optional[List[int]]
+        step of the schedule at each step of the schedule that looks up the
+        labels (the same step if None)
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    parameters: List[str]
+    steps: Optional[List[int]] = None
+    # label of the points -> [(region, first step, last step)]
+    _regions: Dict[str, List[Tuple[Box, int, int]]] = {}
+
+    def add(self, label: str, box: Box, first: int, last: int):
+        """
+        Record that box has no points with the label at the steps first to
+        last of the schedule.
+        """
+        region = box.project(self.parameters)
+        regions = self._regions.get(label, [])
+        if any(
+            r.contains(region) and f <= first and last <= t
+            for r, f, t in regions
+        ):
+            return
+        # Drop the regions that the new region subsumes
+        regions = [
+            (r, f, t)
+            for r, f, t in regions
+            if not (region.contains(r) and first <= f and t <= last)
+        ]
+        regions.append((region, first, last))
+        self._regions[label] = regions
+
+    def label(self, box: Box) -> Optional[str]:
+        """
+        Label the points of the box at box.timestep().lb.
+
+        Returns
+        -------
+        Optional[str]
+            LABEL_TRUE if a region without false points contains the box,
+            LABEL_FALSE if a region without true points contains it, and None
+            otherwise
+        """
+        step = int(box.timestep().lb)
+        if self.steps is not None:
+            step = self.steps[step]
+        region = box.project(self.parameters)
+        for label, other in [
+            (LABEL_TRUE, LABEL_FALSE),
+            (LABEL_FALSE, LABEL_TRUE),
+        ]:
+            for r, first, last in self._regions.get(other, []):
+                if first <= step <= last and r.contains(region):
+                    return label
+        return None
+
+    def view(self, steps: List[int]) -> "RobustLabels":
+        """
+        Get the labels for the search of a coarser schedule, whose step i is
+        the step steps[i] of the schedule.
+        """
+        view = RobustLabels(parameters=self.parameters, steps=steps)
+        view._regions = self._regions
+        return view
+
+    def add_coarse_results(
+        self,
+        true_boxes: List[Box],
+        false_boxes: List[Box],
+        steps: List[int],
+    ):
+        """
+        Record the labels that the search of a coarser schedule with
+        constraints shifted by the step error shows, where the coarser
+        schedule has the step steps[i] of the schedule at its step i.  The
+        true boxes of the search with tightened constraints have no false
+        points up to their step, and the false boxes of the search with
+        loosened constraints have no true points from their step on.
+        """
+        for box in true_boxes:
+            self.add(LABEL_FALSE, box, 0, steps[int(box.timestep().lb)])
+        for box in false_boxes:
+            self.add(LABEL_TRUE, box, steps[int(box.timestep().lb)], steps[-1])
+
+
+class ScheduleRefinement(BaseModel):
+    """
+    The ScheduleRefinement derives the coarser schedules of a schedule, which
+    take every 2nd, 4th, ..., (2 ** levels)th timepoint of the schedule (and
+    its last timepoint), and the scenarios that BoxSearch searches with them.
+
+    The coarser scenarios check a copy of each constraint (and of the query)
+    at each timepoint of the coarser schedule, shifted by the step error of
+    the timepoint.  The scenario with tightened constraints checks each
+    constraint at the timepoint that follows the timepoints of the schedule
+    where the constraint applies, with the step error between the state of
+    the coarser schedule and the states of the schedule since its previous
+    timepoint.  Its true boxes have no false points for the schedule up to
+    the same timepoint.  The scenario with loosened constraints checks each
+    constraint at the same timepoints, with the step error between the
+    states of the schedules at the timepoint.  Its false boxes have no true
+    points for the schedule from the same timepoint on.  The search of the
+    schedule (and of the finer coarse schedules) reuses these robust labels.
+
+    The step error is config.step_error_bound, which must bound the
+    difference between the state of a coarser schedule at each of its
+    timepoints and the states of the schedule at the same timepoint and at
+    its timepoints since the previous timepoint of the coarser schedule, for
+    every point of the parameter space.  The labels are only as sound as the
+    bound.  It includes the change of the states over a step of the coarser
+    schedule, so the coarser schedules label the boxes where the states are
+    far from the constraint bounds, compared to how fast they change.
+
+    Parameters
+    ----------
+    problem : AnalysisScenario
+        scenario of the search
+    schedule : EncodingSchedule
+        schedule of the search episode
+    levels : int
+        number of coarser schedules
+    step_error_bound : float
+        bound on the step error of each state variable
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    problem: AnalysisScenario
+    schedule: EncodingSchedule
+    levels: int
+    step_error_bound: float
+
+    def coarse_schedules(self) -> List[Tuple[EncodingSchedule, List[int]]]:
+        """
+        Get the coarser schedules, from the coarsest to the finest.
+
+        Returns
+        -------
+        List[Tuple[EncodingSchedule, List[int]]]
+            each coarser schedule and the step of the schedule at each of its
+            steps
+        """
+        timepoints = self.schedule.timepoints
+        schedules = []
+        for level in range(self.levels, 0, -1):
+            steps = list(range(0, len(timepoints), 2**level))
+            if steps[-1] != len(timepoints) - 1:
+                steps.append(len(timepoints) - 1)
+            if len(steps) < 2 or len(steps) == len(timepoints):
+                continue
+            if len(schedules) > 0 and schedules[-1][1] == steps:
+                continue
+            schedules.append(
+                (
+                    EncodingSchedule(
+                        timepoints=[timepoints[i] for i in steps]
+                    ),
+                    steps,
+                )
+            )
+        return schedules
+
+    def step_errors(self, steps: List[int]) -> np.ndarray:
+        """
+        Get the step errors of the state variables for the coarser schedule
+        with the steps.
+
+        Returns
+        -------
+        np.ndarray
+            (C x S) array of the step error of each state variable at each
+            step of the coarser schedule
+        """
+        shape = (len(steps), len(self.problem.model._state_var_names()))
+        return np.full(shape, self.step_error_bound)
+
+    def coarse_scenario(
+        self,
+        coarse: EncodingSchedule,
+        steps: List[int],
+        step_errors: np.ndarray,
+        tighten: bool,
+    ) -> AnalysisScenario:
+        """
+        Get the scenario of the coarser schedule, with the constraints
+        tightened (or loosened) by the step errors.
+
+        Raises
+        ------
+        NotImplementedError
+            if the scenario has a constraint (or query) that cannot be shifted
+        ValueError
+            if a tightened constraint is unsatisfiable
+        """
+        # The search of the coarser scenario adds these constraints again
+        compartmental = {
+            c.name
+            for c in self.problem.model.compartmental_constraints(1.0, 0.0)
+            or []
+        }
+        constraints = [
+            c
+            for c in self.problem.constraints or []
+            if not isinstance(
+                c, (ModelConstraint, ParameterConstraint, QueryConstraint)
+            )
+            and c.name not in compartmental
+        ] + self._query_constraints(self.problem.query)
+
+        timepoints = self.schedule.timepoints
+        shifted = []
+        for constraint in constraints:
+            for j, t in enumerate(coarse.timepoints):
+                times = (
+                    timepoints[steps[j - 1] + 1 : steps[j] + 1]
+                    if tighten and j > 0
+                    else [t]
+                )
+                if any(constraint.relevant_at_time(time) for time in times):
+                    shifted.append(
+                        self._shift_constraint(
+                            constraint, step_errors[j], tighten, j, t
+                        )
+                    )
+
+        return type(self.problem)(
+            model=self.problem.model,
+            parameters=[
+                p.model_copy(deep=True)
+                for p in self.problem.model_parameters()
+            ]
+            + [Schedules(schedules=[coarse])],
+            constraints=shifted,
+            normalization_constant=self.problem.normalization_constant,
+        )
+
+    def _query_constraints(
+        self, query: Query
+    ) -> List[StateVariableConstraint]:
+        """
+        Get the state variable constraints of the query.
+        """
+        if isinstance(query, QueryTrue):
+            return []
+        elif isinstance(query, QueryAnd):
+            return [
+                c for q in query.queries for c in self._query_constraints(q)
+            ]
+        elif isinstance(query, (QueryLE, QueryGE)):
+            last = self.schedule.timepoints[-1]
+            return [
+                StateVariableConstraint(
+                    name="query",
+                    variable=(
+                        query.variable
+                        if isinstance(query.variable, str)
+                        else query.variable.name
+                    ),
+                    interval=(
+                        Interval(ub=query.ub, closed_upper_bound=True)
+                        if isinstance(query, QueryLE)
+                        else Interval(lb=query.lb)
+                    ),
+                    timepoints=(
+                        Interval(lb=last, ub=last, closed_upper_bound=True)
+                        if query.at_end
+                        else None
+                    ),
+                )
+            ]
+        raise NotImplementedError(
+            f"Cannot bound the step error of a {type(query).__name__}"
+        )
+
+    def _step_error(self, variable: str, step_errors: np.ndarray) -> float:
+        model = self.problem.model
+        if variable in model._state_var_names():
+            return float(step_errors[model._state_var_names().index(variable)])
+        elif variable in model._parameter_names():
+            return 0.0
+        raise NotImplementedError(f"The step error of {variable} is unknown")
+
+    def _shift_constraint(
+        self,
+        constraint,
+        step_errors: np.ndarray,
+        tighten: bool,
+        step: int,
+        time: float,
+    ):
+        """
+        Get a copy of the constraint that applies at the time (the step of the
+        coarser schedule), shifted by the step errors of the time.
+        """
+        update = {
+            "name": f"{constraint.name}_{step}",
+            "timepoints": Interval(lb=time, ub=time, closed_upper_bound=True),
+        }
+        if isinstance(constraint, StateVariableConstraint):
+            update["interval"] = _shift(
+                constraint.interval,
+                self._step_error(constraint.variable, step_errors),
+                tighten,
+            )
+        elif (
+            isinstance(constraint, LinearConstraint)
+            and not constraint.derivative
+        ):
+            step_error = sum(
+                abs(w) * self._step_error(v, step_errors)
+                for v, w in zip(constraint.variables, constraint.weights)
+            )
+            update["additive_bounds"] = _shift(
+                constraint.additive_bounds, step_error, tighten
+            )
+        else:
+            raise NotImplementedError(
+                f"Cannot bound the step error of the constraint {constraint.name}"
+            )
+        # Validate the copy, which escapes its name
+        return type(constraint)(**{**dict(constraint), **update})
+
+
+def _unbounded(value) -> bool:
+    return value in [NEG_INFINITY, POS_INFINITY] or math.isinf(float(value))
+
+
+def _shift(interval: Interval, step_error: float, tighten: bool) -> Interval:
+    """
+    Narrow (or widen) the interval by the step error on each bounded side.
+    """
+    if interval is None:
+        return interval
+    shift = step_error if tighten else -step_error
+    lb = interval.lb if _unbounded(interval.lb) else float(interval.lb) + shift
+    ub = interval.ub if _unbounded(interval.ub) else float(interval.ub) - shift
+    if not _unbounded(lb) and not _unbounded(ub) and lb > ub:
+        raise ValueError(
+            f"The interval {interval} is empty after tightening it by {step_error}"
+        )
+    return interval.model_copy(update={"lb": lb, "ub": ub})
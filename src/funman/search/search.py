@@ -3,12 +3,14 @@ import logging
 import threading
 from abc import ABC, abstractmethod
 from decimal import Decimal
-from multiprocessing import Array, Queue, Value
+from functools import partial
 from queue import Queue as SQueue
 from typing import Callable, List, Optional, Union
 
 import pysmt
 from pydantic import BaseModel, ConfigDict
+from pysmt.formula import FNode
+from pysmt.logics import QF_NRA
 from pysmt.shortcuts import TRUE, Solver
 from pysmt.solvers.solver import Model as pysmtModel
 
@@ -18,6 +20,7 @@ from funman.translate.translate import EncodingSchedule
 from ..config import FUNMANConfig
 from ..representation.explanation import BoxExplanation, TimeoutExplanation
 from ..scenario.scenario import AnalysisScenario
+from .solver_process import SolverProcess
 
 l = logging.getLogger(__name__)
 
@@ -90,32 +93,6 @@ class SearchStatistics(BaseModel):
         self._iteration_operation = SQueue()
 
 
-class SearchStaticsMP(SearchStatistics):
-    _multiprocessing: bool = True
-    _num_true: Value = 0
-    _num_false: Value = 0
-    _num_unknown: Value = 0
-    _residuals: Queue = None
-    _current_residual: Value = 0.0
-    _last_time: Array = None
-    _iteration_time: Queue = None
-    _iteration_operation: Queue = None
-
-    def __init__(self, **kw):
-        super().__init__(**kw)
-
-        manager = kw["manager"]
-        self._multiprocessing = manager is not None
-        self._num_true = manager.Value("i", 0)
-        self._num_false = manager.Value("i", 0)
-        self._num_unknown = manager.Value("i", 0)
-        self._residuals = manager.Queue()
-        self._current_residual = manager.Value("d", 0.0)
-        self._last_time = manager.Array("u", "")
-        self._iteration_time = manager.Queue()
-        self._iteration_operation = manager.Queue()
-
-
 class SearchEpisode(BaseModel):
     model_config = ConfigDict(
         arbitrary_types_allowed=True,
@@ -165,14 +142,24 @@ class Search(ABC):
         pass
 
     def invoke_solver(
-        self, s: Solver, timeout: int = None
+        self,
+        s: Union[Solver, SolverProcess],
+        timeout: int = None,
+        assumptions: Optional[List[FNode]] = None,
     ) -> Union[pysmtModel, BoxExplanation]:
         l.debug("Invoking solver ...")
-        q = JoinableQueue()
 
-        if timeout is not None:
+        if timeout is not None and isinstance(s, SolverProcess):
+            result = self._internal_invoke_solver(
+                s, None, timeout=timeout, assumptions=assumptions
+            )
+        elif timeout is not None:
+            q = JoinableQueue()
             result = run_with_limited_time(
-                Search._internal_invoke_solver, (self, s, q), {}, timeout
+                Search._internal_invoke_solver,
+                (self, s, q),
+                {"assumptions": assumptions},
+                timeout,
             )
             # print(f"get from q, empty?: {q.empty()} ")
 
@@ -180,18 +167,34 @@ class Search(ABC):
                 result = TimeoutExplanation()
                 result.set_expression(TRUE())
         else:
-            result = self._internal_invoke_solver(s, None)
+            result = self._internal_invoke_solver(
+                s, None, assumptions=assumptions
+            )
         # print(f"invoke_solver, result: [{result}]")
         return result
 
     # @timeout_decorator.timeout(1)
-    def _internal_invoke_solver(self, s: Solver, q):
+    def _internal_invoke_solver(
+        self,
+        s: Union[Solver, SolverProcess],
+        q,
+        timeout: Optional[float] = None,
+        assumptions: Optional[List[FNode]] = None,
+    ):
         l.debug("Solver started")
-        result = s.solve()
+        result = (
+            s.solve(assumptions)
+            if timeout is None
+            else s.solve(assumptions, timeout=timeout)
+        )
         l.trace(f"Solver result = {result}")
 
         try:
-            if result:
+            if result is None:
+                # SolverProcess timed out
+                result = TimeoutExplanation()
+                result.set_expression(TRUE())
+            elif result:
                 # print(f"put: {s.get_model()}")
                 result = s.get_model()
                 if q:
@@ -210,3 +213,26 @@ class Search(ABC):
         l.debug("Solver completed")
         # print(result)
         return result
+
+    def _solver(self, config: "FUNMANConfig") -> Callable:
+        """
+        Return a factory for the solvers used by the search.  If
+        config.solver_timeout is set, then the solver runs in a SolverProcess
+        so that each check can be interrupted.
+        """
+        if config.solver == "dreal":
+            opts = {
+                "dreal_precision": config.dreal_precision,
+                "dreal_log_level": config.dreal_log_level,
+                "dreal_mcts": config.dreal_mcts,
+                "preferred": config.dreal_prefer_parameters,  # [p.name for p in episode.problem.parameters] if episode.config.dreal_prefer_parameters else [],
+                "random_seed": config.random_seed,
+            }
+        else:
+            opts = {}
+        return partial(
+            (SolverProcess if config.solver_timeout is not None else Solver),
+            name=config.solver,
+            logic=QF_NRA,
+            solver_options=opts,
+        )
@@ -1,13 +1,22 @@
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 import sympy
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from scipy.integrate import odeint, solve_ivp
 
 from funman import FunmanModel
 
+from ..model.query import QueryAnd, QueryGE, QueryLE, QueryTrue
+from ..representation.constraint import (
+    FunmanConstraint,
+    LinearConstraint,
+    ParameterConstraint,
+    QueryConstraint,
+    StateVariableConstraint,
+)
+from ..representation.interval import Interval
 from ..representation.representation import Timeseries
 
 numeric = Union[int, float]
@@ -45,18 +54,23 @@ class Simulator(BaseModel):
         ]
         return tuple(init_state)
 
+    def parameter_values(self) -> Tuple[float, ...]:
+        return tuple(self.parameters[p] for p in self.model._parameter_names())
+
     def sim(self) -> Optional[Timeseries]:
         # gradient_fn = partial(self.model.gradient, self.model) # hide the self reference to self.model from odeint
 
         if self.model._is_differentiable:
+            gradient, jacobian = self.model.compiled_gradient()
             full_output = 1
             use_odeint = True
             if use_odeint:
                 timeseries = odeint(
-                    self.model.gradient,
+                    gradient,
                     self.initial_state(),
                     self.tvect,
-                    args=self.model_args(),
+                    args=self.parameter_values(),
+                    Dfun=jacobian,
                     full_output=full_output,
                     tfirst=True,
                 )
@@ -71,10 +85,11 @@ class Simulator(BaseModel):
                 )
             else:
                 result = solve_ivp(
-                    self.model.gradient,
+                    gradient,
                     (self.tvect[0], self.tvect[-1]),
                     self.initial_state(),
-                    args=self.model_args(),
+                    args=self.parameter_values(),
+                    jac=jacobian,
                     t_eval=self.tvect,
                     # first_step=1.0,
                     # max_step=1.0,
@@ -95,3 +110,205 @@ class Simulator(BaseModel):
         else:
             ts = None
         return ts
+
+
+class BatchSimulator(BaseModel):
+    """
+    Simulate the model at N parameter points with one call to the ODE
+    solver.  The N trajectories are stacked into one system with N x S state
+    variables whose gradient is evaluated for all points at once, and the
+    results are returned as a dense (N x T x S) array that the constraints
+    can be checked against without building a Timeseries per point.
+
+    Parameters
+    ----------
+    model : FunmanModel
+        model to simulate
+    init : Dict[str, Union[float, str]]
+        initial value of each state variable, either a constant or an
+        expression over the parameters
+    parameters : np.ndarray
+        (N x P) array with one row of model._parameter_names() values per
+        point
+    tvect : List[numeric]
+        timepoints to report
+    discrete : bool
+        if True, advance the state from each time in tvect to the next with
+        one forward Euler step, as the SMT encoding of the model does,
+        instead of integrating the ODE, by default False
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: FunmanModel
+    init: Dict[str, Union[float, str]]
+    parameters: np.ndarray
+    tvect: List[numeric]
+    discrete: bool = False
+
+    def initial_state(self) -> np.ndarray:
+        """
+        Initial state of every point, as an (N x S) array.
+        """
+        num_points = self.parameters.shape[0]
+        parameter_symbols = [
+            sympy.Symbol(p) for p in self.model._parameter_names()
+        ]
+        columns = []
+        for var in self.model._state_var_names():
+            value = self.init[var]
+            if isinstance(value, str):
+                value = sympy.lambdify(
+                    parameter_symbols, sympy.sympify(value)
+                )(*self.parameters.T)
+            columns.append(np.broadcast_to(value, (num_points,)))
+        return np.array(columns, dtype=float).T
+
+    def sim(self) -> Optional[np.ndarray]:
+        """
+        Simulate all points.
+
+        Returns
+        -------
+        Optional[np.ndarray]
+            (N x T x S) array of the state variable values of each point
+            (ordered as model._state_var_names()) at each time in tvect, or
+            None if the model is not differentiable
+        """
+        if not self.model._is_differentiable:
+            return None
+        y0 = self.initial_state()
+        num_points, num_vars = y0.shape
+        if num_points == 0:
+            return np.zeros((0, len(self.tvect), num_vars))
+        if self.discrete:
+            return self._sim_discrete(y0)
+        # The Jacobian of the stacked system is block diagonal, so odeint
+        # only needs to approximate a band around the diagonal.
+        timeseries, output = odeint(
+            self.model.batch_gradient(self.parameters),
+            y0.ravel(),
+            self.tvect,
+            ml=num_vars - 1,
+            mu=num_vars - 1,
+            full_output=1,
+            tfirst=True,
+        )
+        l.debug(f"odeint output: {output}")
+        return timeseries.reshape(
+            len(self.tvect), num_points, num_vars
+        ).transpose(1, 0, 2)
+
+    def _sim_discrete(self, y0: np.ndarray) -> np.ndarray:
+        gradient = self.model.batch_gradient(self.parameters)
+        trajectories = np.empty((y0.shape[0], len(self.tvect), y0.shape[1]))
+        trajectories[:, 0, :] = y0
+        y = y0.ravel()
+        for i in range(1, len(self.tvect)):
+            t = self.tvect[i - 1]
+            y = y + (self.tvect[i] - t) * gradient(t, y)
+            trajectories[:, i, :] = y.reshape(y0.shape)
+        return trajectories
+
+    def satisfies(
+        self,
+        constraints: List[FunmanConstraint],
+        trajectories: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Check which points satisfy the constraints.  Timed constraints are
+        checked at the times in tvect that they contain.
+
+        Parameters
+        ----------
+        constraints : List[FunmanConstraint]
+            StateVariableConstraint, LinearConstraint, QueryConstraint, and
+            ParameterConstraint constraints to check
+        trajectories : Optional[np.ndarray], optional
+            result of sim(), by default None (call sim())
+
+        Returns
+        -------
+        np.ndarray
+            (N) array of bool that is True for each point satisfying every
+            constraint
+        """
+        if trajectories is None:
+            trajectories = self.sim()
+        satisfied = np.ones(self.parameters.shape[0], dtype=bool)
+        for constraint in constraints:
+            satisfied &= self._satisfies(constraint, trajectories)
+        return satisfied
+
+    def _state_values(self, trajectories: np.ndarray, var: str) -> np.ndarray:
+        state_vars = self.model._state_var_names()
+        if var not in state_vars:
+            raise NotImplementedError(
+                f"Cannot check constraints on {var} with a batch simulation, only the state variables {state_vars} are simulated"
+            )
+        return trajectories[:, :, state_vars.index(var)]
+
+    def _in_interval(self, values: np.ndarray, interval: Interval):
+        above_lb = values >= interval.lb
+        below_ub = (
+            values <= interval.ub
+            if interval.closed_upper_bound
+            else values < interval.ub
+        )
+        return above_lb & below_ub
+
+    def _satisfies(
+        self, constraint: FunmanConstraint, trajectories: np.ndarray
+    ) -> np.ndarray:
+        if isinstance(constraint, ParameterConstraint):
+            parameter = constraint.parameter
+            values = self.parameters[
+                :, self.model._parameter_names().index(parameter.name)
+            ]
+            return self._in_interval(values, parameter.interval)
+
+        in_time = np.array(
+            [constraint.relevant_at_time(t) for t in self.tvect], dtype=bool
+        )
+        if isinstance(constraint, StateVariableConstraint):
+            values = self._state_values(trajectories, constraint.variable)
+            holds = self._in_interval(values, constraint.interval)
+        elif isinstance(constraint, LinearConstraint):
+            if constraint.derivative:
+                raise NotImplementedError(
+                    "Cannot check derivative constraints with a batch simulation"
+                )
+            values = sum(
+                w * self._state_values(trajectories, v)
+                for w, v in zip(constraint.weights, constraint.variables)
+            )
+            holds = self._in_interval(values, constraint.additive_bounds)
+        elif isinstance(constraint, QueryConstraint):
+            holds = self._query_holds(constraint.query, trajectories)
+        else:
+            raise NotImplementedError(
+                f"Cannot check {type(constraint).__name__} with a batch simulation"
+            )
+        return np.all(holds | ~in_time, axis=1)
+
+    def _query_holds(self, query, trajectories: np.ndarray) -> np.ndarray:
+        holds = np.ones(trajectories.shape[:2], dtype=bool)
+        if isinstance(query, QueryAnd):
+            for q in query.queries:
+                holds &= self._query_holds(q, trajectories)
+            return holds
+        elif isinstance(query, QueryTrue):
+            return holds
+        elif isinstance(query, (QueryLE, QueryGE)):
+            values = self._state_values(trajectories, str(query.variable))
+            if isinstance(query, QueryLE):
+                query_holds = values <= query.ub
+            else:
+                query_holds = values >= query.lb
+            if query.at_end:
+                holds[:, -1] = query_holds[:, -1]
+                return holds
+            return query_holds
+        raise NotImplementedError(
+            f"Cannot check {type(query).__name__} with a batch simulation"
+        )
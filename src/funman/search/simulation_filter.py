@@ -0,0 +1,277 @@
+"""
+This module defines the SimulationFilter class, which labels sample points of
+the boxes in a BoxSearch by simulating them as a batch, so that the search
+only calls the SMT solver to prove the label of a box.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+from scipy.stats import qmc
+
+from funman.constants import LABEL_FALSE, LABEL_TRUE
+from funman.utils.sympy_utils import to_sympy
+
+from ..representation import Point
+from ..representation.box import Box
+from ..representation.constraint import ModelConstraint
+from ..representation.encoding_schedule import EncodingSchedule
+from ..scenario.scenario import AnalysisScenario
+from .simulate import BatchSimulator
+
+l = logging.getLogger(__name__)
+
+# Number of points simulated per box when config.point_based_evaluation is set
+# without config.simulation_samples
+DEFAULT_SIMULATION_SAMPLES = 16
+# Boxes with more sampled dimensions than this are not sampled at the corners
+MAX_CORNER_DIMENSIONS = 6
+# Number of simulated trajectories to keep for reuse by the sub-boxes
+MAX_CACHED_TRAJECTORIES = 4096
+
+
+class SimulationFilter(BaseModel):
+    """
+    The SimulationFilter simulates the corners of a box and a Latin hypercube
+    sample of its interior, together with the points simulated for earlier
+    boxes that lie in the box, in one vectorized run of a BatchSimulator.  It
+    adds the labeled points to the box, so that BoxSearch finds a true and a
+    false point of a box without calling the SMT solver, and splits the box if
+    it has both.
+
+    The simulation takes the same forward Euler steps as the SMT encoding of
+    the model, so the labels of the points agree with the encoding, up to the
+    series approximation of the transition rates and rounding.  The search
+    still proves the label of each box with the SMT solver, unless
+    config.point_based_evaluation is set, in which case a box whose sampled
+    points all have the same label gets that label.
+
+    Parameters
+    ----------
+    problem : AnalysisScenario
+        scenario of the search
+    schedule : EncodingSchedule
+        schedule of the search episode
+    samples : int
+        number of points to simulate for each box, in addition to its corners
+    seed : int
+        random seed of the samples
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    problem: AnalysisScenario
+    schedule: EncodingSchedule
+    samples: int
+    seed: int = 0
+    _enabled: bool = True
+    _init: Dict[str, float] = {}
+    _constraints: List = []
+    _sampler: qmc.LatinHypercube = None
+    # Parameter values (M x P) and trajectories (M x T x S) of simulated points
+    _cache_parameters: np.ndarray = None
+    _cache_trajectories: np.ndarray = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        model = self.problem.model
+        if not hasattr(model, "batch_gradient") or not getattr(
+            model, "_is_differentiable", False
+        ):
+            l.info(
+                f"Not simulating boxes, because {type(model).__name__} models cannot be simulated in batches"
+            )
+            self._enabled = False
+            return
+        self._constraints = [
+            c
+            for c in self.problem.constraints
+            if not isinstance(c, ModelConstraint)
+        ]
+        num_parameters = len(model._parameter_names())
+        self._cache_parameters = np.empty((0, num_parameters))
+        self._cache_trajectories = np.empty(
+            (0, len(self.schedule.timepoints), len(model._state_var_names()))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def _initial_state(self, config: "FUNMANConfig") -> Dict[str, str]:
+        init = {}
+        model = self.problem.model
+        for var in model._state_var_names():
+            value = model._get_init_value(var, self.problem, config)
+            init[var] = (
+                float(value.constant_value())
+                if value.is_constant()
+                else str(to_sympy(value, model._symbols()))
+            )
+        return init
+
+    def simulate(self, box: Box, config: "FUNMANConfig") -> bool:
+        """
+        Simulate points of the box and add them to box.points.  For each step
+        of the box timestep, the box gets a true point if any sample is true
+        at the step, and for its first step, all of the samples.  The steps
+        are recorded in box._simulated_steps.
+
+        Returns
+        -------
+        bool
+            True if the box was simulated
+        """
+        if not self._enabled:
+            return False
+        try:
+            if len(self._init) == 0:
+                self._init = self._initial_state(config)
+            parameters, trajectories = self._simulate(box)
+            self._add_points(box, parameters, trajectories)
+        except (NotImplementedError, KeyError, ValueError, TypeError) as e:
+            l.info(f"Not simulating boxes, because the simulation failed: {e}")
+            self._enabled = False
+            return False
+        return True
+
+    def _parameter_bounds(self, box: Box) -> Tuple[np.ndarray, np.ndarray]:
+        names = self.problem.model._parameter_names()
+        lb = np.array([float(box.bounds[p].lb) for p in names])
+        ub = np.array(
+            [
+                float(
+                    box.bounds[p].ub
+                    if box.bounds[p].closed_upper_bound
+                    or box.bounds[p].lb == box.bounds[p].ub
+                    else np.nextafter(box.bounds[p].ub, box.bounds[p].lb)
+                )
+                for p in names
+            ]
+        )
+        return lb, ub
+
+    def _new_points(self, lb: np.ndarray, ub: np.ndarray, num_samples: int):
+        dims = np.flatnonzero(ub > lb)
+        points = []
+        if 0 < len(dims) <= MAX_CORNER_DIMENSIONS:
+            corners = np.tile(lb, (2 ** len(dims), 1))
+            for i, d in enumerate(dims):
+                upper = (np.arange(2 ** len(dims)) >> i) & 1 == 1
+                corners[upper, d] = ub[d]
+            points.append(corners)
+        if num_samples > 0 and len(dims) > 0:
+            if self._sampler is None or self._sampler.d != len(dims):
+                self._sampler = qmc.LatinHypercube(d=len(dims), seed=self.seed)
+            samples = np.tile(lb, (num_samples, 1))
+            samples[:, dims] = qmc.scale(
+                self._sampler.random(num_samples), lb[dims], ub[dims]
+            )
+            points.append(samples)
+        if len(points) == 0:
+            return lb.reshape(1, -1)
+        return np.vstack(points)
+
+    def _simulate(self, box: Box) -> Tuple[np.ndarray, np.ndarray]:
+        lb, ub = self._parameter_bounds(box)
+        cached = np.flatnonzero(
+            np.all(
+                (self._cache_parameters >= lb)
+                & (self._cache_parameters <= ub),
+                axis=1,
+            )
+        )
+        new = self._new_points(lb, ub, max(0, self.samples - len(cached)))
+        # The corners of a sub-box are often corners of the box it came from
+        known = {tuple(p) for p in self._cache_parameters[cached]}
+        new = new[[tuple(p) not in known for p in new]]
+        new_trajectories = BatchSimulator(
+            model=self.problem.model,
+            init=self._init,
+            parameters=new,
+            tvect=self.schedule.timepoints,
+            discrete=True,
+        ).sim()
+        parameters = np.vstack([self._cache_parameters[cached], new])
+        trajectories = np.concatenate(
+            [self._cache_trajectories[cached], new_trajectories]
+        )
+
+        self._cache_parameters = np.vstack([self._cache_parameters, new])[
+            -MAX_CACHED_TRAJECTORIES:
+        ]
+        self._cache_trajectories = np.concatenate(
+            [self._cache_trajectories, new_trajectories]
+        )[-MAX_CACHED_TRAJECTORIES:]
+        return parameters, trajectories
+
+    def _labels(
+        self, parameters: np.ndarray, trajectories: np.ndarray, step: int
+    ) -> np.ndarray:
+        simulator = BatchSimulator(
+            model=self.problem.model,
+            init=self._init,
+            parameters=parameters,
+            tvect=self.schedule.timepoints[: step + 1],
+            discrete=True,
+        )
+        return simulator.satisfies(
+            self._constraints, trajectories[:, : step + 1, :]
+        )
+
+    def _point(
+        self,
+        parameters: np.ndarray,
+        trajectory: np.ndarray,
+        step: int,
+        label: str,
+    ) -> Point:
+        model = self.problem.model
+        values = {
+            f"{var}_{t}": float(trajectory[i, j])
+            for i, t in enumerate(self.schedule.timepoints[: step + 1])
+            for j, var in enumerate(model._state_var_names())
+        }
+        values.update(
+            {p: float(v) for p, v in zip(model._parameter_names(), parameters)}
+        )
+        values["timestep"] = step
+        return Point(values=values, label=label, schedule=self.schedule)
+
+    def _add_points(
+        self, box: Box, parameters: np.ndarray, trajectories: np.ndarray
+    ):
+        timestep = box.timestep()
+        first_step = int(timestep.lb)
+        labels = self._labels(parameters, trajectories, first_step)
+        for i, label in enumerate(labels):
+            box.add_point(
+                self._point(
+                    parameters[i],
+                    trajectories[i],
+                    first_step,
+                    LABEL_TRUE if label else LABEL_FALSE,
+                )
+            )
+        box._simulated_steps = set(range(first_step, int(timestep.ub) + 1))
+
+        # Only check the later steps of the points that are true at the
+        # previous steps
+        true = np.flatnonzero(labels)
+        for step in range(first_step + 1, int(timestep.ub) + 1):
+            if len(true) == 0:
+                break
+            true = true[
+                self._labels(parameters[true], trajectories[true], step)
+            ]
+            if len(true) > 0:
+                box.add_point(
+                    self._point(
+                        parameters[true[0]],
+                        trajectories[true[0]],
+                        step,
+                        LABEL_TRUE,
+                    )
+                )
@@ -218,26 +218,7 @@ class SMTCheck(Search):
     ):
         model_result = None
         explanation_result = None
-        if episode.config.solver == "dreal":
-            opts = {
-                "dreal_precision": episode.config.dreal_precision,
-                "dreal_log_level": episode.config.dreal_log_level,
-                "dreal_mcts": episode.config.dreal_mcts,
-                "preferred": episode.config.dreal_prefer_parameters,  # [p.name for p in problem.model_parameters()]if episode.config.dreal_prefer_parameters else [],
-                "random_seed": episode.config.random_seed,
-            }
-        else:
-            opts = {}
-        # s1 = Solver(
-        #     name=episode.config.solver,
-        #     logic=QF_NRA,
-        #     solver_options=opts,
-        # )
-        with Solver(
-            name=episode.config.solver,
-            logic=QF_NRA,
-            solver_options=opts,
-        ) as s:
+        with self._solver(episode.config)() as s:
             formula, simplified_formula, model_formula = self.build_formula(
                 episode, schedule, options
             )
@@ -0,0 +1,246 @@
+"""
+This module defines the SolverProcess class, a pysmt solver that runs in a
+long-lived worker process so that individual checks can be bounded by a
+timeout without forking a new process for every check.
+"""
+
+import logging
+import multiprocessing as mp
+import traceback
+from io import StringIO
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pysmt.formula import FNode
+from pysmt.shortcuts import Solver, get_env
+from pysmt.smtlib import commands as smtcmd
+from pysmt.smtlib.parser import SmtLibParser
+from pysmt.smtlib.printers import to_smtlib
+from pysmt.solvers.eager import EagerModel
+
+l = logging.getLogger(__name__)
+
+
+def _declaration(symbol: FNode) -> str:
+    symbol_type = symbol.symbol_type().as_smtlib(funstyle=False)
+    return f"(declare-fun {symbol.symbol_name()} () {symbol_type})"
+
+
+def _parse_formula(parser: SmtLibParser, text: str) -> Optional[FNode]:
+    formula = None
+    for cmd in parser.get_command_generator(StringIO(text)):
+        if cmd.name == smtcmd.ASSERT:
+            formula = cmd.args[0]
+    return formula
+
+
+def _serve(conn, solver_args: Dict[str, Any]):
+    """
+    Worker process loop.  Commands that change the solver state are not
+    acknowledged, and any error they raise is reported by the next check.
+    """
+    parser = SmtLibParser()
+    error = None
+    with Solver(**solver_args) as solver:
+        while True:
+            try:
+                cmd, arg = conn.recv()
+            except EOFError:
+                break
+            if cmd == "exit":
+                break
+            try:
+                if cmd == "push":
+                    solver.push(arg)
+                elif cmd == "pop":
+                    solver.pop(arg)
+                elif cmd == "declare":
+                    _parse_formula(parser, arg)
+                elif cmd == "assert":
+                    solver.add_assertion(_parse_formula(parser, arg))
+                elif cmd == "solve":
+                    assumptions = (
+                        [_parse_formula(parser, a) for a in arg]
+                        if arg is not None
+                        else None
+                    )
+                    if error is not None:
+                        conn.send(("error", error))
+                        error = None
+                    elif solver.solve(assumptions):
+                        model = [
+                            (s.symbol_name(), v.constant_value())
+                            for s, v in solver.get_model()
+                        ]
+                        conn.send(("sat", model))
+                    else:
+                        try:
+                            core = to_smtlib(
+                                solver.get_unsat_core(), daggify=True
+                            )
+                        except Exception as e:
+                            core = e
+                        conn.send(("unsat", core))
+            except Exception:
+                error = traceback.format_exc()
+                if cmd == "solve":
+                    conn.send(("error", error))
+                    error = None
+
+
+class SolverProcess(object):
+    """
+    The SolverProcess provides the subset of the pysmt Solver interface used
+    by the searches (push, pop, add_assertion, solve, get_model, and
+    get_unsat_core), but keeps the solver in a worker process that is forked
+    once and reused for every check.  Formulas are sent to the worker as
+    SMT-LIB text.
+
+    The SolverProcess keeps the asserted formulas of each level of the
+    assertion stack.  When a check exceeds its timeout, it replaces the worker
+    and replays the stack so that the caller can continue as if the check
+    returned unknown.
+    """
+
+    def __init__(self, **solver_args):
+        self._solver_args = solver_args
+        self._declarations: List[str] = []
+        self._declared: Set[FNode] = set()
+        self._frames: List[List[str]] = [[]]
+        self._result: Optional[Tuple[str, Any]] = None
+        self._process = None
+        self._conn = None
+        self._start()
+
+    def __enter__(self) -> "SolverProcess":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.exit()
+
+    def _start(self):
+        ctx = mp.get_context("fork")
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(
+            target=_serve,
+            args=(child_conn, self._solver_args),
+            name="SolverProcess",
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+
+    def _restart(self):
+        l.debug("Restarting solver process")
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self._start()
+        for declaration in self._declarations:
+            self._conn.send(("declare", declaration))
+        for level, frame in enumerate(self._frames):
+            if level > 0:
+                self._conn.send(("push", 1))
+            for assertion in frame:
+                self._conn.send(("assert", assertion))
+
+    def exit(self):
+        if self._process is not None:
+            try:
+                self._conn.send(("exit", None))
+            except (BrokenPipeError, OSError):
+                pass
+            self._process.join(timeout=1)
+            if self._process.is_alive():
+                self._process.kill()
+            self._conn.close()
+            self._process = None
+
+    def push(self, levels: int = 1):
+        for i in range(levels):
+            self._frames.append([])
+        self._conn.send(("push", levels))
+
+    def pop(self, levels: int = 1):
+        del self._frames[-levels:]
+        self._conn.send(("pop", levels))
+
+    def _declare(self, formula: FNode):
+        symbols = formula.get_free_variables() - self._declared
+        if len(symbols) > 0:
+            declaration = "".join(
+                _declaration(s)
+                for s in sorted(symbols, key=lambda s: s.symbol_name())
+            )
+            self._declarations.append(declaration)
+            self._declared.update(symbols)
+            self._conn.send(("declare", declaration))
+
+    def add_assertion(self, formula: FNode, named=None):
+        self._declare(formula)
+        assertion = f"(assert {to_smtlib(formula, daggify=True)})"
+        self._frames[-1].append(assertion)
+        self._conn.send(("assert", assertion))
+
+    def solve(
+        self,
+        assumptions: Optional[List[FNode]] = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[bool]:
+        """
+        Check the satisfiability of the asserted formulas.
+
+        Parameters
+        ----------
+        assumptions : Optional[List[FNode]], optional
+            literals to assume for this check only, by default None
+        timeout : Optional[float], optional
+            Number of seconds to wait for the worker, by default None (no
+            limit)
+
+        Returns
+        -------
+        Optional[bool]
+            Whether the formulas are satisfiable, or None if the check timed
+            out
+        """
+        self._result = None
+        if assumptions is not None:
+            for assumption in assumptions:
+                self._declare(assumption)
+            assumptions = [
+                f"(assert {to_smtlib(a, daggify=False)})" for a in assumptions
+            ]
+        self._conn.send(("solve", assumptions))
+        if timeout is not None and not self._conn.poll(timeout):
+            self._restart()
+            return None
+        status, value = self._conn.recv()
+        if status == "error":
+            raise Exception(f"Solver process failed:\n{value}")
+        self._result = (status, value)
+        return status == "sat"
+
+    def get_model(self) -> EagerModel:
+        assert self._result is not None and self._result[0] == "sat"
+        mgr = get_env().formula_manager
+        assignment = {}
+        for name, value in self._result[1]:
+            symbol = mgr.symbols.get(name)
+            if symbol is None:
+                continue
+            if symbol.symbol_type().is_bool_type():
+                assignment[symbol] = mgr.Bool(value)
+            elif symbol.symbol_type().is_int_type():
+                assignment[symbol] = mgr.Int(value)
+            else:
+                assignment[symbol] = mgr.Real(value)
+        return EagerModel(assignment=assignment)
+
+    def get_unsat_core(self) -> FNode:
+        assert self._result is not None and self._result[0] == "unsat"
+        core = self._result[1]
+        if isinstance(core, Exception):
+            raise core
+        parser = SmtLibParser()
+        _parse_formula(parser, "".join(self._declarations))
+        return _parse_formula(parser, f"(assert {core})")
@@ -1,15 +1,18 @@
 import logging
 import random
+import uuid
 from collections import Counter
 from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Dict, List, Optional, Tuple, Union
 
 import pandas as pd
 from matplotlib import pyplot as plt
 from pydantic import BaseModel, ValidationInfo, field_validator
 
-from funman import LABEL_ANY, ModelParameter
+from funman import LABEL_ANY, LABEL_FALSE, LABEL_TRUE, ModelParameter
 from funman.config import FUNMANConfig
+from funman.constants import NEG_INFINITY, POS_INFINITY
 from funman.model.bilayer import BilayerModel
 from funman.model.decapode import DecapodeModel
 from funman.model.encoded import EncodedModel
@@ -19,8 +22,10 @@ from funman.model.model import is_observable, is_state_variable
 from funman.model.petrinet import GeneratedPetriNetModel, PetrinetModel
 from funman.model.query import QueryAnd, QueryFunction, QueryLE, QueryTrue
 from funman.model.regnet import GeneratedRegnetModel, RegnetModel
+from funman.representation.box import Box
 from funman.representation.constraint import FunmanUserConstraint
 from funman.representation.explanation import Explanation
+from funman.representation.interval import Interval
 from funman.representation.parameter import (
     ModelParameter,
     NumSteps,
@@ -38,6 +43,12 @@ from funman.scenario.parameter_synthesis import (
     ParameterSynthesisScenarioResult,
 )
 from funman.scenario.scenario import AnalysisScenario
+from funman.utils.metrics import (
+    ENCODING_PHASES,
+    SOLVER_PHASES,
+    PhaseMetric,
+    PhaseMetrics,
+)
 
 from ..representation.parameter_space import ParameterSpace
 
@@ -84,6 +95,25 @@ class FunmanProgress(BaseModel):
         return f"progress: {self.progress:.5f}"
 
 
+class FunmanQueueStatus(BaseModel):
+    """
+    Fields
+    ------
+    id : The UUID assigned to the request
+    state : One of "queued", "running", "done", or "stopped" (halted before
+        it started)
+    position : The number of requests that will start before this request,
+        if it is queued
+    estimated_start_time : When the request is expected to start, if it is
+        queued and the worker has run requests of the same kind before
+    """
+
+    id: str
+    state: str
+    position: Optional[int] = None
+    estimated_start_time: Optional[datetime] = None
+
+
 class FunmanWorkUnit(BaseModel):
     """
     Fields
@@ -104,6 +134,18 @@ class FunmanWorkUnit(BaseModel):
     ]
     request: FunmanWorkRequest
 
+    def is_consistency(self) -> bool:
+        """
+        Is the request a consistency check (rather than a parameter
+        synthesis)?
+        """
+        return (
+            not hasattr(self.request, "parameters")
+            or self.request.parameters is None
+            or all(p.label == LABEL_ANY for p in self.request.parameters)
+            or all(p.width() == 0.0 for p in self.request.parameters)
+        )
+
     def to_scenario(
         self,
     ) -> Union[ConsistencyScenario, ParameterSynthesisScenario]:
@@ -141,12 +183,7 @@ class FunmanWorkUnit(BaseModel):
                     # )
                 )
 
-        if (
-            not hasattr(self.request, "parameters")
-            or self.request.parameters is None
-            or all(p.label == LABEL_ANY for p in self.request.parameters)
-            or all(p.width() == 0.0 for p in self.request.parameters)
-        ):
+        if self.is_consistency():
             return ConsistencyScenario(
                 model=self.model,
                 query=query,
@@ -175,6 +212,15 @@ class FunmanResultsTiming(BaseModel):
     encoding_time: Optional[timedelta] = None
     progress_timeseries: List[Tuple[datetime, float]] = []
     additional_time: Dict[str, timedelta] = {}
+    phases: Dict[str, PhaseMetric] = {}
+
+    def update_phases(self, metrics: PhaseMetrics) -> None:
+        """Copy the metrics of the search phases and sum the solver and encoding time"""
+        self.phases = metrics.copy_phases()
+        self.solver_time = timedelta(seconds=metrics.total_time(SOLVER_PHASES))
+        self.encoding_time = timedelta(
+            seconds=metrics.total_time(ENCODING_PHASES)
+        )
 
     def update_progress(
         self, progress, granularity=timedelta(seconds=1)
@@ -205,8 +251,195 @@ class FunmanResultsTiming(BaseModel):
             )
 
 
+class _ResultsAccounting:
+    """
+    The labeled volume and the outer intervals of the true boxes of a
+    parameter space, which update() adds the boxes to as they are labeled,
+    and the volumes of the scenario search space.  The search only appends
+    boxes to the parameter space, so each update only looks at the new boxes.
+    If the boxes changed in another way (e.g., they were compacted), then
+    update() starts over.
+    """
+
+    def __init__(self, scenario: AnalysisScenario):
+        self.scenario = scenario
+        self.search_volume = scenario.search_space_volume(normalize=True)
+        # Each schedule labels the whole search space
+        self.num_schedules = max(1, len(scenario._encodings))
+        self.repr_volume = scenario.representable_space_volume()
+        self._reset()
+
+    def _reset(self):
+        self.labeled_volume = Decimal(0)
+        # parameter -> (lb, ub) among the true boxes
+        self.outer_bounds: Dict[str, Tuple[float, float]] = {}
+        # label -> (list of boxes, number of boxes counted)
+        self._counted: Dict[str, Tuple[Optional[List[Box]], int]] = {
+            LABEL_TRUE: (None, 0),
+            LABEL_FALSE: (None, 0),
+        }
+
+    def _is_extension(self, label: str, boxes: List[Box]) -> bool:
+        counted, n = self._counted[label]
+        return n == 0 or (counted is boxes and len(boxes) >= n)
+
+    def update(self, parameter_space: ParameterSpace):
+        labeled = {
+            LABEL_TRUE: parameter_space.true_boxes,
+            LABEL_FALSE: parameter_space.false_boxes,
+        }
+        if not all(self._is_extension(k, v) for k, v in labeled.items()):
+            self._reset()
+
+        for label, boxes in labeled.items():
+            _, n = self._counted[label]
+            for box in boxes[n:]:
+                self.labeled_volume += box.volume(
+                    parameters=self.scenario.model_parameters(),
+                    normalize=self.scenario._original_parameter_widths,
+                )
+                if label == LABEL_TRUE:
+                    for p, interval in box.bounds.items():
+                        lb, ub = self.outer_bounds.get(
+                            p, (interval.lb, interval.ub)
+                        )
+                        self.outer_bounds[p] = (
+                            min(lb, interval.lb),
+                            max(ub, interval.ub),
+                        )
+            self._counted[label] = (boxes, len(boxes))
+
+    def outer_interval(self, param_name: str) -> Interval:
+        """
+        Same as ParameterSpace.outer_interval() for the counted boxes.
+        """
+        lb, ub = self.outer_bounds.get(
+            param_name, (NEG_INFINITY, POS_INFINITY)
+        )
+        return Interval(lb=lb, ub=ub, closed_upper_bound=(lb == ub))
+
+
+class _ResultsJournal:
+    """
+    The boxes and points of a parameter space in the order that they were
+    added, numbered by a sequence number that increases for the life of the
+    journal.  If the parameter space changes other than by adding boxes and
+    points (e.g., its boxes are compacted), then the journal starts over
+    with the current boxes and points, numbered after the previous ones.
+    The sequence numbers belong to the epoch of the journal, and a new
+    journal of the same results (e.g., after a restart of the server, or
+    after reloading the results from storage) has a new epoch.
+    """
+
+    FIELDS = ["true_boxes", "false_boxes", "unknown_points"]
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex
+        # Sequence number of items[0]
+        self.base = 0
+        self.items: List[Tuple[str, Union[Box, Point]]] = []
+        # field -> (list, number of items journaled)
+        self._lists: Dict[str, Tuple[Optional[List], int]] = {
+            f: (None, 0) for f in self.FIELDS
+        }
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.items)
+
+    def update(self, parameter_space: Optional[ParameterSpace]):
+        lists = {
+            f: (
+                getattr(parameter_space, f)
+                if parameter_space is not None
+                else []
+            )
+            for f in self.FIELDS
+        }
+        if not all(
+            n == 0 or (journaled is lists[f] and len(lists[f]) >= n)
+            for f, (journaled, n) in self._lists.items()
+        ):
+            self.base = self.end
+            self.items = []
+            self._lists = {f: (None, 0) for f in self.FIELDS}
+        for f, items in lists.items():
+            _, n = self._lists[f]
+            self.items += [(f, item) for item in items[n:]]
+            self._lists[f] = (items, len(items))
+
+
+class FunmanMetrics(BaseModel):
+    """
+    Fields
+    ------
+    running : The metrics of the search phases of each running request
+    completed : The total metrics of the search phases of the requests that
+        completed since the worker started
+    num_completed : The number of completed requests
+    """
+
+    running: Dict[str, Dict[str, PhaseMetric]] = {}
+    completed: Dict[str, PhaseMetric] = {}
+    num_completed: int = 0
+
+
+class FunmanResultsSummary(BaseModel):
+    """
+    Fields
+    ------
+    id : The UUID assigned to the request
+    cursor : The sequence number after the last box or point in the results
+    epoch : The epoch of the sequence numbers
+    """
+
+    id: str
+    cursor: int
+    epoch: str
+    progress: FunmanProgress
+    done: bool
+    error: bool
+    error_message: Optional[str] = None
+    timing: FunmanResultsTiming
+    num_true_boxes: int
+    num_false_boxes: int
+    num_unknown_points: int
+
+
+class FunmanResultsDelta(BaseModel):
+    """
+    Fields
+    ------
+    id : The UUID assigned to the request
+    since : The sequence number that the delta starts at
+    cursor : The sequence number after the last box or point in the delta,
+        to use as since in the next request
+    epoch : The epoch of the sequence numbers, to use as epoch in the next
+        request
+    reset : If true, then the boxes and points before since changed (or
+        since is not a sequence number of these results, or of this
+        epoch), and the delta holds all of the current boxes and points
+    """
+
+    id: str
+    since: int
+    cursor: int
+    epoch: str
+    reset: bool = False
+    progress: FunmanProgress
+    done: bool
+    error: bool
+    true_boxes: List[Box] = []
+    false_boxes: List[Box] = []
+    unknown_points: List[Point] = []
+
+
 class FunmanResults(BaseModel):
     _finalized: bool = False
+    _accounting: Optional[_ResultsAccounting] = None
+    _journal: Optional[_ResultsJournal] = None
+    # (parameter, lb, ub) of the contracted_model parameter bounds
+    _contracted_bounds: Optional[Tuple] = None
 
     id: str
     model: Union[
@@ -249,31 +482,51 @@ class FunmanResults(BaseModel):
 
         # Get new bounds for each parameter
         amr_parameters = self.model._parameter_names()
+        outer_interval = (
+            self._accounting.outer_interval
+            if self._accounting is not None
+            else self.parameter_space.outer_interval
+        )
         parameter_bounds = {
-            param: self.parameter_space.outer_interval(param)
-            for param in amr_parameters
+            param: outer_interval(param) for param in amr_parameters
         }
+        bounds_key = tuple(
+            (p, i.lb, i.ub) for p, i in parameter_bounds.items()
+        )
+        if (
+            self.contracted_model is not None
+            and bounds_key == self._contracted_bounds
+        ):
+            return
         self.contracted_model = self.model.contract_parameters(
             parameter_bounds
         )
+        self._contracted_bounds = bounds_key
 
     def update_parameter_space(
         self, scenario: AnalysisScenario, results: ParameterSpace
     ) -> FunmanProgress:
         # TODO handle copy?
         self.parameter_space = results
-        # compute volumes
-        labeled_volume = results.labeled_volume(scenario=scenario)
-        # TODO precompute and cache?
-        search_volume = scenario.search_space_volume(normalize=True)
-        # TODO precompute and cache?
-        repr_volume = scenario.representable_space_volume()
+        # compute volumes, counting only the boxes added since the last update
+        if (
+            self._accounting is None
+            or self._accounting.scenario is not scenario
+        ):
+            self._accounting = _ResultsAccounting(scenario)
+        self._accounting.update(results)
+        labeled_volume = self._accounting.labeled_volume
+        search_volume = self._accounting.search_volume
+        repr_volume = self._accounting.repr_volume
         # compute ratios
         if search_volume == 0.0:
             # TODO handle point volume?
             coverage_of_search_space = 0.0
         else:
-            coverage_of_search_space = float(labeled_volume / search_volume)
+            coverage_of_search_space = float(
+                labeled_volume
+                / (search_volume * self._accounting.num_schedules)
+            )
             coverage_of_search_space = round(coverage_of_search_space, 15)
 
         if repr_volume == 0.0:
@@ -286,6 +539,7 @@ class FunmanResults(BaseModel):
         self.progress.coverage_of_search_space = coverage_of_search_space
         self.progress.coverage_of_representable_space = coverage_of_repr_space
 
+        self.timing.update_phases(scenario._phase_metrics)
         try:
             self.timing.update_progress(self.progress.coverage_of_search_space)
         except Exception as e:
@@ -300,6 +554,77 @@ class FunmanResults(BaseModel):
 
         return self.progress
 
+    def _update_journal(self) -> _ResultsJournal:
+        if self._journal is None:
+            self._journal = _ResultsJournal()
+        self._journal.update(self.parameter_space)
+        return self._journal
+
+    def summary(self) -> FunmanResultsSummary:
+        """
+        Get the progress and status of the results, without the boxes and
+        points.
+        """
+        journal = self._update_journal()
+        ps = self.parameter_space
+        return FunmanResultsSummary(
+            id=self.id,
+            cursor=journal.end,
+            epoch=journal.epoch,
+            progress=self.progress,
+            done=self.done,
+            error=self.error,
+            error_message=self.error_message,
+            timing=self.timing,
+            num_true_boxes=len(ps.true_boxes) if ps else 0,
+            num_false_boxes=len(ps.false_boxes) if ps else 0,
+            num_unknown_points=len(ps.unknown_points) if ps else 0,
+        )
+
+    def delta(
+        self, since: int = 0, epoch: Optional[str] = None
+    ) -> FunmanResultsDelta:
+        """
+        Get the boxes and points added to the results since a sequence
+        number, which is the cursor of a previous summary or delta (or 0).
+        The sequence numbers are valid for the life of this object, so a
+        since from another epoch (or without one) gets all of the boxes and
+        points, with reset.
+
+        Parameters
+        ----------
+        since : int, optional
+            sequence number, by default 0
+        epoch : Optional[str], optional
+            epoch of the previous summary or delta, by default None
+
+        Returns
+        -------
+        FunmanResultsDelta
+            boxes and points with sequence numbers since and after
+        """
+        journal = self._update_journal()
+        # A client at the start of the journal may have the items before it
+        reset = (
+            (journal.base > 0 and since <= journal.base)
+            or since > journal.end
+            or (since > 0 and epoch != journal.epoch)
+        )
+        start = journal.base if reset else since
+        delta = FunmanResultsDelta(
+            id=self.id,
+            since=since,
+            cursor=journal.end,
+            epoch=journal.epoch,
+            reset=reset,
+            progress=self.progress,
+            done=self.done,
+            error=self.error,
+        )
+        for f, item in journal.items[start - journal.base :]:
+            getattr(delta, f).append(item)
+        return delta
+
     def finalize_result(
         self,
         scenario: AnalysisScenario,
@@ -1,20 +1,60 @@
+import hashlib
 import json
+import logging
+import os
 import uuid
 from pathlib import Path
 from threading import Lock
-from typing import Optional
+from typing import Dict, List, Optional
 
 from .exception import *
 from .query import FunmanResults
 
+l = logging.getLogger(__name__)
+
+# ParameterSpace lists that the search only appends to, and that the log
+# stores as deltas
+LOGGED_FIELDS = ["true_boxes", "false_boxes", "unknown_points"]
+# FunmanResults fields that do not change after the result is added
+STATIC_FIELDS = {"id", "model", "request"}
+
+
+class _ResultLog:
+    """
+    The state of the log of one result: what has been written since the last
+    snapshot, and the lock that orders the writes.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        # Items of each LOGGED_FIELDS list in the snapshot and the log
+        self.persisted: Dict[str, List] = {f: [] for f in LOGGED_FIELDS}
+        self.snapshot_size = 0
+        self.log_size = 0
+        # Generation (digest) of the snapshot that the log records extend
+        self.generation: Optional[str] = None
+
 
 # Basic placeholder storage utility for query results
 class Storage:
+    """
+    Each result is stored as a snapshot ({id}.json) and a log of updates
+    ({id}.jsonl).  The snapshot is the full FunmanResults, and each line of
+    the log holds the fields of FunmanResults that changed, except for the
+    parameter space, which is written as the boxes and points that were added
+    since the previous line.  The log is folded into a new snapshot once it
+    is larger than the snapshot, so that the bytes written per update do not
+    grow with the parameter space.  Each line also holds the generation of
+    the snapshot that it extends (a digest of the snapshot), so that reading
+    the result skips the lines of a log that an earlier snapshot left behind.
+    """
+
     def __init__(self):
         self.started = False
         self.lock = Lock()
         self.path = Path(".").resolve()
         self.results = {}
+        self._logs: Dict[str, _ResultLog] = {}
 
     def _check_start(self):
         if not self.started:
@@ -26,6 +66,7 @@ class Storage:
                 self.path = Path(path)
             self.path.mkdir(parents=True, exist_ok=True)
             self.results = {}
+            self._logs = {}
             for path_object in self.path.glob("*.json"):
                 if not path_object.is_file():
                     continue
@@ -47,7 +88,13 @@ class Storage:
             self.results[result] = None
             return result
 
-    def add_result(self, result: FunmanResults):
+    def _snapshot_path(self, id: str) -> Path:
+        return self.path / f"{id}.json"
+
+    def _log_path(self, id: str) -> Path:
+        return self.path / f"{id}.jsonl"
+
+    def _claim_result(self, result: FunmanResults) -> _ResultLog:
         with self.lock:
             self._check_start()
             if result is None or not isinstance(result, FunmanResults):
@@ -62,20 +109,140 @@ class Storage:
             # if self.results[id] is not None:
             #     raise FunmanException(f"Id {id} was already set to a value.")
             self.results[id] = result
-            with open(self.path / f"{id}.json", "w") as f:
-                f.write(result.model_dump_json(indent=4, by_alias=True))
+            return self._logs.setdefault(id, _ResultLog())
+
+    def add_result(self, result: FunmanResults):
+        """
+        Store the full result as a new snapshot.
+        """
+        log = self._claim_result(result)
+        with log.lock:
+            self._write_snapshot(result, log)
+
+    def update_result(self, result: FunmanResults):
+        """
+        Store a result that was previously added, appending only the boxes
+        and points that were added to its parameter space (and the other
+        fields of the result) to its log.  If the parameter space changed in
+        any other way (e.g., its boxes were compacted), or the log is larger
+        than the snapshot, then write a new snapshot instead.
+        """
+        log = self._claim_result(result)
+        with log.lock:
+            current = self._logged_lists(result)
+            if log.snapshot_size == 0 or log.log_size > log.snapshot_size:
+                self._write_snapshot(result, log)
+                return
+
+            delta = {}
+            for field, items in current.items():
+                persisted = log.persisted[field]
+                if len(items) < len(persisted) or any(
+                    a is not b for a, b in zip(items, persisted)
+                ):
+                    self._write_snapshot(result, log)
+                    return
+                if len(items) > len(persisted):
+                    delta[field] = {
+                        "offset": len(persisted),
+                        "items": [
+                            item.model_dump(mode="json", by_alias=True)
+                            for item in items[len(persisted) :]
+                        ],
+                    }
+
+            record = {
+                "generation": log.generation,
+                "result": result.model_dump(
+                    mode="json",
+                    by_alias=True,
+                    exclude=STATIC_FIELDS | {"parameter_space"},
+                ),
+                "parameter_space": delta,
+            }
+            line = json.dumps(record) + "\n"
+            with open(self._log_path(result.id), "a") as f:
+                f.write(line)
+            log.log_size += len(line)
+            log.persisted = current
+
+    def _logged_lists(self, result: FunmanResults) -> Dict[str, List]:
+        ps = result.parameter_space
+        return {
+            f: list(getattr(ps, f) if ps is not None else [])
+            for f in LOGGED_FIELDS
+        }
+
+    def _write_snapshot(self, result: FunmanResults, log: _ResultLog):
+        snapshot = result.model_dump_json(indent=4, by_alias=True)
+        path = self._snapshot_path(result.id)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(snapshot)
+        os.replace(tmp_path, path)
+        # A crash before the log is removed leaves the records of the previous
+        # generation, which reading the result skips.
+        self._log_path(result.id).unlink(missing_ok=True)
+        log.generation = _generation(snapshot)
+        log.snapshot_size = len(snapshot)
+        log.log_size = 0
+        log.persisted = self._logged_lists(result)
 
     def get_result(self, id: str) -> FunmanResults:
         with self.lock:
             self._check_start()
             if id in self.results and self.results[id] is not None:
                 return self.results[id]
-            path = self.path / f"{id}.json"
-            if not path.is_file():
-                raise NotFoundFunmanException(
-                    f"Result for id '{id}' not found"
-                )
-            with open(path, "r") as f:
-                result = FunmanResults.model_validate(json.load(f))
-            self.results[id] = result
-            return result
+            log = self._logs.setdefault(id, _ResultLog())
+        with log.lock:
+            result = self._read_result(id)
+        with self.lock:
+            if self.results.get(id) is None:
+                self.results[id] = result
+            return self.results[id]
+
+    def _read_result(self, id: str) -> FunmanResults:
+        path = self._snapshot_path(id)
+        if not path.is_file():
+            raise NotFoundFunmanException(f"Result for id '{id}' not found")
+        with open(path, "r") as f:
+            snapshot = f.read()
+        data = json.loads(snapshot)
+        generation = _generation(snapshot)
+
+        log_path = self._log_path(id)
+        if log_path.is_file():
+            with open(log_path, "r") as f:
+                for i, line in enumerate(f):
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Incomplete write of the last record
+                        l.warning(
+                            f"Ignoring line {i + 1} of {log_path}, and any "
+                            "line after it, because it is not valid JSON"
+                        )
+                        break
+                    if record.get("generation") != generation:
+                        l.warning(
+                            f"Ignoring line {i + 1} of {log_path}, because it "
+                            "extends an earlier snapshot"
+                        )
+                        continue
+                    self._apply_record(data, record)
+        return FunmanResults.model_validate(data)
+
+    def _apply_record(self, data: Dict, record: Dict):
+        data.update(record["result"])
+        if data.get("parameter_space") is None:
+            data["parameter_space"] = {}
+        ps = data["parameter_space"]
+        for field, delta in record["parameter_space"].items():
+            items = ps.setdefault(field, [])
+            # Skip the items that are already in the snapshot
+            skip = max(0, len(items) - delta["offset"])
+            items.extend(delta["items"][skip:])
+
+
+def _generation(snapshot: str) -> str:
+    return hashlib.sha256(snapshot.encode()).hexdigest()
@@ -1,21 +1,28 @@
 import copy
 import logging
+import multiprocessing as mp
+import os
 import queue
 import threading
 import traceback
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from funman.model.model import FunmanModel
 from funman.scenario.scenario import AnalysisScenario
 from funman.server.exception import FunmanWorkerException
 from funman.server.query import (
-    FunmanProgress,
+    FunmanMetrics,
+    FunmanQueueStatus,
     FunmanResults,
+    FunmanResultsDelta,
+    FunmanResultsSummary,
     FunmanWorkRequest,
     FunmanWorkUnit,
 )
 from funman.utils import math_utils
+from funman.utils.metrics import PhaseMetrics
 
 from ..representation.parameter_space import ParameterSpace
 
@@ -35,11 +42,206 @@ class WorkerState(Enum):
     ERRORED = 5
 
 
+class WorkPriority(int, Enum):
+    """
+    Priority classes of work, where lower values start first
+    """
+
+    CONSISTENCY = 0
+    SYNTHESIS = 1
+
+
+# ParameterSpace lists that the search only appends to, and that the work
+# processes send as deltas
+DELTA_FIELDS = ["true_boxes", "false_boxes", "unknown_points"]
+# FunmanResults fields that the work processes do not send
+STATIC_FIELDS = {"id", "model", "request", "parameter_space"}
+
+ParameterSpaceDelta = Union[ParameterSpace, Dict[str, List]]
+
+# Work processes send updates at most this often, unless the progress
+# increased by at least UPDATE_PROGRESS_DELTA
+UPDATE_INTERVAL = timedelta(seconds=1)
+UPDATE_PROGRESS_DELTA = 0.05
+
+
+class _ParameterSpaceTracker:
+    """
+    Compute the changes to a parameter space since the last call to
+    delta(), so that the work processes only send the new boxes and points.
+    """
+
+    def __init__(self):
+        self._parameter_space = None
+        self._sent: Dict[str, List] = {f: [] for f in DELTA_FIELDS}
+
+    def delta(self, ps: Optional[ParameterSpace]) -> ParameterSpaceDelta:
+        """
+        Get the boxes and points added to ps since the last call, or ps if it
+        changed in some other way.
+        """
+        current = {
+            f: list(getattr(ps, f) if ps is not None else [])
+            for f in DELTA_FIELDS
+        }
+        is_extension = ps is self._parameter_space and all(
+            len(current[f]) >= len(self._sent[f])
+            and all(a is b for a, b in zip(current[f], self._sent[f]))
+            for f in DELTA_FIELDS
+        )
+        delta = (
+            {
+                f: current[f][len(self._sent[f]) :]
+                for f in DELTA_FIELDS
+                if len(current[f]) > len(self._sent[f])
+            }
+            if is_extension
+            else ps
+        )
+        self._parameter_space = ps
+        self._sent = current
+        return delta
+
+
+class _Job:
+    """
+    Work that is running in a work process
+    """
+
+    def __init__(
+        self,
+        work: FunmanWorkUnit,
+        priority: WorkPriority,
+        results: FunmanResults,
+        process: mp.Process,
+        halt_event,
+    ):
+        self.work = work
+        self.priority = priority
+        self.results = results
+        self.process = process
+        self.halt_event = halt_event
+        self.start_time = datetime.now()
+
+
+def _run_work(
+    work: FunmanWorkUnit,
+    results: FunmanResults,
+    halt_event,
+    messages: mp.Queue,
+    encoding_cache: Optional[str],
+    max_processes: Optional[int],
+):
+    """
+    Solve work in a work process, and send the updates of results to the
+    worker as (id, done, fields of results, parameter space delta) tuples.
+    """
+    from funman import Funman
+    from funman.config import FUNMANConfig
+
+    tracker = _ParameterSpaceTracker()
+    last_update = None
+    last_progress = 0.0
+
+    def send(done: bool):
+        fields = {
+            k: getattr(results, k)
+            for k in FunmanResults.model_fields
+            if k not in STATIC_FIELDS
+        }
+        messages.put(
+            (work.id, done, fields, tracker.delta(results.parameter_space))
+        )
+
+    def update(scenario: AnalysisScenario, parameter_space: ParameterSpace):
+        if results.is_final():
+            raise Exception(
+                "Cannot update results as they are already finalized"
+            )
+        progress = results.update_parameter_space(scenario, parameter_space)
+        nonlocal last_update, last_progress
+        now = datetime.now()
+        if (
+            last_update is None
+            or now - last_update >= UPDATE_INTERVAL
+            or progress.progress - last_progress >= UPDATE_PROGRESS_DELTA
+        ):
+            send(False)
+            last_update = now
+            last_progress = progress.progress
+        return progress
+
+    try:
+        results.start()
+        # convert to scenario
+        scenario = work.to_scenario()
+
+        config = (
+            FUNMANConfig()
+            if work.request.config is None
+            else work.request.config
+        )
+        if config.encoding_cache is None and encoding_cache is not None:
+            # Reuse model translations across requests
+            config = config.model_copy(
+                update={"encoding_cache": encoding_cache}
+            )
+        for field in ["number_of_processes", "encoding_processes"]:
+            if (
+                max_processes is not None
+                and getattr(config, field) > max_processes
+            ):
+                l.info(
+                    f"Limiting the {field} for {work.id} to its share of the cores: {max_processes}"
+                )
+                config = config.model_copy(update={field: max_processes})
+        f = Funman()
+        result = f.solve(
+            scenario,
+            config=config,
+            haltEvent=halt_event,
+            resultsCallback=lambda ps: update(scenario, ps),
+        )
+        results.finalize_result(result.scenario, result)
+        l.info(f"Completed work on: {work.id}")
+    except Exception as e:
+        l.error(f"Internal Server Error ({work.id}):")
+        traceback.print_exc()
+        if not results.is_final():
+            results.finalize_result_as_error(message=str(e))
+        l.error(f"Aborting work on: {work.id}")
+    finally:
+        results.stop()
+        send(True)
+
+
 class FunmanWorker:
+    """
+    The FunmanWorker runs the work units that are enqueued with
+    enqueue_work(), each in its own process, running up to max_concurrent
+    work units at once.  Consistency checks start before parameter synthesis
+    work, and when max_concurrent > 1, parameter synthesis work can use at
+    most max_concurrent - 1 of the slots so that consistency checks are not
+    blocked behind long synthesis runs.  Each work unit can use at most its
+    share of the cores (cpu_count / max_concurrent) for its search processes.
+
+    Parameters
+    ----------
+    storage : Storage
+        storage for the results
+    max_concurrent : int, optional
+        maximum number of work units to run at once, by default 1
+    encoding_cache : bool, optional
+        whether the work units that do not set config.encoding_cache share a
+        cache of the model encodings in the storage directory, by default
+        False (the cache is not bounded)
+    """
+
     _state: WorkerState = WorkerState.UNINITIALIZED
 
-    def __init__(self, storage):
-        self._halt_event = threading.Event()
+    def __init__(
+        self, storage, max_concurrent: int = 1, encoding_cache: bool = False
+    ):
         self._stop_event = None
         self._thread = None
         self._id_lock = threading.Lock()
@@ -47,10 +249,25 @@ class FunmanWorker:
         self._set_lock = threading.Lock()
 
         self.storage = storage
-        self.queue = queue.Queue()
+        self.max_concurrent = max(1, max_concurrent)
+        self.encoding_cache = encoding_cache
+        # (priority, sequence number, work) for work that has not started
+        self.queue: List[Tuple[WorkPriority, int, FunmanWorkUnit]] = []
+        self._sequence = 0
         self.queued_ids = set()
-        self.current_id = None
-        self.current_results = None
+        # id -> running work
+        self._jobs: Dict[str, _Job] = {}
+        # priority -> (count, total seconds) of completed work
+        self._durations: Dict[WorkPriority, Tuple[int, float]] = {}
+        # Search phase metrics of the completed work
+        self._completed_metrics = PhaseMetrics()
+        self._num_completed = 0
+        # The worker starts the work processes from its thread in a server
+        # with other threads, so they are started by a forkserver rather than
+        # forked from this process, where those threads may hold locks
+        self._context = mp.get_context("forkserver")
+        self._context.set_forkserver_preload([__name__])
+        self._messages = None
 
         # TODO consider changing to more robust state machine
         # instead of basic state field (if complexity increases)
@@ -85,8 +302,14 @@ class FunmanWorker:
                 parameter_space=ParameterSpace(),
             )
         )
-        self.queue.put(work)
+        priority = (
+            WorkPriority.CONSISTENCY
+            if work.is_consistency()
+            else WorkPriority.SYNTHESIS
+        )
         with self._set_lock:
+            self.queue.append((priority, self._sequence, work))
+            self._sequence += 1
             self.queued_ids.add(work.id)
         return work
 
@@ -98,6 +321,7 @@ class FunmanWorker:
         with self._state_lock:
             self._state = WorkerState.STARTING
             self._stop_event = threading.Event()
+            self._messages = self._context.Queue()
             self._thread = threading.Thread(
                 target=self._run, args=[self._stop_event], daemon=True
             )
@@ -125,10 +349,9 @@ class FunmanWorker:
             # Wait for the work thread to stop
             self._thread.join(timeout=timeout)
             if self._thread.is_alive():
-                # TODO If the thread is still alive then it is likely the solver
-                # is still processing and the thread will exit if/when the solver
-                # returns. Ideally we could kill it here and abandon any state it
-                # holds.
+                # TODO If the thread is still alive then it is likely
+                # stopping the work processes. Ideally we could kill it here
+                # and abandon any state it holds.
                 l.warning("Thread did not close")
             # Reset state
             self._thread = None
@@ -143,18 +366,40 @@ class FunmanWorker:
                 f"FunmanWorker must be running to check processing id: {self.get_state()}"
             )
         with self._id_lock:
-            return self.current_id == id
+            return id in self._jobs
 
     def get_results(self, id: str):
-        if not self.in_state(WorkerState.RUNNING) or self.current_id != id:
+        with self._id_lock:
+            job = self._jobs.get(id)
+        if not self.in_state(WorkerState.RUNNING) or job is None:
             # raise FunmanWorkerException(
             #     f"FunmanWorker must be running to get results: {self.get_state()}"
             # )
             return self.storage.get_result(id)
+        with self._results_lock:
+            return copy.copy(job.results)
+
+    def get_results_summary(self, id: str) -> FunmanResultsSummary:
+        return self._with_results(id, lambda r: r.summary())
+
+    def get_results_delta(
+        self, id: str, since: int = 0, epoch: Optional[str] = None
+    ) -> FunmanResultsDelta:
+        return self._with_results(
+            id, lambda r: r.delta(since=since, epoch=epoch)
+        )
+
+    def _with_results(self, id: str, f: Callable[[FunmanResults], Any]) -> Any:
+        """
+        Apply f to the results with the id, holding the results lock if the
+        work is running.
+        """
         with self._id_lock:
-            # if self.current_id == id:
-            return copy.copy(self.current_results)
-            # return self.storage.get_result(id)
+            job = self._jobs.get(id)
+        if not self.in_state(WorkerState.RUNNING) or job is None:
+            return f(self.storage.get_result(id))
+        with self._results_lock:
+            return f(job.results)
 
     def halt(self, id: str):
         if not self.in_state(WorkerState.RUNNING):
@@ -162,109 +407,287 @@ class FunmanWorker:
                 f"FunmanWorker must be running to halt request: {self.get_state()}"
             )
         with self._id_lock:
-            if id == self.current_id:
+            if id in self._jobs:
                 l.debug(f"Halting {id}")
-                self._halt_event.set()
+                self._jobs[id].halt_event.set()
                 return
             with self._set_lock:
                 if id in self.queued_ids:
                     self.queued_ids.remove(id)
+                    self.queue = [q for q in self.queue if q[2].id != id]
                 return
 
     def get_current(self) -> Optional[str]:
+        """
+        Return the id of the running work that started first, if any
+        """
+        running = self.get_running()
+        return running[0] if len(running) > 0 else None
+
+    def get_running(self) -> List[str]:
+        """
+        Return the ids of the running work, in the order that it started
+        """
         if not self.in_state(WorkerState.RUNNING):
             raise FunmanWorkerException(
                 f"FunmanWorker must be running to check currently processing request: {self.get_state()}"
             )
         with self._id_lock:
-            return self.current_id
+            return list(self._jobs.keys())
 
-    def _update_current_results(
-        self, scenario: AnalysisScenario, parameter_space: ParameterSpace
-    ) -> FunmanProgress:
-        with self._results_lock:
-            if self.current_results is None:
-                print(
-                    "WARNING: Attempted to update results while current_results was None"
+    def get_queue_status(self, id: str) -> FunmanQueueStatus:
+        """
+        Return the state of the work with the id, and if it is queued, its
+        position in the queue and estimated start time.  The estimate assumes
+        that work takes as long as the average of the completed work of the
+        same priority class, or for running work, the time implied by its
+        progress.
+        """
+        now = datetime.now()
+        with self._id_lock:
+            if id in self._jobs:
+                return FunmanQueueStatus(id=id, state="running")
+            # Seconds until each slot is free
+            slots = [
+                self._remaining_seconds(job, now)
+                for job in self._jobs.values()
+            ]
+            with self._set_lock:
+                pending = self._pending()
+        slots += [0.0] * (self.max_concurrent - len(slots))
+
+        for position, (priority, _, work) in enumerate(pending):
+            slot = min(
+                range(len(slots)),
+                key=lambda i: (
+                    slots[i] if slots[i] is not None else float("inf")
+                ),
+            )
+            if work.id == id:
+                start = slots[slot]
+                return FunmanQueueStatus(
+                    id=id,
+                    state="queued",
+                    position=position,
+                    estimated_start_time=(
+                        now + timedelta(seconds=start)
+                        if start is not None
+                        else None
+                    ),
                 )
-                return
+            duration = self._mean_duration(priority)
+            slots[slot] = (
+                slots[slot] + duration
+                if slots[slot] is not None and duration is not None
+                else None
+            )
 
-            if self.current_results.is_final():
-                raise Exception(
-                    "Cannot update current_results as it is already finalized"
+        result = self.storage.get_result(id)
+        return FunmanQueueStatus(
+            id=id, state="done" if result.done else "stopped"
+        )
+
+    def get_metrics(self) -> FunmanMetrics:
+        """
+        Return the search phase metrics of the running work, and in total of
+        the work that completed since the worker started
+        """
+        with self._id_lock:
+            jobs = list(self._jobs.values())
+            with self._results_lock:
+                running = {
+                    job.work.id: dict(job.results.timing.phases)
+                    for job in jobs
+                }
+                return FunmanMetrics(
+                    running=running,
+                    completed=self._completed_metrics.copy_phases(),
+                    num_completed=self._num_completed,
                 )
-            return self.current_results.update_parameter_space(
-                scenario, parameter_space
+
+    def _mean_duration(self, priority: WorkPriority) -> Optional[float]:
+        count, total = self._durations.get(priority, (0, 0.0))
+        return total / count if count > 0 else None
+
+    def _remaining_seconds(self, job: _Job, now: datetime) -> Optional[float]:
+        elapsed = (now - job.start_time).total_seconds()
+        progress = job.results.progress.progress
+        if progress > 0.0:
+            return elapsed * (1.0 - progress) / progress
+        mean = self._mean_duration(job.priority)
+        return max(0.0, mean - elapsed) if mean is not None else None
+
+    def _pending(self) -> List[Tuple[WorkPriority, int, FunmanWorkUnit]]:
+        """
+        Queued work in the order that it will start
+        """
+        return sorted(
+            (q for q in self.queue if q[2].id in self.queued_ids),
+            key=lambda q: (q[0], q[1]),
+        )
+
+    def _next_work(self) -> Optional[Tuple[WorkPriority, FunmanWorkUnit]]:
+        if len(self._jobs) >= self.max_concurrent:
+            return None
+        # Leave a slot for consistency checks
+        max_synthesis = max(1, self.max_concurrent - 1)
+        num_synthesis = len(
+            [
+                j
+                for j in self._jobs.values()
+                if j.priority == WorkPriority.SYNTHESIS
+            ]
+        )
+        with self._set_lock:
+            for item in self._pending():
+                priority, _, work = item
+                if (
+                    priority == WorkPriority.SYNTHESIS
+                    and num_synthesis >= max_synthesis
+                ):
+                    continue
+                self.queue.remove(item)
+                self.queued_ids.remove(work.id)
+                return priority, work
+        return None
+
+    def _start_work(self, priority: WorkPriority, work: FunmanWorkUnit):
+        results = self.storage.get_result(work.id)
+        halt_event = self._context.Event()
+        cores = os.cpu_count() or 1
+        max_processes = (
+            max(1, cores // self.max_concurrent)
+            if self.max_concurrent > 1
+            else None
+        )
+        process = self._context.Process(
+            target=_run_work,
+            args=(
+                work,
+                results,
+                halt_event,
+                self._messages,
+                (
+                    str(self.storage.path / "encodings")
+                    if self.encoding_cache
+                    else None
+                ),
+                max_processes,
+            ),
+            name=f"FunmanWork_{work.id}",
+            daemon=False,
+        )
+        l.info(f"Starting work on: {work.id}")
+        with self._id_lock:
+            self._jobs[work.id] = _Job(
+                work, priority, results, process, halt_event
             )
+        process.start()
 
-    def _run(self, stop_event: threading.Event):
-        from funman import Funman
-        from funman.config import FUNMANConfig
+    def _handle_message(self, message):
+        id, done, fields, delta = message
+        with self._id_lock:
+            job = self._jobs.get(id)
+        if job is None:
+            l.warning(f"Received results for work that is not running: {id}")
+            return
 
+        with self._results_lock:
+            results = job.results
+            for k, v in fields.items():
+                setattr(results, k, v)
+            if isinstance(delta, ParameterSpace) or delta is None:
+                results.parameter_space = delta
+            else:
+                for f, items in delta.items():
+                    getattr(results.parameter_space, f).extend(items)
+
+        if done:
+            self._finish_work(job)
+        else:
+            try:
+                self.storage.update_result(results)
+            except Exception as e:
+                l.exception(f"Unable to store the current results: {e}")
+
+    def _finish_work(self, job: _Job):
+        self.storage.add_result(job.results)
+        job.process.join()
+        duration = (datetime.now() - job.start_time).total_seconds()
+        count, total = self._durations.get(job.priority, (0, 0.0))
+        self._durations[job.priority] = (count + 1, total + duration)
+        with self._id_lock:
+            with self._results_lock:
+                self._completed_metrics.merge(job.results.timing.phases)
+                self._num_completed += 1
+            del self._jobs[job.work.id]
+
+    def _check_jobs(self):
+        """
+        Finish the work whose process exited without sending its results
+        """
+        with self._id_lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.process.is_alive():
+                continue
+            # Handle the messages that the process sent before it exited
+            self._drain_messages()
+            with self._id_lock:
+                if job.work.id not in self._jobs:
+                    continue
+            l.error(
+                f"Work process for {job.work.id} exited with code {job.process.exitcode}"
+            )
+            with self._results_lock:
+                if not job.results.done:
+                    job.results.finalize_result_as_error(
+                        message=f"Work process exited with code {job.process.exitcode}"
+                    )
+            self._finish_work(job)
+
+    def _drain_messages(self):
+        while True:
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                return
+            self._handle_message(message)
+
+    def _stop_jobs(self):
+        with self._id_lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.halt_event.set()
+        for job in jobs:
+            # Keep reading messages so that the processes can exit
+            while job.process.is_alive():
+                try:
+                    self._handle_message(self._messages.get(timeout=0.5))
+                except queue.Empty:
+                    pass
+        self._drain_messages()
+        self._check_jobs()
+
+    def _run(self, stop_event: threading.Event):
         l.info("FunmanWorker running...")
         try:
             while True:
                 if stop_event.is_set():
+                    self._stop_jobs()
                     break
-                try:
-                    work: FunmanWorkUnit = self.queue.get(timeout=0.5)
-                except queue.Empty:
-                    continue
 
-                # skip work that is no longer in the queued_ids set
-                # since that likely indicated it has been halted
-                # before starting
-                with self._set_lock:
-                    if work.id not in self.queued_ids:
-                        continue
-
-                with self._id_lock:
-                    self.current_id = work.id
-                    self.current_results = self.storage.get_result(
-                        self.current_id
-                    )
+                next_work = self._next_work()
+                if next_work is not None:
+                    self._start_work(*next_work)
+                    continue
 
-                l.info(f"Starting work on: {work.id}")
                 try:
-                    self.current_results.start()
-                    # convert to scenario
-                    scenario = work.to_scenario()
-
-                    config = (
-                        FUNMANConfig()
-                        if work.request.config is None
-                        else work.request.config
-                    )
-                    f = Funman()
-                    self._halt_event.clear()
-                    result = f.solve(
-                        scenario,
-                        config=config,
-                        haltEvent=self._halt_event,
-                        resultsCallback=lambda results: self._update_current_results(
-                            scenario, results
-                        ),
-                    )
-                    with self._results_lock:
-                        self.current_results.finalize_result(
-                            result.scenario, result
-                        )
-                    l.info(f"Completed work on: {work.id}")
-                except Exception as e:
-                    l.error(f"Internal Server Error ({work.id}):")
-                    traceback.print_exc()
-                    with self._results_lock:
-                        self.current_results.finalize_result_as_error(
-                            message=str(e)
-                        )
-                    l.error(f"Aborting work on: {work.id}")
-                finally:
-                    self.current_results.stop()
-                    self.storage.add_result(self.current_results)
-                    self.queue.task_done()
-                    with self._id_lock:
-                        self.current_id = None
-                        self.current_results = None
+                    message = self._messages.get(timeout=0.5)
+                except queue.Empty:
+                    self._check_jobs()
+                    continue
+                self._handle_message(message)
         except Exception as e:
             l.error("Fatal error in worker!")
             traceback.print_exc()
@@ -273,8 +696,11 @@ class FunmanWorker:
             if not stop_event.is_set():
                 with self._state_lock:
                     self._state = WorkerState.ERRORED
-                    result = self.storage.get_result(work.id)
-                    result.error = True
-                    result.done = True
-                    # self.storage.add_result(result)
+                    with self._id_lock:
+                        jobs = list(self._jobs.values())
+                    for job in jobs:
+                        job.halt_event.set()
+                        job.results.error = True
+                        job.results.done = True
+                        # self.storage.add_result(job.results)
         l.info("FunmanWorker exiting...")
@@ -0,0 +1,160 @@
+"""
+This module defines the EncodingCache class, a persistent cache of the
+translated transition steps of a model encoding.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from pysmt.formula import FNode
+from pysmt.shortcuts import EqualsOrIff
+from pysmt.smtlib import commands as smtcmd
+from pysmt.smtlib.parser import SmtLibParser
+from pysmt.smtlib.printers import to_smtlib
+
+from funman._version import __version__
+
+l = logging.getLogger(__name__)
+
+# FUNMANConfig fields that change how a transition step is translated
+ENCODING_CONFIG_FIELDS = [
+    "substitute_subformulas",
+    "series_approximation_threshold",
+    "taylor_series_order",
+    "use_transition_symbols",
+    "normalize",
+]
+
+
+def _declarations(formulas: List[FNode]) -> str:
+    symbols = {s for f in formulas for s in f.get_free_variables()}
+    return "".join(
+        f"(declare-fun {s.symbol_name()} () {s.symbol_type().as_smtlib(funstyle=False)})\n"
+        for s in sorted(symbols, key=lambda s: s.symbol_name())
+    )
+
+
+class EncodingCache(BaseModel):
+    """
+    The EncodingCache stores the translation of each transition step of a
+    model in a directory, so that it is reused by other processes and runs.
+    An entry stores the SMT-LIB formula for the step and the substitutions
+    that the step added to the substitution table of the schedule.
+
+    Entries are content addressed.  The key of a step is a hash of the key of
+    the previous step (or the initial key of the encoding, see
+    initial_key()) and the timepoints of the step, so that it identifies
+    every input to the translation of the step.
+
+    Parameters
+    ----------
+    path : str
+        cache directory
+    """
+
+    path: str
+
+    @staticmethod
+    def digest(*items: str) -> str:
+        h = hashlib.sha256()
+        for item in items:
+            h.update(item.encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    @staticmethod
+    def initial_key(
+        scenario: "AnalysisScenario",
+        config: "FUNMANConfig",
+        substitutions: Dict[FNode, FNode],
+    ) -> str:
+        """
+        Key identifying the model, the encoding configuration, and the
+        initial substitution table.  The parameter bounds are only part of the
+        key when the encoding substitutes subformulas, because they only
+        affect the translation through the substitutions and approximations.
+        """
+        items = [
+            __version__,
+            type(scenario.model).__name__,
+            # The name of a model defaults to a random id
+            scenario.model.model_dump_json(exclude={"name"}),
+            str(
+                [(f, getattr(config, f, None)) for f in ENCODING_CONFIG_FIELDS]
+            ),
+            str(scenario.normalization_constant),
+        ]
+        if config.substitute_subformulas:
+            items += [
+                p.model_dump_json() for p in scenario.model_parameters()
+            ] + sorted(
+                f"{k} {to_smtlib(v, daggify=False)}"
+                for k, v in substitutions.items()
+            )
+        return EncodingCache.digest(*items)
+
+    @staticmethod
+    def step_key(previous_key: str, step: int, next_step: int) -> str:
+        return EncodingCache.digest(previous_key, str(step), str(next_step))
+
+    def _file(self, key: str) -> Path:
+        return Path(self.path) / key[:2] / f"{key}.smt2"
+
+    def get(self, key: str) -> Optional[Tuple[FNode, Dict[FNode, FNode]]]:
+        """
+        Get the formula and new substitutions of a step, if they are cached.
+        """
+        file = self._file(key)
+        try:
+            with open(file, "r") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            parser = SmtLibParser()
+            assertions = [
+                cmd.args[0]
+                for cmd in parser.get_command_generator(StringIO(text))
+                if cmd.name == smtcmd.ASSERT
+            ]
+        except Exception as e:
+            l.warning(f"Ignoring unreadable encoding cache entry {file}: {e}")
+            return None
+        substitutions = {a.arg(0): a.arg(1) for a in assertions[1:]}
+        return assertions[0], substitutions
+
+    def put(
+        self,
+        key: str,
+        formula: FNode,
+        substitutions: Dict[FNode, FNode],
+    ):
+        """
+        Store the formula and new substitutions of a step.  The entry is
+        written to a temporary file and renamed so that concurrent readers
+        never see a partial entry.
+        """
+        equalities = [EqualsOrIff(k, v) for k, v in substitutions.items()]
+        text = (
+            _declarations([formula] + equalities)
+            + f"(assert {to_smtlib(formula, daggify=True)})\n"
+            + "".join(
+                f"(assert {to_smtlib(e, daggify=True)})\n" for e in equalities
+            )
+        )
+        file = self._file(key)
+        try:
+            file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=file.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+            os.replace(tmp, file)
+        except OSError as e:
+            l.warning(f"Could not write encoding cache entry {file}: {e}")
@@ -0,0 +1,153 @@
+"""
+This module translates the transition steps of a model encoding in a pool of
+processes.  The processes return each step as a compact serialization of the
+formula DAG that the parent rebuilds in its own pysmt environment.
+"""
+
+import logging
+import multiprocessing as mp
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from pysmt.formula import FNode
+from pysmt.operators import BOOL_CONSTANT, INT_CONSTANT, REAL_CONSTANT, SYMBOL
+from pysmt.shortcuts import BOOL, INT, REAL, get_env
+
+from ..representation.representation import EncodingSchedule
+
+if TYPE_CHECKING:
+    from .translate import Encoder
+
+l = logging.getLogger(__name__)
+
+# Record of a node in a serialized DAG: (node type, indices of the args,
+# payload).  The payload is the (name, type name) of a symbol, the value of a
+# constant, and None otherwise.
+SerializedNode = Tuple[int, Tuple[int, ...], object]
+SerializedFormulas = Tuple[List[SerializedNode], List[int]]
+
+SYMBOL_TYPES = {"Bool": BOOL, "Int": INT, "Real": REAL}
+
+
+def serialize_formulas(formulas: List[FNode]) -> SerializedFormulas:
+    """
+    Serialize the DAG of formulas as a list of node records, where each node
+    follows its args, and the indices of the formulas in the list.
+    """
+    index: Dict[FNode, int] = {}
+    nodes: List[SerializedNode] = []
+    for formula in formulas:
+        stack = [formula]
+        while stack:
+            node = stack[-1]
+            if node in index:
+                stack.pop()
+                continue
+            pending = [a for a in node.args() if a not in index]
+            if pending:
+                stack += pending
+                continue
+            stack.pop()
+            if node.is_symbol():
+                name = str(node.symbol_type())
+                if name not in SYMBOL_TYPES:
+                    raise ValueError(
+                        f"Cannot serialize symbol {node} of type {name}"
+                    )
+                payload = (node.symbol_name(), name)
+            elif node.node_type() in [
+                BOOL_CONSTANT,
+                INT_CONSTANT,
+                REAL_CONSTANT,
+            ]:
+                payload = node.constant_value()
+            elif node._content.payload is None:
+                payload = None
+            else:
+                raise ValueError(f"Cannot serialize formula {node}")
+            index[node] = len(nodes)
+            nodes.append(
+                (
+                    node.node_type(),
+                    tuple(index[a] for a in node.args()),
+                    payload,
+                )
+            )
+    return nodes, [index[f] for f in formulas]
+
+
+def deserialize_formulas(data: SerializedFormulas) -> List[FNode]:
+    """
+    Rebuild the formulas serialized by serialize_formulas() with the formula
+    manager of the current environment, so that they share the nodes that
+    already exist.
+    """
+    mgr = get_env().formula_manager
+    nodes, roots = data
+    formulas: List[FNode] = []
+    for node_type, args, payload in nodes:
+        if node_type == SYMBOL:
+            name, type_name = payload
+            formulas.append(mgr.Symbol(name, SYMBOL_TYPES[type_name]))
+        elif node_type == BOOL_CONSTANT:
+            formulas.append(mgr.Bool(payload))
+        elif node_type == INT_CONSTANT:
+            formulas.append(mgr.Int(payload))
+        elif node_type == REAL_CONSTANT:
+            formulas.append(mgr.Real(payload))
+        else:
+            formulas.append(
+                mgr.create_node(node_type, tuple(formulas[a] for a in args))
+            )
+    return [formulas[r] for r in roots]
+
+
+# (encoder, scenario) for the processes of the pool, which inherit it when
+# the pool forks them.
+_pool_state: Optional[Tuple["Encoder", "AnalysisScenario"]] = None
+
+
+def _encode_step(
+    task: Tuple[EncodingSchedule, int, int, Optional[str]],
+) -> SerializedFormulas:
+    encoder, scenario = _pool_state
+    schedule, step, next_step, cache_key = task
+    if cache_key is not None:
+        encoder._encoding_cache_keys[schedule] = cache_key
+    c, _ = encoder._encode_cached_next_step(
+        scenario,
+        schedule,
+        step,
+        next_step,
+        dict(encoder.substitutions(schedule)),
+    )
+    return serialize_formulas([c])
+
+
+def encode_steps(
+    encoder: "Encoder",
+    scenario: "AnalysisScenario",
+    tasks: List[Tuple[EncodingSchedule, int, int, Optional[str]]],
+    processes: int,
+) -> List[FNode]:
+    """
+    Encode the transition of each task (schedule, step, next_step, encoding
+    cache key of the schedule before the step) with
+    encoder._encode_cached_next_step() in a pool of processes.
+
+    Returns
+    -------
+    List[FNode]
+        formula for each task, in the same order
+    """
+    global _pool_state
+    _pool_state = (encoder, scenario)
+    try:
+        ctx = mp.get_context("fork")
+        with ctx.Pool(processes=min(processes, len(tasks))) as pool:
+            # Chunks keep the steps of a schedule in the same process, which
+            # then reuses its conversion caches across them.
+            chunksize = max(1, len(tasks) // (4 * processes))
+            results = pool.map(_encode_step, tasks, chunksize=chunksize)
+    finally:
+        _pool_state = None
+    return [deserialize_formulas(r)[0] for r in results]
@@ -23,6 +23,7 @@ from funman.translate.simplifier import FUNMANSimplifier
 from funman.utils.sympy_utils import (
     rate_expr_to_pysmt,
     series_approx,
+    state_symbol_map,
     sympy_subs,
     to_sympy,
 )
@@ -133,9 +134,13 @@ class PetrinetEncoder(Encoder):
                     for k, v in transition_terms.items()
                 }
         else:
-            # Need to convert transition terms to pysmt without substituting
+            # Need to convert transition terms to pysmt without substituting.
+            # The terms are over the untimed state variables, so that their
+            # conversion is cached across steps, and only the substitution of
+            # the state variables for this step is new.
+            symbol_map = state_symbol_map(current_state)
             transition_terms = {
-                k: [rate_expr_to_pysmt(t, current_state) for t in v]
+                k: [rate_expr_to_pysmt(t, symbol_map=symbol_map) for t in v]
                 for k, v in transition_terms.items()
             }
 
@@ -489,8 +494,14 @@ class PetrinetEncoder(Encoder):
             scenario.model._transition_id(transition)
         ]:
             if isinstance(r, sympy.Expr):
-                # is a custom rate expression
-                transition_rates.append(sympy_subs(r, state_subs))
+                # is a custom rate expression, which is simplified with the
+                # current state variables if substituting subformulas, and is
+                # otherwise left untimed for rate_expr_to_pysmt()
+                transition_rates.append(
+                    sympy_subs(r, state_subs)
+                    if self.config.substitute_subformulas
+                    else r
+                )
             elif isinstance(r, str):
                 # Is a single parameter
                 transition_rates.append(substitutions[Symbol(r, REAL)])
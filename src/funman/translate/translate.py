@@ -64,6 +64,8 @@ from ..representation.parameter import ModelParameter, Schedules
 from ..representation.representation import EncodingSchedule
 from ..representation.symbol import ModelSymbol
 from .encoding import *
+from .encoding_cache import EncodingCache
+from .encoding_pool import encode_steps
 
 l = logging.getLogger(__name__)
 
@@ -202,6 +204,8 @@ class Encoder(ABC, BaseModel):
     _env = get_env()
     _env._simplifier = FUNMANSimplifier(_env)
     _constraint_encoder_handler: Dict[Constraint, Callable] = {}
+    _encoding_cache: Optional[EncodingCache] = None
+    _encoding_cache_keys: Dict[EncodingSchedule, str] = {}
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -219,6 +223,8 @@ class Encoder(ABC, BaseModel):
         variable_symbols = [self._encode_state_var(p) for p in variables]
 
         self._encode_timed_model_elements(scenario)
+        if self.config.encoding_cache is not None:
+            self._initialize_encoding_cache(scenario)
 
         self._constraint_encoder_handler = {
             ModelConstraint: self.encode_model_layer,
@@ -229,6 +235,114 @@ class Encoder(ABC, BaseModel):
             TimeseriesConstraint: self.encode_timeseries,
         }
 
+    def _initialize_encoding_cache(self, scenario: "AnalysisScenario"):
+        try:
+            self._encoding_cache_keys = {
+                schedule: EncodingCache.initial_key(
+                    scenario, self.config, self.substitutions(schedule)
+                )
+                for schedule in self._timed_model_elements[
+                    "schedules"
+                ].schedules
+            }
+        except Exception as e:
+            l.warning(f"Not caching the encoding of the model: {e}")
+        else:
+            self._encoding_cache = EncodingCache(
+                path=self.config.encoding_cache
+            )
+
+    def _encode_cached_next_step(
+        self,
+        scenario: "AnalysisScenario",
+        schedule: EncodingSchedule,
+        step: int,
+        next_step: int,
+        substitutions: Dict[FNode, FNode],
+    ) -> Tuple[FNode, Dict[FNode, FNode]]:
+        """
+        Encode the transition from step to next_step with
+        self._encode_next_step(), unless the transition is in the encoding
+        cache.
+        """
+        if self._encoding_cache is None:
+            return self._encode_next_step(
+                scenario, step, next_step, substitutions=substitutions
+            )
+
+        key = EncodingCache.step_key(
+            self._encoding_cache_keys[schedule], step, next_step
+        )
+        self._encoding_cache_keys[schedule] = key
+        cached = self._encoding_cache.get(key)
+        if cached is not None:
+            l.debug(f"Using cached encoding of step: {step} to {next_step}")
+            c, new_substitutions = cached
+            substitutions.update(new_substitutions)
+        else:
+            previous_substitutions = dict(substitutions)
+            c, substitutions = self._encode_next_step(
+                scenario, step, next_step, substitutions=substitutions
+            )
+            self._encoding_cache.put(
+                key,
+                c,
+                {
+                    k: v
+                    for k, v in substitutions.items()
+                    if previous_substitutions.get(k) is not v
+                },
+            )
+        return c, substitutions
+
+    def encode_transitions(self, scenario: "AnalysisScenario"):
+        """
+        Encode the transitions of every schedule that are not yet encoded in
+        config.encoding_processes processes, instead of encoding them as the
+        layers are created.  The transitions are encoded sequentially if
+        config.substitute_subformulas, because each transition then depends
+        upon the substitutions of the previous one.
+        """
+        processes = self.config.encoding_processes
+        if processes <= 1 or self.config.substitute_subformulas:
+            return
+
+        # Schedules share the transitions with the same timepoint and step
+        # size, so each is encoded once, as part of the first schedule.
+        tasks = []
+        claimed = set([])
+        cache_keys = dict(self._encoding_cache_keys)
+        for schedule in self._timed_model_elements["schedules"].schedules:
+            for step, next_step in zip(
+                schedule.timepoints[:-1], schedule.timepoints[1:]
+            ):
+                stepsize = next_step - step
+                if (step, stepsize) in claimed or self.time_step_constraints(
+                    step, stepsize
+                ) is not None:
+                    continue
+                claimed.add((step, stepsize))
+                cache_key = cache_keys.get(schedule)
+                tasks.append((schedule, step, next_step, cache_key))
+                if cache_key is not None:
+                    cache_keys[schedule] = EncodingCache.step_key(
+                        cache_key, step, next_step
+                    )
+        if len(tasks) == 0:
+            return
+
+        l.debug(f"Encoding {len(tasks)} transitions in {processes} processes")
+        try:
+            formulas = encode_steps(self, scenario, tasks, processes)
+        except Exception as e:
+            l.warning(
+                f"Encoding the transitions as the layers are created, because encoding them in processes failed: {e}"
+            )
+            return
+        for (schedule, step, next_step, _), c in zip(tasks, formulas):
+            self.set_time_step_constraints(step, next_step - step, c)
+        self._encoding_cache_keys = cache_keys
+
     def step_size_index(self, step_size: int) -> int:
         return self._timed_model_elements["step_sizes"].index(step_size)
 
@@ -438,11 +552,12 @@ class Encoder(ABC, BaseModel):
 
         if c is None:
             next_timepoint = options.schedule.time_at_step(layer_idx)
-            c, substitutions = self._encode_next_step(
+            c, substitutions = self._encode_cached_next_step(
                 scenario,
+                options.schedule,
                 timepoint,
                 next_timepoint,
-                substitutions=substitutions,
+                substitutions,
             )
             self.set_time_step_constraints(timepoint, stepsize, c)
             self.set_step_substitutions(options.schedule, substitutions)
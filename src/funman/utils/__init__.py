@@ -2,4 +2,5 @@ from .logging import *
 from .math_utils import *
 from .smtlib_utils import *
 from .handlers import *
+from .metrics import *
 from .sympy_utils import *
@@ -0,0 +1,112 @@
+"""
+This module defines the PhaseMetrics class, which times the phases of a
+search (e.g., encoding a box or checking a query) with little overhead, so
+that it can stay enabled in production.
+"""
+
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterable, List
+
+from pydantic import BaseModel
+
+# Phases of the box search
+MODEL_ENCODING = "model_encoding"
+BOX_ENCODING = "box_encoding"
+TRUE_QUERY = "true_query"
+FALSE_QUERY = "false_query"
+SPLIT = "split"
+CHECK_ASSUMPTIONS = "check_assumptions"
+ENCLOSURE = "enclosure"
+MONOTONICITY = "monotonicity"
+CONTRACTION = "contraction"
+SCHEDULE_REFINEMENT = "schedule_refinement"
+RESULT_HANDLER = "result_handler"
+PROGRESS_CALLBACK = "progress_callback"
+
+SOLVER_PHASES = [TRUE_QUERY, FALSE_QUERY, CHECK_ASSUMPTIONS]
+ENCODING_PHASES = [MODEL_ENCODING, BOX_ENCODING]
+
+
+class PhaseMetric(BaseModel):
+    """
+    Number of times that a phase ran, and its total and longest time in
+    seconds.
+    """
+
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    def add(self, seconds: float, count: int = 1):
+        self.count += count
+        self.total_time += seconds
+        self.max_time = max(self.max_time, seconds)
+
+    def merge(self, other: "PhaseMetric"):
+        self.count += other.count
+        self.total_time += other.total_time
+        self.max_time = max(self.max_time, other.max_time)
+
+
+class PhaseMetrics(BaseModel):
+    """
+    The metrics of each phase.  The time of a phase excludes the time of the
+    phases that run within it, so that the phases partition the time that
+    they cover.
+    """
+
+    phases: Dict[str, PhaseMetric] = {}
+    # Time of the phases nested in each running phase
+    _nested: List[float] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time the body of the with statement as the phase name.
+        """
+        start = perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            nested = self._nested.pop()
+            if len(self._nested) > 0:
+                self._nested[-1] += elapsed
+            self.add(name, elapsed - nested)
+
+    def add(self, name: str, seconds: float, count: int = 1):
+        metric = self.phases.get(name)
+        if metric is None:
+            metric = self.phases[name] = PhaseMetric()
+        metric.add(seconds, count=count)
+
+    def merge(self, phases: Dict[str, PhaseMetric]):
+        """
+        Add the metrics of phases (e.g., from another process) to these.
+        """
+        for name, metric in phases.items():
+            if name not in self.phases:
+                self.phases[name] = PhaseMetric()
+            self.phases[name].merge(metric)
+
+    def total_time(self, names: Iterable[str]) -> float:
+        return sum(
+            self.phases[name].total_time
+            for name in names
+            if name in self.phases
+        )
+
+    def copy_phases(self) -> Dict[str, PhaseMetric]:
+        return {
+            name: metric.model_copy() for name, metric in self.phases.items()
+        }
+
+    def drain(self) -> "PhaseMetrics":
+        """
+        Remove the metrics of the finished phases, and return them.
+        """
+        drained = PhaseMetrics(phases=self.phases)
+        self.phases = {}
+        return drained
@@ -1,7 +1,8 @@
 import logging
 import math
-from functools import reduce
-from typing import Dict, List, Union
+import re
+from functools import lru_cache, reduce
+from typing import Dict, List, Tuple, Union
 
 import pysmt.operators as op
 import pysmt.typing as types
@@ -28,6 +29,13 @@ from sympy.logic.boolalg import BooleanTrue
 
 l = logging.getLogger(__name__)
 
+# Number of parsed strings and converted sympy expressions to keep.  The
+# encoders convert the same rate and observable expressions at every step, so
+# the caches only need to hold the (sub)expressions of one model.
+CONVERSION_CACHE_SIZE = 8192
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w*")
+
 
 class SympyBoundedSubstituter(BaseModel):
     model_config = ConfigDict(
@@ -229,6 +237,12 @@ def replace_reserved(str_expr):
     return str_expr
 
 
+@lru_cache(maxsize=CONVERSION_CACHE_SIZE)
+def _sympify(clean_expr: str, symbol_names: Tuple[str]) -> Expr:
+    symbol_map = {s: symbols(s) for s in symbol_names}
+    return sympify(clean_expr, symbol_map)
+
+
 def to_sympy(
     formula: Union[FNode, str],
     str_symbols: List[str],
@@ -236,10 +250,15 @@ def to_sympy(
     if isinstance(formula, float):
         expr = formula
     elif isinstance(formula, str):
-        unreserved_symbols = [replace_reserved(s) for s in str_symbols]
         clean_expr = replace_reserved(formula)
-        symbol_map = {s: symbols(s) for s in unreserved_symbols}
-        expr = sympify(clean_expr, symbol_map)
+        # Only the symbols that occur in the expression affect the parse, so
+        # the cache key does not depend upon the rest of str_symbols.
+        identifiers = set(IDENTIFIER_RE.findall(clean_expr))
+        unreserved_symbols = [replace_reserved(s) for s in str_symbols]
+        symbol_names = tuple(
+            sorted({s for s in unreserved_symbols if s in identifiers})
+        )
+        expr = _sympify(clean_expr, symbol_names)
     elif isinstance(formula, FNode):
         expr = SympySerializer().to_sympy(formula)
     elif isinstance(formula, Expr):
@@ -275,25 +294,63 @@ def substitute(str_expr: str, values: Dict[str, Union[float, str]]):
     return sub_expr
 
 
-def rate_expr_to_pysmt(expr: Union[str, Expr], state=None):
-    env_symbols = get_env().formula_manager.symbols
-    f = to_sympy(expr, [str(s) for s in env_symbols])
-    p: FNode = sympy_to_pysmt(f)
-
-    if state:  # Map symbols in p to state indexed versions (e.g., I to I_5)
-        symbol_to_state_var = {env_symbols[s]: state[str(s)] for s in state}
-
-        if "timer_t" in state:
-            # Replace mapping timer_t: timer_t_k with t: timer_t_k
-            symbol_to_state_var[Symbol("t", REAL)] = state["timer_t"]
-
-        p_sub = p.substitute(symbol_to_state_var)
-        return p_sub
+def state_symbol_map(state: Dict[str, FNode]) -> Dict[FNode, FNode]:
+    """
+    Map the untimed symbols of the state variables to the symbols in state.
+
+    Parameters
+    ----------
+    state : Dict[str, FNode]
+        state variable name to timed symbol (e.g., I to I_5)
+
+    Returns
+    -------
+    Dict[FNode, FNode]
+        untimed symbol to timed symbol
+    """
+    symbol_to_state_var = {Symbol(s, REAL): state[s] for s in state}
+
+    if "timer_t" in state:
+        # Replace mapping timer_t: timer_t_k with t: timer_t_k
+        symbol_to_state_var[Symbol("t", REAL)] = state["timer_t"]
+    return symbol_to_state_var
+
+
+def rate_expr_to_pysmt(
+    expr: Union[str, Expr],
+    state: Dict[str, FNode] = None,
+    symbol_map: Dict[FNode, FNode] = None,
+):
+    """
+    Convert a rate expression over the untimed state variables into a pysmt
+    formula over the variables in state.  The untimed formula is converted
+    once per expression and then instantiated for each step by substituting
+    symbols, so callers that encode many steps can compute symbol_map once
+    per step with state_symbol_map() and pass it instead of state.
+    """
+    if isinstance(expr, str):
+        env_symbols = get_env().formula_manager.symbols
+        expr = to_sympy(expr, [str(s) for s in env_symbols])
+    p: FNode = sympy_to_pysmt(expr)
+
+    if symbol_map is None and state:
+        # Map symbols in p to state indexed versions (e.g., I to I_5)
+        symbol_map = state_symbol_map(state)
+    if symbol_map:
+        return p.substitute(symbol_map)
     else:
         return p
 
 
 def sympy_to_pysmt(expr):
+    # FNodes belong to the formula manager of an environment, so the cache is
+    # keyed on both.  Because each subexpression goes through the cache, the
+    # shared subterms of rate expressions are only converted once.
+    return _sympy_to_pysmt(expr, get_env())
+
+
+@lru_cache(maxsize=CONVERSION_CACHE_SIZE)
+def _sympy_to_pysmt(expr, env):
     func = expr.func
     if func.is_Boolean:
         return TRUE() if isinstance(expr, BooleanTrue) else FALSE()
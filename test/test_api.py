@@ -9,7 +9,12 @@ from fastapi.testclient import TestClient
 
 from funman.api.api import app, settings
 from funman.representation import ParameterSpace
-from funman.server.query import FunmanResults, FunmanWorkUnit
+from funman.server.query import (
+    FunmanResults,
+    FunmanResultsDelta,
+    FunmanResultsSummary,
+    FunmanWorkUnit,
+)
 
 l = logging.getLogger(__name__)
 l.setLevel(logging.DEBUG)
@@ -283,6 +288,78 @@ class TestAPI(unittest.TestCase):
             data = self.wait_for_done(client, work_unit.id)
             self.check_parameter_synthesis_success(data.parameter_space)
 
+    def test_results_delta(self):
+        model = json.loads((AMR_EXAMPLES_PETRI_DIR / "sir.json").read_bytes())
+        request = {
+            "structure_parameters": [
+                {"name": "schedules", "schedules": [{"timepoints": [0, 1]}]}
+            ],
+            "config": {"solver": "z3"},
+        }
+        headers = {"token": f"{TEST_API_TOKEN}"}
+        with TestClient(app) as client:
+            response = client.post(
+                "/api/queries",
+                json={"model": model, "request": request},
+                headers=headers,
+            )
+            assert response.status_code == 200
+            id = FunmanWorkUnit.model_validate(response.json()).id
+
+            # The stream ends when the query is done
+            events = []
+            with client.stream(
+                "GET",
+                f"/api/queries/{id}/stream",
+                params={"interval": 0.2},
+                headers=headers,
+            ) as response:
+                assert response.status_code == 200
+                for line in response.iter_lines():
+                    if line.startswith("data: "):
+                        events.append(
+                            FunmanResultsDelta.model_validate_json(line[6:])
+                        )
+            assert events[-1].done
+            streamed = sum(len(e.true_boxes) for e in events)
+
+            response = client.get(
+                f"/api/queries/{id}/summary", headers=headers
+            )
+            assert response.status_code == 200
+            summary = FunmanResultsSummary.model_validate(response.json())
+            assert summary.done
+            assert summary.num_true_boxes == 1
+            assert streamed == summary.num_true_boxes
+
+            response = client.get(
+                f"/api/queries/{id}/delta",
+                params={"since": 0},
+                headers=headers,
+            )
+            delta = FunmanResultsDelta.model_validate(response.json())
+            assert len(delta.true_boxes) == 1
+            assert delta.cursor == summary.cursor
+
+            response = client.get(
+                f"/api/queries/{id}/delta",
+                params={"since": delta.cursor, "epoch": delta.epoch},
+                headers=headers,
+            )
+            delta = FunmanResultsDelta.model_validate(response.json())
+            assert not delta.reset
+            assert len(delta.true_boxes) == 0
+
+            # A cursor of another epoch gets all of the results again
+            response = client.get(
+                f"/api/queries/{id}/delta",
+                params={"since": delta.cursor, "epoch": "stale"},
+                headers=headers,
+            )
+            delta = FunmanResultsDelta.model_validate(response.json())
+            assert delta.reset
+            assert len(delta.true_boxes) == 1
+
     def test_amr_pairs(self):
         pairs = [
             # (model, request)
@@ -0,0 +1,90 @@
+import random
+import unittest
+
+from funman.representation import Box, Interval, Point
+from funman.representation.parameter import ModelParameter
+
+
+class TestBox(unittest.TestCase):
+    def _box(self, x, y, closed=False):
+        return Box(
+            bounds={
+                "x": Interval(lb=x[0], ub=x[1], closed_upper_bound=closed),
+                "y": Interval(lb=y[0], ub=y[1], closed_upper_bound=closed),
+                "timestep": Interval(lb=0, ub=2, closed_upper_bound=True),
+            }
+        )
+
+    def _points(self, n):
+        rng = random.Random(0)
+        return [
+            Point(
+                label=rng.choice(["true", "false"]),
+                values={
+                    "x": rng.choice([0.0, 1.0, rng.uniform(-0.5, 1.5)]),
+                    "y": rng.choice([0.0, 1.0, rng.uniform(-0.5, 1.5)]),
+                    "timestep": rng.randint(0, 2),
+                },
+            )
+            for _ in range(n)
+        ]
+
+    def test_contains_points(self):
+        points = self._points(200)
+        for closed in [False, True]:
+            box = self._box((0, 1), (0, 1), closed=closed)
+            assert box._contains_points(points) == [
+                box.contains_point(pt) for pt in points
+            ]
+        assert box._contains_points([]) == []
+
+    def test_copy(self):
+        box = self._box((0, 1), (0, 1))
+        box.points = self._points(10)
+        copied = box._copy()
+        copied.bounds["x"].ub = 0.5
+        copied.points.pop()
+        assert box.bounds["x"].ub == 1
+        assert len(box.points) == 10
+        assert copied.points[0] is box.points[0]
+
+    def test_split(self):
+        box = self._box((0, 1), (0, 1))
+        box.points = self._points(50)
+        parameters = [
+            ModelParameter(
+                name="x", interval=Interval(lb=0, ub=1), label="all"
+            ),
+            ModelParameter(
+                name="y", interval=Interval(lb=0, ub=1), label="all"
+            ),
+        ]
+        b1, b2 = box.split(parameters=parameters)
+        assert len(b1.points) + len(b2.points) == len(
+            [pt for pt in box.points if box.contains_point(pt)]
+        )
+        assert all(b1.contains_point(pt) for pt in b1.points)
+        assert all(b2.contains_point(pt) for pt in b2.points)
+
+    def test_priority(self):
+        parameters = [
+            ModelParameter(
+                name="x", interval=Interval(lb=0, ub=1), label="all"
+            ),
+            ModelParameter(
+                name="y", interval=Interval(lb=0, ub=1), label="all"
+            ),
+        ]
+        large = self._box((0, 1), (0, 1))
+        small, _ = large.split(parameters=parameters)
+        # Larger boxes are expanded first
+        assert large < small
+        assert not small < large
+
+        # Boxes with more true points are expanded first
+        small.points = [Point(label="true", values={"x": 0, "y": 0})]
+        assert small < large
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import random
+import unittest
+
+from funman.representation import (
+    Box,
+    EncodingSchedule,
+    Interval,
+    ParameterSpace,
+    Point,
+)
+from funman.representation.box_compactor import BoxCompactor
+
+
+class TestBoxCompactor(unittest.TestCase):
+    def _box(self, x, y, schedule=None):
+        box = Box(
+            label="true",
+            bounds={
+                "x": Interval(lb=x[0], ub=x[1]),
+                "y": Interval(lb=y[0], ub=y[1]),
+                "timestep": Interval(lb=2, ub=2, closed_upper_bound=True),
+            },
+            schedule=schedule,
+        )
+        box.points = [
+            Point(
+                label="true",
+                values={"x": x[0], "y": y[0], "timestep": 2},
+            )
+        ]
+        return box
+
+    def _grid(self, x_range, y_range):
+        return [
+            self._box((i, i + 1), (j, j + 1)) for i in x_range for j in y_range
+        ]
+
+    def test_compact_grid(self):
+        boxes = self._grid(range(20), range(20))
+        compactor = BoxCompactor()
+        for box in boxes:
+            compactor.add(box)
+
+        assert len(compactor) == 1
+        compacted = compactor.boxes()[0]
+        assert compacted.bounds["x"] == Interval(lb=0, ub=20)
+        assert compacted.bounds["y"] == Interval(lb=0, ub=20)
+        assert compacted.bounds["timestep"].closed_upper_bound
+        assert len(compacted.points) == len(boxes)
+        # The input boxes are not modified
+        assert all(b.bounds["x"].ub - b.bounds["x"].lb == 1 for b in boxes)
+
+        # Merges are greedy, so some orders leave more than one box
+        random.Random(0).shuffle(boxes)
+        compactor = BoxCompactor()
+        for box in boxes:
+            compactor.add(box)
+        compacted = compactor.boxes()
+        assert len(compacted) < len(boxes) / 4
+        assert sum(b.volume() for b in compacted) == 400
+        assert sum(len(b.points) for b in compacted) == len(boxes)
+
+    def test_no_merge(self):
+        compactor = BoxCompactor()
+        # L-shape
+        compactor.add(self._box((0, 1), (0, 1)))
+        compactor.add(self._box((1, 2), (0, 1)))
+        compactor.add(self._box((0, 1), (1, 2)))
+        assert len(compactor) == 2
+
+        # Different schedules
+        schedule = EncodingSchedule(timepoints=[0, 1, 2])
+        compactor.add(self._box((2, 3), (0, 1), schedule=schedule))
+        assert len(compactor) == 3
+
+    def test_incremental(self):
+        ps = ParameterSpace(num_dimensions=2)
+        ps.true_boxes = self._grid(range(5), range(5))
+        ps._compact()
+        assert len(ps.true_boxes) == 1
+
+        ps.true_boxes += self._grid(range(5, 10), range(5))
+        assert ps.max_true_volume()[0] == 50.0
+        assert len(ps.true_boxes) == 1
+        assert len(ps.true_points()) == 50
+
+
+if __name__ == "__main__":
+    unittest.main()
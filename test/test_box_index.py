@@ -0,0 +1,82 @@
+import copy
+import random
+import unittest
+
+from funman.representation import Box, Interval, ParameterSpace, Point
+from funman.representation.box_index import BoxIndex
+
+
+class TestBoxIndex(unittest.TestCase):
+    def _box(self, x, y, label="true"):
+        return Box(
+            label=label,
+            bounds={
+                "x": Interval(lb=x[0], ub=x[1]),
+                "y": Interval(lb=y[0], ub=y[1]),
+            },
+        )
+
+    def _grid(self, n, label="true"):
+        return [
+            self._box((i, i + 1), (j, j + 1), label=label)
+            for i in range(n)
+            for j in range(n)
+        ]
+
+    def test_queries(self):
+        rng = random.Random(0)
+        boxes = self._grid(12)
+        index = BoxIndex(["x", "y"], max_entries=4)
+        for box in boxes:
+            index.insert(box)
+        assert len(index) == len(boxes)
+
+        for box in rng.sample(boxes, 40):
+            assert index.remove(box)
+            boxes.remove(box)
+        assert not index.remove(self._box((0, 1), (0, 1)))
+        assert {id(b) for b in index.boxes()} == {id(b) for b in boxes}
+
+        for _ in range(50):
+            x, y = rng.uniform(-1, 13), rng.uniform(-1, 13)
+            query = self._box((x, x + 2.5), (y, y + 0.5))
+            expected = {id(b) for b in boxes if b.intersects(query)}
+            found = {id(b) for b in index.overlapping(query)}
+            assert expected.issubset(found)
+
+            point = Point(values={"x": x, "y": y})
+            expected = {id(b) for b in boxes if b.contains_point(point)}
+            found = {id(b) for b in index.containing(point)}
+            assert expected.issubset(found)
+
+        copied = copy.deepcopy(index)
+        assert len(copied) == len(index)
+        assert all(b in copied for b in copied.boxes())
+
+    def test_parameter_space(self):
+        ps = ParameterSpace(num_dimensions=2)
+        ps.true_boxes = self._grid(4)
+        ps.false_boxes = [self._box((4, 5), (0, 4), label="false")]
+        assert ps.consistent()
+
+        point = Point(values={"x": 4.5, "y": 2.0})
+        assert ps.boxes_containing(point) == [ps.false_boxes[0]]
+
+        # The index picks up appended boxes
+        ps.true_boxes.append(self._box((1.5, 2.5), (1.5, 2.5)))
+        query = ps.true_boxes[-1]
+        assert len(ps.intersecting_boxes(query, label="true")) == 5
+        ps.true_boxes.pop()
+
+        adjacent = ps.adjacent_boxes(ps.false_boxes[0], label="true")
+        assert len(adjacent) == 4
+
+        ps._compact()
+        assert len(ps.true_boxes) == 1
+        assert ps.true_boxes[0].bounds["x"] == Interval(lb=0, ub=4)
+        assert ps.true_boxes[0].bounds["y"] == Interval(lb=0, ub=4)
+        assert ps.consistent()
+
+
+if __name__ == "__main__":
+    unittest.main()
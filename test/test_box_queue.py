@@ -0,0 +1,54 @@
+import multiprocessing as mp
+import unittest
+from queue import Empty
+
+from funman.representation import Box, Interval
+from funman.search.box_search import WorkStealingBoxQueue
+
+
+class TestWorkStealingBoxQueue(unittest.TestCase):
+    def _queues(self, count):
+        inboxes = [mp.Queue() for _ in range(count)]
+        hungry = mp.Array("b", count)
+        outstanding = mp.Value("i", 0)
+        return [
+            WorkStealingBoxQueue(i, inboxes, hungry, outstanding)
+            for i in range(count)
+        ]
+
+    def _box(self, lb, ub):
+        return Box(
+            bounds={
+                "x": Interval(lb=lb, ub=ub),
+                "timestep": Interval(lb=0, ub=0, closed_upper_bound=True),
+            }
+        )
+
+    def test_steal_from_peer(self):
+        q0, q1 = self._queues(2)
+        q1._set_hungry(True)
+        q0.put(self._box(0, 1))
+        q0.put(self._box(1, 2))
+
+        # q0 donated one box to the hungry q1, and kept the other
+        assert q0.qsize() == 1
+        assert q1.get(timeout=1) is not None
+        assert q0.get(timeout=1) is not None
+        assert not q0.finished()
+
+        q0.task_done()
+        q1.task_done()
+        assert q0.finished() and q1.finished()
+
+    def test_no_donation_when_not_hungry(self):
+        q0, q1 = self._queues(2)
+        q0.put(self._box(0, 1))
+        q0.put(self._box(1, 2))
+        assert q0.qsize() == 2
+        with self.assertRaises(Empty):
+            q1.get(timeout=0.01)
+        assert not q1.finished()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import multiprocessing as mp
+import os
+import threading
+import unittest
+
+from funman import Funman
+from funman.config import FUNMANConfig
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.representation import Box
+from funman.search.box_search import BoxSearch, BoxSearchEpisodeMP
+from funman.server.query import (
+    FunmanResults,
+    FunmanWorkRequest,
+    FunmanWorkUnit,
+)
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_DIR = os.path.join(RESOURCES, "amr", "petrinet", "amr-examples")
+
+
+class FailingBoxSearch(BoxSearch):
+    """
+    BoxSearch whose first expander to claim a box fails while it holds it.
+    """
+
+    def __init__(self):
+        self._failures = mp.get_context("fork").Value("i", 1)
+
+    def _put_result(self, rval, episode, result):
+        if isinstance(episode, BoxSearchEpisodeMP) and isinstance(result, Box):
+            with self._failures.get_lock():
+                fail = self._failures.value > 0
+                self._failures.value -= 1
+            if fail:
+                raise RuntimeError("Injected expander failure")
+        super()._put_result(rval, episode, result)
+
+
+class TestConcurrentSchedules(unittest.TestCase):
+    def _scenario(self, number_of_processes, num_schedules=2):
+        with open(os.path.join(SIR_DIR, "sir.json"), "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        with open(os.path.join(SIR_DIR, "sir_request1.json"), "r") as f:
+            request = json.load(f)
+        request["config"].update(
+            {
+                "solver": "z3",
+                "tolerance": 0.1,
+                "point_based_evaluation": True,
+                "number_of_processes": number_of_processes,
+            }
+        )
+        request["query"]["queries"][0]["ub"] = 1.5
+        request["parameters"][0]["interval"] = {"lb": 1e-4, "ub": 1e-3}
+        # Schedules with step sizes 1 and 2
+        request["structure_parameters"][1]["interval"] = {
+            "lb": 1,
+            "ub": num_schedules,
+        }
+        request = FunmanWorkRequest.model_validate(request)
+        scenario = FunmanWorkUnit(
+            id="test", model=model, request=request
+        ).to_scenario()
+        return model, request, scenario
+
+    def _solve(self, number_of_processes):
+        model, request, scenario = self._scenario(number_of_processes)
+        results = FunmanResults(
+            id="test", model=model, request=request, parameter_space=None
+        )
+        result = Funman().solve(
+            scenario,
+            config=request.config,
+            resultsCallback=lambda ps: results.update_parameter_space(
+                scenario, ps
+            ),
+        )
+        return result.parameter_space, results.progress.progress
+
+    def test_group_sizes(self):
+        search = BoxSearch()
+        sizes = search._group_sizes(
+            FUNMANConfig(solver="z3", number_of_processes=5), 2
+        )
+        assert sizes == [3, 2]
+        sizes = search._group_sizes(
+            FUNMANConfig(solver="z3", number_of_processes=2), 3
+        )
+        assert sizes == [1, 1, 1]
+
+    def test_concurrent_schedules(self):
+        ps, progress = self._solve(1)
+        mp_ps, mp_progress = self._solve(2)
+
+        # Each schedule labels the whole space once
+        assert 0.5 < progress <= 1.0
+        assert abs(progress - mp_progress) < 1e-9
+        for label in ["true", "false"]:
+            boxes = {
+                (b.schedule.timepoints[1], str(b.bounds))
+                for b in ps.boxes()
+                if b.label == label
+            }
+            mp_boxes = {
+                (b.schedule.timepoints[1], str(b.bounds))
+                for b in mp_ps.boxes()
+                if b.label == label
+            }
+            assert boxes == mp_boxes
+        assert {b.schedule.timepoints[1] for b in mp_ps.true_boxes} == {1, 2}
+
+    def test_expander_failure(self):
+        # The other expanders of the schedule halt instead of waiting for
+        # the boxes of the failed expander
+        _, request, scenario = self._scenario(3, num_schedules=1)
+        scenario.initialize(request.config)
+        search = threading.Thread(
+            target=FailingBoxSearch().search,
+            args=(scenario, request.config),
+            daemon=True,
+        )
+        search.start()
+        search.join(timeout=120)
+        assert not search.is_alive()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import unittest
+from functools import partial
+from queue import Queue
+
+from funman import LABEL_FALSE
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.representation import Box, Interval
+from funman.representation.explanation import PropagationExplanation
+from funman.search.box_search import BoxSearch, BoxSearchEpisode
+from funman.search.contractor import BoxContractor
+from funman.server.query import FunmanWorkRequest, FunmanWorkUnit
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_DIR = os.path.join(RESOURCES, "amr", "petrinet", "amr-examples")
+
+
+class TestBoxContractor(unittest.TestCase):
+    def _episode(self, ub):
+        with open(os.path.join(SIR_DIR, "sir.json"), "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        with open(os.path.join(SIR_DIR, "sir_request1.json"), "r") as f:
+            request = json.load(f)
+        request["config"].update({"solver": "z3", "contract_boxes": True})
+        request["query"]["queries"][0]["ub"] = ub
+        request["parameters"][0]["interval"] = {"lb": 1e-4, "ub": 1e-3}
+        request = FunmanWorkRequest.model_validate(request)
+        scenario = FunmanWorkUnit(
+            id="test", model=model, request=request
+        ).to_scenario()
+        scenario.initialize(request.config)
+        schedule = scenario._smt_encoder._timed_model_elements[
+            "schedules"
+        ].schedules[0]
+        self.search = BoxSearch()
+        self.options = self.search._encoding_options(request.config, schedule)
+        return BoxSearchEpisode(
+            config=request.config, problem=scenario, schedule=schedule
+        )
+
+    def _box(self, episode, step):
+        bounds = {
+            p.name: Interval(
+                lb=p.interval.lb,
+                ub=p.interval.ub,
+                closed_upper_bound=(p.interval.lb == p.interval.ub),
+            )
+            for p in episode.problem.model_parameters()
+        }
+        bounds["timestep"] = Interval(lb=step, ub=5, closed_upper_bound=True)
+        return Box(bounds=bounds, schedule=episode.schedule)
+
+    def test_contract(self):
+        episode = self._episode(ub=1.5)
+        contractor = BoxContractor(problem=episode.problem)
+        box = self._box(episode, 1)
+        bounds = contractor.contract(
+            box,
+            partial(self.search._encode_layer, episode, self.options, box),
+        )
+        # I_1 = 1 + 1000 * beta - gamma <= 1.5, so beta <= (0.5 + 0.18) / 1000
+        assert abs(bounds["beta"][1] - 6.8e-4) < 1e-9
+        assert abs(bounds["beta"][0] - 1e-4) < 1e-12
+        assert abs(bounds["gamma"][1] - 0.18) < 1e-12
+
+        # I_0 = 1 > 0.5
+        episode = self._episode(ub=0.5)
+        contractor = BoxContractor(problem=episode.problem)
+        box = self._box(episode, 0)
+        assert (
+            contractor.contract(
+                box,
+                partial(self.search._encode_layer, episode, self.options, box),
+            )
+            is None
+        )
+
+    def test_label_cut_boxes(self):
+        episode = self._episode(ub=1.5)
+        rval = Queue()
+        box = self.search._contract(
+            self._box(episode, 1), episode, self.options, rval
+        )
+        assert box.bounds["beta"].ub < 6.9e-4
+        assert len(episode._false_boxes) == 1
+        cut_box = episode._false_boxes[0]
+        assert cut_box.label == LABEL_FALSE
+        assert isinstance(cut_box.explanation, PropagationExplanation)
+        assert cut_box.bounds["beta"].lb == box.bounds["beta"].ub
+        assert cut_box.bounds["beta"].ub == 1e-3
+        assert rval.qsize() == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
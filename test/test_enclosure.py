@@ -0,0 +1,137 @@
+import json
+import os
+import unittest
+
+import numpy as np
+
+from funman import LABEL_FALSE, LABEL_TRUE
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.representation import Box, Interval
+from funman.search.enclosure import IntervalArray, IntervalEnclosure
+from funman.search.simulate import BatchSimulator
+from funman.server.query import FunmanWorkRequest, FunmanWorkUnit
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_DIR = os.path.join(RESOURCES, "amr", "petrinet", "amr-examples")
+
+
+def down(x):
+    return np.nextafter(x, -np.inf)
+
+
+def up(x):
+    return np.nextafter(x, np.inf)
+
+
+class TestIntervalEnclosure(unittest.TestCase):
+    def _enclosure(self, ub=200.0, at_end=False):
+        with open(os.path.join(SIR_DIR, "sir.json"), "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        with open(os.path.join(SIR_DIR, "sir_request1.json"), "r") as f:
+            request = json.load(f)
+        request["config"]["solver"] = "z3"
+        request["query"]["queries"][0].update({"ub": ub, "at_end": at_end})
+        self.request = FunmanWorkRequest.model_validate(request)
+        self.scenario = FunmanWorkUnit(
+            id="test", model=model, request=self.request
+        ).to_scenario()
+        self.scenario.initialize(self.request.config)
+        self.schedule = self.scenario._smt_encoder._timed_model_elements[
+            "schedules"
+        ].schedules[0]
+        return IntervalEnclosure(problem=self.scenario, schedule=self.schedule)
+
+    def _box(self, step=0):
+        bounds = {
+            p.name: Interval(
+                lb=p.interval.lb,
+                ub=p.interval.ub,
+                closed_upper_bound=(p.interval.lb == p.interval.ub),
+            )
+            for p in self.scenario.model_parameters()
+        }
+        bounds["timestep"] = Interval(
+            lb=step,
+            ub=len(self.schedule.timepoints) - 1,
+            closed_upper_bound=True,
+        )
+        return Box(bounds=bounds)
+
+    def test_interval_arithmetic(self):
+        # The bounds of inexact results are rounded outward
+        x = IntervalArray([-1.0, 2.0], [3.0, 4.0])
+        y = IntervalArray([-2.0, -1.0], [1.0, 1.0])
+        product = x * y
+        assert np.array_equal(product.lo, [down(-6.0), -4.0])
+        assert np.array_equal(product.hi, [3.0, 4.0])
+        square = x**2
+        assert np.array_equal(square.lo, [0.0, down(4.0)])
+        assert np.array_equal(square.hi, up([9.0, 16.0]))
+        quotient = 1 / x
+        assert np.array_equal(quotient.lo, [-np.inf, down(0.25)])
+        assert np.array_equal(quotient.hi, [np.inf, up(0.5)])
+        difference = 1.0 - x
+        assert np.array_equal(difference.lo, down([-2.0, -3.0]))
+        assert np.array_equal(difference.hi, up([2.0, -1.0]))
+        # Sums with 0 and products with 0 or 1 are exact
+        assert np.array_equal((x * 0.0).lo, [0.0, 0.0])
+        assert np.array_equal((x * 1.0).lo, [-1.0, 2.0])
+        assert np.array_equal((x + 0.0).hi, [3.0, 4.0])
+
+    def test_enclose_simulation(self):
+        enclosure = self._enclosure()
+        enclosure._compile(self.request.config)
+        names = self.scenario.model._parameter_names()
+        box = self._box()
+        lb = np.array([[float(box.bounds[p].lb) for p in names]])
+        ub = np.array([[float(box.bounds[p].ub) for p in names]])
+        steps = len(self.schedule.timepoints) - 1
+        lo, hi = enclosure.enclose(lb, ub, steps)
+
+        parameters = lb + np.random.default_rng(0).random((32, len(names))) * (
+            ub - lb
+        )
+        trajectories = BatchSimulator(
+            model=self.scenario.model,
+            init={"S": "S0", "I": "I0", "R": "R0"},
+            parameters=parameters,
+            tvect=self.schedule.timepoints,
+            discrete=True,
+        ).sim()
+        assert np.all(trajectories >= lo - 1e-9)
+        assert np.all(trajectories <= hi + 1e-9)
+
+        # The enclosure of a point is its trajectory
+        point_lo, point_hi = enclosure.enclose(
+            parameters[:1], parameters[:1], steps
+        )
+        assert np.allclose(point_lo[0], trajectories[0])
+        assert np.allclose(point_hi[0], trajectories[0])
+
+    def test_label(self):
+        enclosure = self._enclosure(ub=200.0)
+        box = self._box(step=3)
+        assert enclosure.label(box, self.request.config) == LABEL_TRUE
+        witness = enclosure.witness(box, LABEL_TRUE)
+        assert witness.timestep() == 3
+        assert box.contains_point(witness)
+
+        # I0 = 1 violates the query at the first step
+        enclosure = self._enclosure(ub=0.5)
+        box = self._box()
+        assert enclosure.label(box, self.request.config) == LABEL_FALSE
+
+        # The encoding checks an at_end query at every step, and I0 = 1
+        # violates it at the first step
+        enclosure = self._enclosure(ub=0.85, at_end=True)
+        box = self._box(step=1)
+        assert enclosure.label(box, self.request.config) == LABEL_FALSE
+
+
+if __name__ == "__main__":
+    unittest.main()
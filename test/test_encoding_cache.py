@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.representation.constraint import ModelConstraint
+from funman.server.query import FunmanWorkRequest, FunmanWorkUnit
+from funman.translate.petrinet import PetrinetEncoder
+from funman.translate.translate import EncodingOptions
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_MODEL = os.path.join(
+    RESOURCES, "amr", "petrinet", "amr-examples", "sir.json"
+)
+
+
+class TestEncodingCache(unittest.TestCase):
+    def _encode(self, cache_dir, num_steps=3):
+        with open(SIR_MODEL, "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        request = FunmanWorkRequest.model_validate(
+            {
+                "structure_parameters": [
+                    {
+                        "name": "schedules",
+                        "schedules": [
+                            {"timepoints": list(range(num_steps + 1))}
+                        ],
+                    }
+                ],
+                "config": {"solver": "z3", "encoding_cache": cache_dir},
+            }
+        )
+        scenario = FunmanWorkUnit(
+            id="test", model=model, request=request
+        ).to_scenario()
+        scenario.initialize(request.config)
+        schedule = scenario._smt_encoder._timed_model_elements[
+            "schedules"
+        ].schedules[0]
+        options = EncodingOptions(schedule=schedule)
+        model_constraint = next(
+            c for c in scenario.constraints if isinstance(c, ModelConstraint)
+        )
+        return [
+            scenario._encodings[schedule].construct_encoding(
+                scenario, model_constraint, options, layers=[i]
+            )
+            for i in range(num_steps + 1)
+        ]
+
+    def test_reuse_cached_steps(self):
+        uncached = self._encode(None)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = self._encode(cache_dir)
+            entries = sorted(Path(cache_dir).glob("*/*.smt2"))
+            assert len(entries) == 3
+
+            with patch.object(
+                PetrinetEncoder,
+                "_encode_next_step",
+                side_effect=AssertionError("step was not cached"),
+            ):
+                second = self._encode(cache_dir)
+            assert sorted(Path(cache_dir).glob("*/*.smt2")) == entries
+
+        assert first == uncached
+        assert second == uncached
+
+
+if __name__ == "__main__":
+    unittest.main()
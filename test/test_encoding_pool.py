@@ -0,0 +1,92 @@
+import json
+import os
+import unittest
+
+from pysmt.shortcuts import (
+    GE,
+    REAL,
+    TRUE,
+    And,
+    Bool,
+    Iff,
+    Int,
+    Plus,
+    Real,
+    Symbol,
+    Times,
+    is_valid,
+)
+
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.server.query import FunmanWorkRequest, FunmanWorkUnit
+from funman.translate.encoding_pool import (
+    deserialize_formulas,
+    serialize_formulas,
+)
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_DIR = os.path.join(RESOURCES, "amr", "petrinet", "amr-examples")
+
+
+class TestEncodingPool(unittest.TestCase):
+    def _scenario(self, encoding_processes):
+        with open(os.path.join(SIR_DIR, "sir.json"), "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        with open(os.path.join(SIR_DIR, "sir_request1.json"), "r") as f:
+            request = json.load(f)
+        request["config"]["solver"] = "z3"
+        request["config"]["encoding_processes"] = encoding_processes
+        request = FunmanWorkRequest.model_validate(request)
+        scenario = FunmanWorkUnit(
+            id="test", model=model, request=request
+        ).to_scenario()
+        scenario.initialize(request.config)
+        return scenario
+
+    def test_serialize_formulas(self):
+        x, y = Symbol("x", REAL), Symbol("y", REAL)
+        shared = Times(x, Real(0.5))
+        formulas = [
+            And(GE(Plus(shared, y), Real(1)), Bool(True)),
+            Plus(shared, Real(2)),
+            GE(Int(1), Int(0)),
+            TRUE(),
+        ]
+        data = serialize_formulas(formulas)
+        # Shared subformulas are serialized once
+        assert len(data[0]) == len(
+            {n for f in formulas for n in _subformulas(f)}
+        )
+        assert deserialize_formulas(data) == formulas
+
+    def test_encode_transitions(self):
+        scenario = self._scenario(1)
+        sequential = scenario._smt_encoder
+        constraints = sequential._timed_model_elements["time_step_constraints"]
+        assert all(c is None for c in constraints.values())
+
+        parallel = self._scenario(2)._smt_encoder
+        encoded = parallel._timed_model_elements["time_step_constraints"]
+        assert len(encoded) > 1
+        for (step, stepsize), c in encoded.items():
+            expected, _ = sequential._encode_next_step(
+                scenario, step, step + stepsize, substitutions={}
+            )
+            # The simplifier may order the args of commutative operators by
+            # node id, which differs between the processes
+            assert is_valid(Iff(c, expected), solver_name="z3")
+
+
+def _subformulas(formula):
+    yield formula
+    for a in formula.args():
+        yield from _subformulas(a)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from funman import LABEL_FALSE, LABEL_TRUE
+from funman.representation import Box, Interval
+from funman.representation.explanation import BoxExplanation
+from funman.search.box_search import LemmaStore
+
+
+def _box(beta, gamma, step):
+    return Box(
+        bounds={
+            "beta": Interval(lb=beta[0], ub=beta[1]),
+            "gamma": Interval(lb=gamma[0], ub=gamma[1]),
+            "timestep": Interval(lb=step, ub=5, closed_upper_bound=True),
+        }
+    )
+
+
+class TestLemmaStore(unittest.TestCase):
+    def test_sub_boxes(self):
+        lemmas = LemmaStore(parameters=["beta", "gamma"])
+        explanation = BoxExplanation()
+        lemmas.add(LABEL_TRUE, _box((0.0, 1.0), (0.0, 1.0), 2), explanation)
+
+        # The children of a split are in the region at the same step
+        for beta in [(0.0, 0.5), (0.5, 1.0)]:
+            child = _box(beta, (0.0, 1.0), 2)
+            assert lemmas.explanation(LABEL_TRUE, child) is explanation
+            assert lemmas.explanation(LABEL_FALSE, child) is None
+        assert (
+            lemmas.explanation(LABEL_TRUE, _box((0.0, 0.5), (0.0, 1.0), 3))
+            is None
+        )
+        assert (
+            lemmas.explanation(LABEL_TRUE, _box((0.5, 1.5), (0.0, 1.0), 2))
+            is None
+        )
+
+    def test_subsumed_lemmas(self):
+        lemmas = LemmaStore(parameters=["beta", "gamma"])
+        lemmas.add(
+            LABEL_FALSE, _box((0.0, 0.5), (0.0, 1.0), 0), BoxExplanation()
+        )
+        lemmas.add(
+            LABEL_FALSE, _box((0.6, 0.7), (0.0, 1.0), 0), BoxExplanation()
+        )
+        explanation = BoxExplanation()
+        lemmas.add(LABEL_FALSE, _box((0.0, 1.0), (0.0, 1.0), 0), explanation)
+        assert len(lemmas._lemmas[(LABEL_FALSE, 0)]) == 1
+        assert (
+            lemmas.explanation(LABEL_FALSE, _box((0.6, 0.7), (0, 1), 0))
+            is explanation
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
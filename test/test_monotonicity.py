@@ -0,0 +1,117 @@
+import json
+import os
+import unittest
+from fractions import Fraction
+
+import numpy as np
+
+from funman import LABEL_FALSE
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.representation import Box, Interval
+from funman.search.enclosure import IntervalArray, IntervalEnclosure
+from funman.search.monotonicity import MonotonicityAnalysis, _matmul
+from funman.server.query import FunmanWorkRequest, FunmanWorkUnit
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_DIR = os.path.join(RESOURCES, "amr", "petrinet", "amr-examples")
+
+
+class TestMonotonicityAnalysis(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(SIR_DIR, "sir.json"), "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        with open(os.path.join(SIR_DIR, "sir_request1.json"), "r") as f:
+            request = json.load(f)
+        request["config"]["solver"] = "z3"
+        request["query"]["queries"][0]["ub"] = 10.0
+        request["parameters"][0]["interval"] = {"lb": 1e-4, "ub": 1e-3}
+        self.request = FunmanWorkRequest.model_validate(request)
+        self.scenario = FunmanWorkUnit(
+            id="test", model=model, request=self.request
+        ).to_scenario()
+        self.scenario.initialize(self.request.config)
+        self.schedule = self.scenario._smt_encoder._timed_model_elements[
+            "schedules"
+        ].schedules[0]
+        self.enclosure = IntervalEnclosure(
+            problem=self.scenario, schedule=self.schedule
+        )
+        self.analysis = MonotonicityAnalysis(enclosure=self.enclosure)
+
+    def _box(self, beta, step):
+        bounds = {
+            p.name: Interval(
+                lb=p.interval.lb,
+                ub=p.interval.ub,
+                closed_upper_bound=(p.interval.lb == p.interval.ub),
+            )
+            for p in self.scenario.model_parameters()
+        }
+        bounds["beta"] = Interval(lb=beta[0], ub=beta[1])
+        bounds["timestep"] = Interval(
+            lb=step, ub=step, closed_upper_bound=True
+        )
+        return Box(bounds=bounds)
+
+    def test_narrow(self):
+        self.enclosure._compile(self.request.config)
+        self.analysis._compile(self.request.config)
+        names = self.scenario.model._parameter_names()
+        box = self._box((1e-4, 1e-3), 4)
+        lb = np.array([[float(box.bounds[p].lb) for p in names]])
+        ub = np.array([[float(box.bounds[p].ub) for p in names]])
+        lo, hi = self.enclosure.enclose(lb, ub, 4)
+
+        # I grows with beta and shrinks with gamma
+        d_lo, d_hi = self.analysis.sensitivity(lb, ub, lo, hi)
+        beta, gamma = names.index("beta"), names.index("gamma")
+        assert np.all(d_lo[0, 1:, 1, beta] > 0)
+        assert np.all(d_hi[0, 1:, 1, gamma] < 0)
+
+        # The bounds of I are the values of I at two corners of the box
+        narrow_lo, narrow_hi = self.analysis.narrow(lb, ub, lo, hi)
+        assert np.all(narrow_lo >= lo) and np.all(narrow_hi <= hi)
+        least = lb.copy()
+        least[0, gamma] = ub[0, gamma]
+        greatest = ub.copy()
+        greatest[0, gamma] = lb[0, gamma]
+        corners, _ = self.enclosure.enclose(
+            np.vstack([least, greatest]), np.vstack([least, greatest]), 4
+        )
+        assert np.allclose(narrow_lo[0, :, 1], corners[0, :, 1])
+        assert np.allclose(narrow_hi[0, :, 1], corners[1, :, 1])
+
+        samples = np.tile(lb, (64, 1))
+        samples[:, beta] = np.random.default_rng(0).uniform(1e-4, 1e-3, 64)
+        samples[:, gamma] = np.random.default_rng(1).uniform(0.1, 0.18, 64)
+        trajectories, _ = self.enclosure.enclose(samples, samples, 4)
+        assert np.all(trajectories >= narrow_lo - 1e-9)
+        assert np.all(trajectories <= narrow_hi + 1e-9)
+
+    def test_matmul(self):
+        a = np.array([[[0.1, 0.2]]])
+        b = np.array([[[0.3], [0.7]]])
+        product = _matmul(IntervalArray(a, a), IntervalArray(b, b))
+        # The bounds contain the exact product of the floats
+        exact = Fraction(0.1) * Fraction(0.3) + Fraction(0.2) * Fraction(0.7)
+        assert Fraction(float(product.lo[0, 0, 0])) < exact
+        assert Fraction(float(product.hi[0, 0, 0])) > exact
+
+    def test_label(self):
+        # The enclosure is too wide to tell that I_5 > 10 for every point
+        box = self._box((8e-4, 1e-3), 5)
+        assert self.enclosure.label(box, self.request.config) is None
+        assert self.analysis.label(box, self.request.config) == LABEL_FALSE
+
+        # The box has true and false points
+        box = self._box((1e-4, 1e-3), 5)
+        assert self.analysis.label(box, self.request.config) is None
+
+
+if __name__ == "__main__":
+    unittest.main()
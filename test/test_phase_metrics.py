@@ -0,0 +1,98 @@
+import json
+import os
+import time
+import unittest
+
+from funman import Funman
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.server.query import (
+    FunmanResults,
+    FunmanWorkRequest,
+    FunmanWorkUnit,
+)
+from funman.utils.metrics import (
+    BOX_ENCODING,
+    MODEL_ENCODING,
+    PROGRESS_CALLBACK,
+    RESULT_HANDLER,
+    TRUE_QUERY,
+    PhaseMetrics,
+)
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_DIR = os.path.join(RESOURCES, "amr", "petrinet", "amr-examples")
+
+
+class TestPhaseMetrics(unittest.TestCase):
+    def test_nested_phases(self):
+        metrics = PhaseMetrics()
+        with metrics.phase("outer"):
+            time.sleep(0.01)
+            for _ in range(2):
+                with metrics.phase("inner"):
+                    time.sleep(0.02)
+        outer, inner = metrics.phases["outer"], metrics.phases["inner"]
+        assert (outer.count, inner.count) == (1, 2)
+        # The time of the outer phase excludes the inner phases
+        assert 0.01 <= outer.total_time < 0.03
+        assert inner.total_time >= 0.04
+        assert inner.max_time <= inner.total_time
+
+        drained = metrics.drain()
+        assert metrics.phases == {}
+        metrics.merge(drained.phases)
+        metrics.merge(drained.phases)
+        assert metrics.phases["inner"].count == 4
+
+    def test_search_phases(self):
+        with open(os.path.join(SIR_DIR, "sir.json"), "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        with open(os.path.join(SIR_DIR, "sir_request1.json"), "r") as f:
+            request = json.load(f)
+        request["config"].update(
+            {
+                "solver": "z3",
+                "point_based_evaluation": True,
+                "tolerance": 0.1,
+            }
+        )
+        request = FunmanWorkRequest.model_validate(request)
+        scenario = FunmanWorkUnit(
+            id="test", model=model, request=request
+        ).to_scenario()
+        results = FunmanResults(id="test", model=model, request=request)
+        results.start()
+        result = Funman().solve(
+            scenario,
+            config=request.config,
+            resultsCallback=lambda ps: results.update_parameter_space(
+                scenario, ps
+            ),
+        )
+        results.finalize_result(scenario, result)
+
+        phases = results.timing.phases
+        for phase in [
+            MODEL_ENCODING,
+            BOX_ENCODING,
+            TRUE_QUERY,
+            RESULT_HANDLER,
+            PROGRESS_CALLBACK,
+        ]:
+            assert phases[phase].count > 0, phase
+        encoding_time = (
+            phases[MODEL_ENCODING].total_time + phases[BOX_ENCODING].total_time
+        )
+        assert (
+            abs(results.timing.encoding_time.total_seconds() - encoding_time)
+            < 1e-5
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from funman import LABEL_FALSE, LABEL_TRUE
+from funman.representation import Box, Interval, Point
+from funman.search.box_search import PointStore
+
+
+def _box(beta, gamma, step):
+    return Box(
+        bounds={
+            "beta": Interval(lb=beta[0], ub=beta[1]),
+            "gamma": Interval(lb=gamma[0], ub=gamma[1]),
+            "timestep": Interval(lb=step, ub=5, closed_upper_bound=True),
+        }
+    )
+
+
+def _point(beta, gamma, step, label):
+    return Point(
+        values={"beta": beta, "gamma": gamma, "timestep": step}, label=label
+    )
+
+
+class TestPointStore(unittest.TestCase):
+    def test_find(self):
+        points = PointStore(parameters=["beta", "gamma"])
+        true_point = _point(0.25, 0.5, 2, LABEL_TRUE)
+        points.add(true_point)
+        points.add(_point(0.75, 0.5, 2, LABEL_FALSE))
+
+        assert points.find(LABEL_TRUE, _box((0.0, 0.5), (0, 1), 2)) is (
+            true_point
+        )
+        assert points.find(LABEL_FALSE, _box((0.0, 0.5), (0, 1), 2)) is None
+        assert points.find(LABEL_TRUE, _box((0.0, 0.5), (0, 1), 3)) is None
+        # The upper bounds of the box are open
+        assert points.find(LABEL_TRUE, _box((0.0, 0.25), (0, 1), 2)) is None
+        assert points.find(LABEL_TRUE, _box((0.25, 0.5), (0, 1), 2)) is (
+            true_point
+        )
+
+    def test_many_points(self):
+        points = PointStore(parameters=["beta", "gamma"])
+        for i in range(100):
+            points.add(_point(i / 100, 0.5, 0, LABEL_TRUE))
+        # Points without a value for each parameter are not stored
+        points.add(
+            Point(values={"beta": 0.5, "timestep": 0}, label=LABEL_TRUE)
+        )
+        found = points.find_all(LABEL_TRUE, _box((0.1, 0.2), (0, 1), 0))
+        assert [p.values["beta"] for p in found] == [
+            i / 100 for i in range(10, 20)
+        ]
+
+
+if __name__ == "__main__":
+    unittest.main()
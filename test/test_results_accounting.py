@@ -0,0 +1,130 @@
+import json
+import os
+import random
+import unittest
+
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.representation import Box, Interval, ParameterSpace
+from funman.server.query import (
+    FunmanResults,
+    FunmanWorkRequest,
+    FunmanWorkUnit,
+)
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_DIR = os.path.join(RESOURCES, "amr", "petrinet", "amr-examples")
+
+
+class TestResultsAccounting(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(SIR_DIR, "sir.json"), "r") as f:
+            self.model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        with open(os.path.join(SIR_DIR, "sir_request1.json"), "r") as f:
+            request = json.load(f)
+        request["config"]["solver"] = "z3"
+        self.request = FunmanWorkRequest.model_validate(request)
+        self.scenario = FunmanWorkUnit(
+            id="test", model=self.model, request=self.request
+        ).to_scenario()
+        self.scenario.initialize(self.request.config)
+        self.rng = random.Random(0)
+
+    def _box(self, label):
+        bounds = {}
+        for p in self.scenario.model_parameters():
+            lb = self.rng.uniform(p.interval.lb, p.interval.ub)
+            ub = self.rng.uniform(lb, p.interval.ub)
+            bounds[p.name] = Interval(
+                lb=lb,
+                ub=ub,
+                original_width=p.interval.width(),
+                closed_upper_bound=(lb == ub),
+            )
+        bounds["timestep"] = Interval(lb=1, ub=1, closed_upper_bound=True)
+        return Box(label=label, bounds=bounds)
+
+    def _check(self, results: FunmanResults, ps: ParameterSpace):
+        search_volume = self.scenario.search_space_volume(normalize=True)
+        expected = round(
+            float(ps.labeled_volume(scenario=self.scenario) / search_volume),
+            15,
+        )
+        assert abs(results.progress.progress - expected) < 1e-12
+        for p in ["beta", "gamma"]:
+            interval = results._accounting.outer_interval(p)
+            expected = ps.outer_interval(p)
+            assert (interval.lb, interval.ub) == (expected.lb, expected.ub)
+
+    def test_incremental_updates(self):
+        results = FunmanResults(
+            id="test", model=self.model, request=self.request
+        )
+        ps = ParameterSpace(num_dimensions=6)
+        results.update_parameter_space(self.scenario, ps)
+        assert results.progress.progress == 0.0
+
+        for _ in range(5):
+            ps.true_boxes.append(self._box("true"))
+            ps.false_boxes.append(self._box("false"))
+            results.update_parameter_space(self.scenario, ps)
+            self._check(results, ps)
+
+        # The contracted model is reused if the bounds do not change
+        contracted = results.contracted_model
+        ps.false_boxes.append(self._box("false"))
+        results.update_parameter_space(self.scenario, ps)
+        assert results.contracted_model is contracted
+
+        # Replacing the boxes recounts them
+        ps.true_boxes = ps.true_boxes[1:]
+        results.update_parameter_space(self.scenario, ps)
+        self._check(results, ps)
+
+    def test_delta(self):
+        ps = ParameterSpace(num_dimensions=6)
+        results = FunmanResults(
+            id="test",
+            model=self.model,
+            request=self.request,
+            parameter_space=ps,
+        )
+        ps.true_boxes.append(self._box("true"))
+        ps.false_boxes.append(self._box("false"))
+        delta = results.delta()
+        assert (len(delta.true_boxes), len(delta.false_boxes)) == (1, 1)
+        assert delta.cursor == 2
+
+        ps.true_boxes.append(self._box("true"))
+        delta = results.delta(since=delta.cursor, epoch=delta.epoch)
+        assert not delta.reset
+        assert delta.true_boxes == [ps.true_boxes[1]]
+        assert results.summary().cursor == delta.cursor == 3
+
+        # Replacing the boxes restarts the sequence
+        ps.true_boxes = ps.true_boxes[:1]
+        delta = results.delta(since=delta.cursor, epoch=delta.epoch)
+        assert delta.reset
+        assert (len(delta.true_boxes), len(delta.false_boxes)) == (1, 1)
+        assert delta.cursor == 5
+
+        # Reloaded results number the boxes in a new epoch
+        reloaded = FunmanResults(
+            id="test",
+            model=self.model,
+            request=self.request,
+            parameter_space=ps,
+        )
+        stale = reloaded.delta(since=2, epoch=delta.epoch)
+        assert stale.reset
+        assert stale.epoch != delta.epoch
+        assert (len(stale.true_boxes), len(stale.false_boxes)) == (1, 1)
+        assert not reloaded.delta(since=2, epoch=stale.epoch).reset
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import json
+import os
+import unittest
+
+from pydantic import ValidationError
+
+from funman import LABEL_FALSE, LABEL_TRUE, Funman
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.representation import Box, Interval
+from funman.representation.constraint import StateVariableConstraint
+from funman.search.schedule_refinement import (
+    RobustLabels,
+    ScheduleRefinement,
+)
+from funman.server.query import FunmanWorkRequest, FunmanWorkUnit
+from funman.utils.metrics import BOX_ENCODING, SCHEDULE_REFINEMENT
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_DIR = os.path.join(RESOURCES, "amr", "petrinet", "amr-examples")
+
+
+class TestScheduleRefinement(unittest.TestCase):
+    def _scenario(self, num_steps, config={}):
+        with open(os.path.join(SIR_DIR, "sir.json"), "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        with open(os.path.join(SIR_DIR, "sir_request1.json"), "r") as f:
+            request = json.load(f)
+        request["config"].update(
+            {
+                "solver": "z3",
+                "tolerance": 0.1,
+                "point_based_evaluation": True,
+                **config,
+            }
+        )
+        request["query"]["queries"][0]["ub"] = 10.0
+        request["parameters"][0]["interval"] = {"lb": 1e-4, "ub": 2e-4}
+        request["structure_parameters"][0]["interval"] = {
+            "lb": num_steps,
+            "ub": num_steps,
+        }
+        request = FunmanWorkRequest.model_validate(request)
+        scenario = FunmanWorkUnit(
+            id="test", model=model, request=request
+        ).to_scenario()
+        return scenario, request.config
+
+    def _refinement(self, num_steps, step_error_bound=0.5):
+        scenario, config = self._scenario(num_steps)
+        scenario.initialize(config)
+        schedule = scenario._smt_encoder._timed_model_elements[
+            "schedules"
+        ].schedules[0]
+        refinement = ScheduleRefinement(
+            problem=scenario,
+            schedule=schedule,
+            levels=2,
+            step_error_bound=step_error_bound,
+        )
+        return refinement, config
+
+    def _box(self, beta, step):
+        return Box(
+            bounds={
+                "beta": Interval(lb=beta[0], ub=beta[1]),
+                "gamma": Interval(lb=0.1, ub=0.18),
+                "timestep": Interval(
+                    lb=step, ub=step, closed_upper_bound=True
+                ),
+            }
+        )
+
+    def test_coarse_schedules(self):
+        refinement, _ = self._refinement(10)
+        schedules = refinement.coarse_schedules()
+        assert [steps for _, steps in schedules] == [
+            [0, 4, 8, 10],
+            [0, 2, 4, 6, 8, 10],
+        ]
+        assert schedules[0][0].timepoints == [0, 4, 8, 10]
+
+    def test_coarse_scenario(self):
+        refinement, _ = self._refinement(8)
+        coarse, steps = refinement.coarse_schedules()[0]
+        step_errors = refinement.step_errors(steps)
+        assert step_errors.shape == (3, 3) and (step_errors == 0.5).all()
+        for tighten, ub in [(True, 9.5), (False, 10.5)]:
+            scenario = refinement.coarse_scenario(
+                coarse, steps, step_errors, tighten
+            )
+            constraints = [
+                c
+                for c in scenario.constraints
+                if isinstance(c, StateVariableConstraint)
+            ]
+            # The query holds at each timepoint of the coarser schedule
+            assert [c.name for c in constraints] == [
+                "query_0",
+                "query_1",
+                "query_2",
+            ]
+            for c, t in zip(constraints, coarse.timepoints):
+                assert c.variable == "I"
+                assert c.interval.ub == ub
+                assert c.timepoints.lb == c.timepoints.ub == t
+
+    def test_robust_labels(self):
+        labels = RobustLabels(parameters=["beta", "gamma"])
+        # No false points up to step 4, and no true points from step 6 on
+        labels.add(LABEL_FALSE, self._box((1e-4, 2e-4), 0), 0, 4)
+        labels.add(LABEL_TRUE, self._box((2e-4, 3e-4), 0), 6, 8)
+        assert labels.label(self._box((1e-4, 1.5e-4), 4)) == LABEL_TRUE
+        assert labels.label(self._box((1e-4, 1.5e-4), 5)) is None
+        assert labels.label(self._box((2e-4, 2.5e-4), 6)) == LABEL_FALSE
+        assert labels.label(self._box((1.5e-4, 2.5e-4), 6)) is None
+
+        # The coarser schedule has the steps 0, 2, 4, 6, and 8
+        view = labels.view([0, 2, 4, 6, 8])
+        assert view.label(self._box((1e-4, 1.5e-4), 2)) == LABEL_TRUE
+        assert view.label(self._box((2e-4, 2.5e-4), 3)) == LABEL_FALSE
+
+    def test_step_error_bound(self):
+        # The coarser schedules only label boxes under a step error bound
+        with self.assertRaises(ValidationError):
+            self._scenario(24, {"schedule_refinement_levels": 2})
+
+    def test_refined_search(self):
+        results = []
+        for levels in [0, 2]:
+            # The step error of I is at most about 2.3
+            scenario, config = self._scenario(
+                24,
+                {
+                    "schedule_refinement_levels": levels,
+                    "step_error_bound": 3.0,
+                },
+            )
+            result = Funman().solve(scenario, config=config)
+            results.append((scenario, result.parameter_space))
+        (scenario, ps), (refined_scenario, refined_ps) = results
+
+        # The coarser schedules label most of the boxes, with the same labels
+        metrics = refined_scenario._phase_metrics.phases
+        assert metrics[SCHEDULE_REFINEMENT].count == 1
+        assert (
+            metrics[BOX_ENCODING].count
+            < scenario._phase_metrics.phases[BOX_ENCODING].count
+        )
+        assert {(b.label, str(b.bounds)) for b in ps.boxes()} == {
+            (b.label, str(b.bounds)) for b in refined_ps.boxes()
+        }
+
+
+if __name__ == "__main__":
+    unittest.main()
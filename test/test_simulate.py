@@ -0,0 +1,114 @@
+import json
+import os
+import unittest
+
+import numpy as np
+
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.model.query import QueryLE
+from funman.representation.constraint import (
+    QueryConstraint,
+    StateVariableConstraint,
+)
+from funman.representation.interval import Interval
+from funman.search.simulate import BatchSimulator, Simulator
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_MODEL = os.path.join(
+    RESOURCES, "amr", "petrinet", "amr-examples", "sir.json"
+)
+
+
+class TestSimulate(unittest.TestCase):
+    def setUp(self):
+        with open(SIR_MODEL, "r") as f:
+            self.model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        self.parameters = {
+            "beta": 2.7e-7,
+            "gamma": 0.14,
+            "S0": 1000.0,
+            "I0": 1.0,
+            "R0": 0.0,
+        }
+
+    def test_compiled_gradient(self):
+        gradient, jacobian = self.model.compiled_gradient()
+        S, I, R = 1000.0, 1.0, 0.0
+        beta, gamma = self.parameters["beta"], self.parameters["gamma"]
+        y = [S, I, R]
+        p = [self.parameters[p] for p in self.model._parameter_names()]
+
+        assert np.allclose(
+            gradient(0.0, y, *p),
+            [-beta * S * I, beta * S * I - gamma * I, gamma * I],
+        )
+        assert np.allclose(
+            jacobian(0.0, y, *p),
+            [
+                [-beta * I, -beta * S, 0.0],
+                [beta * I, beta * S - gamma, 0.0],
+                [0.0, gamma, 0.0],
+            ],
+        )
+
+    def test_sim(self):
+        timeseries = Simulator(
+            model=self.model,
+            init={"S": 1000.0, "I": 1.0, "R": 0.0},
+            parameters=self.parameters,
+            tvect=list(range(0, 11)),
+        ).sim()
+        totals = np.array(timeseries.data[1:]).sum(axis=0)
+        assert np.allclose(totals, 1001.0)
+        # I decays because beta * S < gamma
+        assert timeseries.data[2][-1] < 1.0
+
+    def test_batch_sim(self):
+        names = self.model._parameter_names()
+        betas = [2.7e-7, 1e-4, 3e-4, 5e-4]
+        points = [{**self.parameters, "beta": beta} for beta in betas]
+        parameters = np.array([[p[n] for n in names] for p in points])
+        init = {"S": "S0", "I": "I0", "R": "R0"}
+        tvect = list(range(0, 21))
+
+        simulator = BatchSimulator(
+            model=self.model, init=init, parameters=parameters, tvect=tvect
+        )
+        trajectories = simulator.sim()
+        assert trajectories.shape == (len(points), len(tvect), 3)
+        for point, trajectory in zip(points, trajectories):
+            timeseries = Simulator(
+                model=self.model, init=init, parameters=point, tvect=tvect
+            ).sim()
+            assert np.allclose(
+                trajectory, np.array(timeseries.data[1:]).T, rtol=1e-4
+            )
+
+        peak = trajectories[:, :, 1].max(axis=1)
+        constraints = [
+            StateVariableConstraint(
+                name="I_bound",
+                variable="I",
+                interval=Interval(lb=0.0, ub=100.0),
+                timepoints=Interval(lb=0.0, ub=10.0, closed_upper_bound=True),
+            ),
+            QueryConstraint(
+                name="I_end", query=QueryLE(variable="I", ub=50.0, at_end=True)
+            ),
+        ]
+        satisfied = simulator.satisfies(constraints, trajectories)
+        expected = (trajectories[:, :11, 1] < 100.0).all(axis=1) & (
+            trajectories[:, -1, 1] <= 50.0
+        )
+        assert np.array_equal(satisfied, expected)
+        assert satisfied.any() and not satisfied.all()
+        assert peak[0] < peak[-1]
+
+
+if __name__ == "__main__":
+    unittest.main()
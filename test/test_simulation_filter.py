@@ -0,0 +1,111 @@
+import json
+import os
+import unittest
+
+import numpy as np
+
+from funman import LABEL_FALSE, LABEL_TRUE
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.representation import Box, Interval
+from funman.search.simulate import BatchSimulator
+from funman.search.simulation_filter import SimulationFilter
+from funman.server.query import FunmanWorkRequest, FunmanWorkUnit
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_DIR = os.path.join(RESOURCES, "amr", "petrinet", "amr-examples")
+
+
+class TestSimulationFilter(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(SIR_DIR, "sir.json"), "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        with open(os.path.join(SIR_DIR, "sir_request1.json"), "r") as f:
+            request = json.load(f)
+        request["config"]["solver"] = "z3"
+        self.request = FunmanWorkRequest.model_validate(request)
+        self.scenario = FunmanWorkUnit(
+            id="test", model=model, request=self.request
+        ).to_scenario()
+        self.scenario.initialize(self.request.config)
+        self.schedule = self.scenario._smt_encoder._timed_model_elements[
+            "schedules"
+        ].schedules[0]
+
+    def _box(self, fraction=1.0):
+        bounds = {}
+        for p in self.scenario.model_parameters():
+            ub = p.interval.lb + fraction * (p.interval.ub - p.interval.lb)
+            bounds[p.name] = Interval(
+                lb=p.interval.lb,
+                ub=ub,
+                closed_upper_bound=(p.interval.lb == ub),
+            )
+        bounds["timestep"] = Interval(
+            lb=0,
+            ub=len(self.schedule.timepoints) - 1,
+            closed_upper_bound=True,
+        )
+        return Box(bounds=bounds)
+
+    def test_discrete_simulation(self):
+        model = self.scenario.model
+        init = {"S": "S0", "I": "I0", "R": "R0"}
+        # beta, gamma, S0, I0, R0
+        parameters = np.array(
+            [
+                [2.7e-7, 0.14, 1000.0, 1.0, 0.0],
+                [2.8e-5, 0.13, 990.0, 10.0, 0.0],
+            ]
+        )
+        tvect = [0, 1, 3]
+        trajectories = BatchSimulator(
+            model=model,
+            init=init,
+            parameters=parameters,
+            tvect=tvect,
+            discrete=True,
+        ).sim()
+        assert trajectories.shape == (2, 3, 3)
+        for (beta, gamma, *y0), trajectory in zip(parameters, trajectories):
+            y = np.array(y0)
+            for i in range(1, len(tvect)):
+                S, I, R = y
+                infection, recovery = beta * S * I, gamma * I
+                y = y + (tvect[i] - tvect[i - 1]) * np.array(
+                    [-infection, infection - recovery, recovery]
+                )
+                assert np.allclose(trajectory[i], y)
+
+    def test_simulate_box(self):
+        simulation_filter = SimulationFilter(
+            problem=self.scenario, schedule=self.schedule, samples=8
+        )
+        assert simulation_filter.enabled
+        box = self._box()
+        assert simulation_filter.simulate(box, self.request.config)
+        assert box._simulated_steps == set(
+            range(len(self.schedule.timepoints))
+        )
+        first_step = [p for p in box.points if p.timestep() == 0]
+        # 8 samples and the 4 corners of beta and gamma
+        assert len(first_step) == 12
+        assert all(p.label in [LABEL_TRUE, LABEL_FALSE] for p in box.points)
+        assert all(box.contains_point(p) for p in box.points)
+
+        # A sub-box reuses the points that it contains
+        sub_box = self._box(fraction=0.5)
+        cached = len(simulation_filter._cache_parameters)
+        assert simulation_filter.simulate(sub_box, self.request.config)
+        reused = [p for p in first_step if sub_box.contains_point(p)]
+        assert len(simulation_filter._cache_parameters) == cached + (
+            8 - len(reused) + 3
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
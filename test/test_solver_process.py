@@ -0,0 +1,70 @@
+import unittest
+
+from pysmt.logics import QF_NRA
+from pysmt.shortcuts import (
+    BOOL,
+    GE,
+    LE,
+    REAL,
+    And,
+    Implies,
+    Not,
+    Plus,
+    Real,
+    Symbol,
+    Times,
+)
+
+from funman.search.solver_process import SolverProcess
+
+
+class TestSolverProcess(unittest.TestCase):
+    def test_push_pop(self):
+        x = Symbol("x", REAL)
+        y = Symbol("y", REAL)
+        b = Symbol("b", BOOL)
+        with SolverProcess(name="z3", logic=QF_NRA) as s:
+            s.add_assertion(And(GE(x, Real(1.0)), b))
+            s.push(1)
+            s.add_assertion(And(LE(Plus(x, y), Real(0.5)), GE(y, Real(0.0))))
+            assert not s.solve()
+            s.pop(1)
+            assert s.solve()
+            model = s.get_model()
+            assert model[b].is_true()
+            assert model[x].constant_value() >= 1
+
+    def test_assumptions(self):
+        x = Symbol("x", REAL)
+        a = Symbol("a", BOOL)
+        b = Symbol("b", BOOL)
+        with SolverProcess(name="z3", logic=QF_NRA) as s:
+            s.add_assertion(Implies(a, GE(x, Real(1.0))))
+            s.add_assertion(LE(x, Real(0.0)))
+            assert not s.solve([a])
+            assert s.solve([Not(a), b])
+            assert s.get_model()[b].is_true()
+
+    def test_timeout_replays_assertions(self):
+        x = Symbol("x", REAL)
+        v = [Symbol(f"v{i}", REAL) for i in range(8)]
+        with SolverProcess(name="z3", logic=QF_NRA) as s:
+            s.add_assertion(GE(x, Real(1.0)))
+            s.push(1)
+            s.add_assertion(
+                And(
+                    [
+                        GE(Times(v[i], v[i], v[(i + 1) % 8]), Real(i + 2))
+                        for i in range(8)
+                    ]
+                    + [LE(Plus(v), Real(-1.0))]
+                )
+            )
+            assert s.solve(timeout=0.001) is None
+            s.pop(1)
+            assert s.solve(timeout=10)
+            assert s.get_model()[x].constant_value() >= 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.representation import Box, Interval, ParameterSpace, Point
+from funman.server.query import FunmanResults, FunmanWorkRequest
+from funman.server.storage import Storage
+
+RESOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../resources"
+)
+SIR_MODEL = os.path.join(
+    RESOURCES, "amr", "petrinet", "amr-examples", "sir.json"
+)
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmpdir.name)
+        self.storage = Storage()
+        self.storage.start(str(self.path))
+
+    def tearDown(self):
+        self.storage.stop()
+        self._tmpdir.cleanup()
+
+    def _result(self):
+        with open(SIR_MODEL, "r") as f:
+            model = _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+        id = self.storage.claim_id()
+        result = FunmanResults(
+            id=id,
+            model=model,
+            request=FunmanWorkRequest(),
+            parameter_space=ParameterSpace(num_dimensions=1),
+        )
+        result.start()
+        self.storage.add_result(result)
+        return result
+
+    def _box(self, i, label="true"):
+        box = Box(
+            label=label,
+            bounds={
+                "beta": Interval(lb=i, ub=i + 1),
+                "timestep": Interval(lb=0, ub=0, closed_upper_bound=True),
+            },
+        )
+        box.points = [
+            Point(label=label, values={"beta": i + 0.5, "timestep": 0})
+        ]
+        return box
+
+    def _reload(self, id) -> FunmanResults:
+        storage = Storage()
+        storage.start(str(self.path))
+        return storage.get_result(id)
+
+    def test_log_updates(self):
+        result = self._result()
+        snapshot = self.path / f"{result.id}.json"
+        log = self.path / f"{result.id}.jsonl"
+
+        # Updates append to the log
+        snapshot_mtime = snapshot.stat().st_mtime_ns
+        ps = result.parameter_space
+        ps.true_boxes.append(self._box(0))
+        self.storage.update_result(result)
+        for i in range(1, 4):
+            ps.true_boxes.append(self._box(i))
+            ps.false_boxes.append(self._box(-i, label="false"))
+            result.progress.progress = i / 10.0
+            self.storage.update_result(result)
+        assert snapshot.stat().st_mtime_ns == snapshot_mtime
+        assert len(log.read_text().splitlines()) == 4
+
+        loaded = self._reload(result.id)
+        assert len(loaded.parameter_space.true_boxes) == 4
+        assert len(loaded.parameter_space.false_boxes) == 3
+        assert loaded.parameter_space.true_boxes[3].bounds["beta"] == Interval(
+            lb=3, ub=4
+        )
+        assert loaded.progress.progress == 0.3
+
+        # Replacing boxes writes a snapshot
+        ps.true_boxes = ps.true_boxes[1:]
+        self.storage.update_result(result)
+        assert not log.exists()
+        assert len(self._reload(result.id).parameter_space.true_boxes) == 3
+
+    def test_replay_is_idempotent(self):
+        result = self._result()
+        ps = result.parameter_space
+        ps.true_boxes.append(self._box(0))
+        self.storage.update_result(result)
+        ps.true_boxes.append(self._box(1))
+        self.storage.update_result(result)
+
+        # A snapshot that already includes the log, and a partial record
+        log = self.path / f"{result.id}.jsonl"
+        records = log.read_text()
+        self.storage.add_result(result)
+        log.write_text(records + '{"result": ')
+
+        loaded = self._reload(result.id)
+        assert len(loaded.parameter_space.true_boxes) == 2
+
+    def test_skip_stale_log(self):
+        result = self._result()
+        ps = result.parameter_space
+        for i in range(2):
+            ps.true_boxes.append(self._box(i))
+            result.progress.progress = 0.1
+            self.storage.update_result(result)
+
+        # A crash after writing a snapshot of compacted boxes and later
+        # progress, but before removing the log
+        log = self.path / f"{result.id}.jsonl"
+        records = log.read_text()
+        ps.true_boxes = ps.true_boxes[1:]
+        result.progress.progress = 0.5
+        self.storage.add_result(result)
+        log.write_text(records)
+
+        loaded = self._reload(result.id)
+        assert len(loaded.parameter_space.true_boxes) == 1
+        assert loaded.progress.progress == 0.5
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+import sympy
+from pysmt.shortcuts import REAL, Symbol, Times
+
+from funman.utils.sympy_utils import (
+    rate_expr_to_pysmt,
+    state_symbol_map,
+    sympy_to_pysmt,
+    to_sympy,
+)
+
+
+class TestSympyUtils(unittest.TestCase):
+    def test_to_sympy_cache(self):
+        expr = to_sympy("beta*S*I/N", ["S", "I", "N", "beta"])
+        # Symbols that do not occur in the expression do not change the parse
+        assert expr is to_sympy("beta*S*I/N", ["S", "I", "N", "beta", "R"])
+        # S, I, and N are parsed as symbols instead of sympy builtins
+        assert expr.free_symbols == set(sympy.symbols("S I N beta"))
+        assert to_sympy("funman_lambda*S", ["lambda", "S"]) == to_sympy(
+            "lambda*S", ["lambda", "S"]
+        )
+
+    def test_sympy_to_pysmt_cache(self):
+        expr = to_sympy("beta*S*I", ["S", "I", "beta"])
+        S, I, beta = sympy.symbols("S I beta")
+        assert sympy_to_pysmt(expr) is sympy_to_pysmt(beta * S * I)
+
+    def test_rate_expr_to_pysmt(self):
+        beta = Symbol("beta", REAL)
+        expr = to_sympy("beta*S*I", ["S", "I", "beta"])
+        for step in range(3):
+            state = {
+                "S": Symbol(f"S_{step}", REAL),
+                "I": Symbol(f"I_{step}", REAL),
+            }
+            expected = Times(beta, state["S"], state["I"])
+            for f in [
+                rate_expr_to_pysmt(expr, state=state),
+                rate_expr_to_pysmt(
+                    "beta*S*I", symbol_map=state_symbol_map(state)
+                ),
+            ]:
+                assert f.get_free_variables() == {
+                    beta,
+                    state["S"],
+                    state["I"],
+                }
+                assert f.simplify() == expected.simplify()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from funman.model.generated_models.petrinet import Model as GeneratedPetriNet
+from funman.model.model import _wrap_with_internal_model
+from funman.server.query import FunmanWorkRequest
+from funman.server.storage import Storage
+from funman.server.worker import FunmanWorker
+
+RESOURCES = Path(__file__).resolve().parent / ".." / "resources"
+SIR_DIR = RESOURCES / "amr" / "petrinet" / "amr-examples"
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.storage = Storage()
+        self.storage.start(self._tmpdir.name)
+
+    def tearDown(self):
+        self.storage.stop()
+        self._tmpdir.cleanup()
+
+    def _model(self):
+        with open(SIR_DIR / "sir.json", "r") as f:
+            return _wrap_with_internal_model(
+                GeneratedPetriNet.model_validate(json.load(f))
+            )
+
+    def _synthesis_request(self):
+        with open(SIR_DIR / "sir_request1.json", "r") as f:
+            request = json.load(f)
+        request["config"]["solver"] = "z3"
+        request["config"]["tolerance"] = 0.2
+        request["structure_parameters"][0]["interval"]["ub"] = 2
+        return FunmanWorkRequest.model_validate(request)
+
+    def _consistency_request(self):
+        return FunmanWorkRequest.model_validate(
+            {
+                "structure_parameters": [
+                    {
+                        "name": "schedules",
+                        "schedules": [{"timepoints": [0, 1]}],
+                    }
+                ],
+                "config": {"solver": "z3"},
+            }
+        )
+
+    def _wait_for_done(self, worker, ids, timeout=120):
+        start = time.time()
+        while time.time() - start < timeout:
+            if all(worker.get_results(id).done for id in ids):
+                return
+            time.sleep(0.5)
+        self.fail(f"Work did not finish in {timeout} seconds")
+
+    def _wait_for_running(self, worker, ids, timeout=60):
+        start = time.time()
+        while time.time() - start < timeout:
+            running = worker.get_running()
+            if any(id in running for id in ids):
+                return running
+            time.sleep(0.1)
+        self.fail(f"Work did not start in {timeout} seconds")
+
+    def test_priority(self):
+        worker = FunmanWorker(self.storage, max_concurrent=1)
+        synthesis = worker.enqueue_work(
+            self._model(), self._synthesis_request()
+        )
+        consistency = worker.enqueue_work(
+            self._model(), self._consistency_request()
+        )
+
+        # Consistency checks go first
+        status = worker.get_queue_status(synthesis.id)
+        assert status.state == "queued"
+        assert status.position == 1
+        assert worker.get_queue_status(consistency.id).position == 0
+
+        worker.start()
+        try:
+            self._wait_for_done(worker, [synthesis.id, consistency.id])
+            for id in [synthesis.id, consistency.id]:
+                results = worker.get_results(id)
+                assert not results.error, results.error_message
+                assert worker.get_queue_status(id).state == "done"
+            assert (
+                self.storage.get_result(synthesis.id).progress.progress == 1.0
+            )
+        finally:
+            worker.stop()
+
+    def test_concurrent(self):
+        worker = FunmanWorker(self.storage, max_concurrent=2)
+        ids = [
+            worker.enqueue_work(self._model(), self._synthesis_request()).id
+            for _ in range(2)
+        ]
+        consistency = worker.enqueue_work(
+            self._model(), self._consistency_request()
+        )
+        worker.start()
+        try:
+            running = self._wait_for_running(worker, ids)
+            # One slot is left for consistency checks
+            assert len(running) <= 2
+            assert not all(id in running for id in ids)
+
+            worker.halt(next(id for id in ids if id in running))
+            self._wait_for_done(worker, ids + [consistency.id])
+            assert not worker.get_results(consistency.id).error
+        finally:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()